@@ -0,0 +1,302 @@
+"""
+Admission control for the Crop Recommendation System
+Every admitted request takes a token from its client's token bucket (keyed by
+API key or client address) and one of a bounded number of in-flight slots.
+A client that runs out of tokens gets 429; when all slots stay busy for
+longer than the queue budget the request gets 503. Both carry Retry-After,
+so excess load is shed quickly instead of queueing behind the threads.
+
+The 'memory' backend keeps state per process. The 'shared' backend keeps it
+in memory that is allocated before gunicorn forks, so all workers on the host
+share one set of buckets and one in-flight limit. Its buckets live in a fixed
+table of hashed slots; clients whose keys collide share a bucket. In-flight
+slots are counted per worker, so the master can reclaim the slots of a
+worker that was killed mid-request (reclaim(pid) from gunicorn's child_exit).
+"""
+
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: no prefork server, a plain lock is enough
+    fcntl = None
+
+# Client buckets kept by the memory backend, least recently seen dropped first
+MAX_CLIENTS = 10000
+# Bucket slots in the shared backend's table
+SHARED_SLOTS = 4096
+# Poll interval while the shared backend waits for an in-flight slot
+SHARED_POLL_SECONDS = 0.001
+# Worker processes whose in-flight slots the shared backend tracks at once
+SHARED_WORKERS = 256
+
+class Rejection(Exception):
+    """Request refused by admission control; status is 429 or 503"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+def refill(tokens, updated, now, rate, burst):
+    """Tokens in a bucket at time now"""
+    return min(burst, tokens + (now - updated) * rate)
+
+def retry_after_seconds(tokens, rate):
+    """Whole seconds until a bucket holding tokens has one to give"""
+    return max(1, math.ceil((1 - tokens) / rate))
+
+class MemoryBackend:
+    """Token buckets and in-flight slots for a single process"""
+
+    def __init__(self, rate, burst, max_in_flight):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self._in_flight = 0
+
+    def take(self, key, now):
+        """Take a token for key; returns 0 or the seconds to wait for one"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = refill(tokens, updated, now, self.rate, self.burst)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = retry_after_seconds(tokens, self.rate)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def enter(self, timeout):
+        """Take an in-flight slot, waiting up to timeout seconds; False when none freed up"""
+        if self._slots is not None and not self._slots.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def in_flight(self):
+        return self._in_flight
+
+    def clients(self):
+        return len(self._buckets)
+
+    def reclaim(self, pid):
+        return 0
+
+class ProcessLock:
+    """
+    Lock shared by forked processes that is released when its holder dies
+    A POSIX record lock on an unlinked temporary file excludes other
+    processes, a thread lock the other threads of the same process. Unlike a
+    multiprocessing.Lock it cannot be left held by a killed worker.
+    """
+
+    def __init__(self):
+        handle, path = tempfile.mkstemp(prefix='crop-admission-', suffix='.lock')
+        os.unlink(path)
+        self._fd = handle
+        self._threads = threading.Lock()
+
+    def __enter__(self):
+        self._threads.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._threads.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._threads.release()
+
+class SharedBackend:
+    """
+    Token buckets and in-flight slots in memory shared by forked workers
+    Must be created before the workers fork (the app is preloaded).
+    """
+
+    def __init__(self, rate, burst, max_in_flight, slots=SHARED_SLOTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.slots = slots
+        self._lock = ProcessLock() if fcntl is not None else multiprocessing.Lock()
+        # tokens and last update per slot; an update time of 0 marks an unused slot
+        self._tokens = multiprocessing.RawArray('d', slots)
+        self._updated = multiprocessing.RawArray('d', slots)
+        self._in_flight = multiprocessing.RawValue('i', 0)
+        # pid and slots held per worker; a pid of 0 marks an unused entry
+        self._pids = multiprocessing.RawArray('i', SHARED_WORKERS)
+        self._held = multiprocessing.RawArray('i', SHARED_WORKERS)
+        self._worker_pid = None
+        self._worker = None
+
+    def _slot(self, key):
+        # crc32 rather than hash(): it is the same in every worker
+        return zlib.crc32(key.encode('utf-8')) % self.slots
+
+    def take(self, key, now):
+        slot = self._slot(key)
+        with self._lock:
+            if self._updated[slot] == 0:
+                tokens = self.burst
+            else:
+                tokens = refill(self._tokens[slot], self._updated[slot], now, self.rate, self.burst)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = retry_after_seconds(tokens, self.rate)
+            self._tokens[slot] = tokens
+            self._updated[slot] = now
+            return wait
+
+    def _worker_entry(self):
+        """This process's entry in the per-worker table, None when it is full; call locked"""
+        pid = os.getpid()
+        if self._worker_pid != pid:
+            self._worker_pid, self._worker = pid, None
+        if self._worker is None:
+            free = None
+            for index, owner in enumerate(self._pids):
+                if owner == pid:
+                    self._worker = index
+                    break
+                if owner == 0 and free is None:
+                    free = index
+            else:
+                if free is not None:
+                    self._pids[free] = pid
+                    self._held[free] = 0
+                    self._worker = free
+        return self._worker
+
+    def enter(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self.max_in_flight or self._in_flight.value < self.max_in_flight:
+                    self._in_flight.value += 1
+                    worker = self._worker_entry()
+                    if worker is not None:
+                        self._held[worker] += 1
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(SHARED_POLL_SECONDS)
+
+    def leave(self):
+        with self._lock:
+            self._in_flight.value -= 1
+            worker = self._worker_entry()
+            if worker is not None and self._held[worker] > 0:
+                self._held[worker] -= 1
+
+    def reclaim(self, pid):
+        """Free the slots and table entry of worker pid after it exited; returns the slots freed"""
+        with self._lock:
+            for index, owner in enumerate(self._pids):
+                if owner == pid:
+                    held = self._held[index]
+                    self._in_flight.value -= held
+                    self._held[index] = 0
+                    self._pids[index] = 0
+                    return held
+        return 0
+
+    def in_flight(self):
+        return self._in_flight.value
+
+    def clients(self):
+        return sum(1 for updated in self._updated if updated)
+
+BACKENDS = {'memory': MemoryBackend, 'shared': SharedBackend}
+
+class AdmissionController:
+    """
+    Per-client rate limiting plus a global in-flight cap
+    rate is tokens per second per client (0 disables rate limiting), burst the
+    bucket size, max_in_flight the concurrent request limit (0 for none) and
+    queue_budget the seconds a request may wait for a slot before it is shed.
+    """
+
+    def __init__(self, rate=0.0, burst=None, max_in_flight=0, queue_budget=0.05, backend='memory'):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown admission backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.max_in_flight = max_in_flight
+        self.queue_budget = queue_budget
+        self.backend_name = backend
+        self.backend = BACKENDS[backend](rate, self.burst, max_in_flight)
+        self.events = Counter()
+        self._events_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.rate or self.max_in_flight)
+
+    def _count(self, event):
+        with self._events_lock:
+            self.events[event] += 1
+
+    def admit(self, key):
+        """
+        Admit a request from client key, raising Rejection when it is shed
+        Every admitted request must be followed by release()
+        """
+        if self.rate:
+            wait = self.backend.take(key, time.monotonic())
+            if wait:
+                self._count('rate_limited')
+                raise Rejection(429, 'rate_limited', wait)
+        if not self.backend.enter(self.queue_budget):
+            self._count('overloaded')
+            raise Rejection(503, 'overloaded', 1)
+        self._count('admitted')
+
+    def release(self):
+        self.backend.leave()
+
+    def reclaim(self, pid):
+        """Return the in-flight slots of a worker process that exited; returns the count"""
+        return self.backend.reclaim(pid)
+
+    def stats(self):
+        with self._events_lock:
+            events = dict(self.events)
+        return {
+            'enabled': self.enabled,
+            'backend': self.backend_name,
+            'rate_per_client': self.rate,
+            'burst': self.burst,
+            'max_in_flight': self.max_in_flight,
+            'queue_budget_ms': self.queue_budget * 1000,
+            'in_flight': self.backend.in_flight(),
+            'clients': self.backend.clients(),
+            'admitted': events.get('admitted', 0),
+            'rate_limited': events.get('rate_limited', 0),
+            'overloaded': events.get('overloaded', 0),
+        }
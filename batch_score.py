@@ -0,0 +1,240 @@
+"""
+Offline Batch Scoring for the Crop Recommendation System
+Scores CSV files shaped like crop_recommendation.csv with the same engines as
+simple_app. Input files are split into newline-aligned byte ranges that worker
+processes parse and score independently, so throughput scales with cores.
+
+Usage:
+    python batch_score.py archive.csv -o scored.csv
+    python batch_score.py 2023.csv 2024.csv -o scored.parquet --engine centroid --workers 8
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from crop_engine import FEATURE_FIELDS, apply_range_checks, load_engines
+
+# Engine of the current worker process, set by _init_worker
+_ENGINE = None
+
+def plan_chunks(paths, chunk_bytes):
+    """
+    Split each input file into newline-aligned byte ranges
+    Returns the header columns of every file and a list of
+    (file_index, start, end) tuples in file order
+    """
+    headers = []
+    chunks = []
+    for file_index, path in enumerate(paths):
+        size = os.path.getsize(path)
+        with open(path, 'rb') as handle:
+            header = handle.readline()
+            headers.append(header.decode('utf-8-sig').strip().split(','))
+            start = handle.tell()
+            while start < size:
+                handle.seek(min(start + chunk_bytes, size))
+                handle.readline()
+                end = min(handle.tell(), size)
+                chunks.append((file_index, start, end))
+                start = end
+    return headers, chunks
+
+def validate_frame(frame):
+    """
+    Vectorized validate_input_data over a DataFrame
+    Returns (features, errors) like crop_engine.validate_input_batch
+    """
+    import pandas as pd
+
+    missing_fields = [field for field in FEATURE_FIELDS if field not in frame.columns]
+    if missing_fields:
+        message = f"Missing required fields: {', '.join(missing_fields)}"
+        return np.full((len(frame), len(FEATURE_FIELDS)), np.nan), np.full(len(frame), message, dtype=object)
+
+    features = np.column_stack([
+        pd.to_numeric(frame[field], errors='coerce').to_numpy(dtype=float) for field in FEATURE_FIELDS
+    ])
+    errors = np.full(len(frame), None, dtype=object)
+
+    # Empty, non-numeric or non-finite cells: report the first bad field of each row
+    invalid = ~np.isfinite(features)
+    bad_rows = np.flatnonzero(invalid.any(axis=1))
+    for row, column in zip(bad_rows, invalid[bad_rows].argmax(axis=1)):
+        errors[row] = f"Invalid value for {FEATURE_FIELDS[column]}: must be a number"
+
+    apply_range_checks(features, errors)
+    return features, errors
+
+def _init_worker(engine):
+    global _ENGINE
+    _ENGINE = engine
+
+def score_chunk(task):
+    """
+    Parse and score one byte range in a worker process
+    CSV output comes back as text for the parent to append in order; parquet
+    parts are written here directly. Returns (rows, valid_rows, csv_text)
+    """
+    import pandas as pd
+
+    path, columns, start, end, output_format, part_path = task
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    # Read cells as text so pass-through columns keep their original formatting
+    frame = pd.read_csv(io.BytesIO(data), header=None, names=columns, index_col=False, dtype=str,
+                        keep_default_na=False)
+
+    features, errors = validate_frame(frame)
+    valid = np.array([error is None for error in errors], dtype=bool)
+    crops, confidences = _ENGINE.predict_batch(features[valid])
+
+    recommended = np.full(len(frame), None, dtype=object)
+    confidence = np.full(len(frame), np.nan)
+    recommended[valid] = crops
+    confidence[valid] = confidences
+    frame['recommended_crop'] = recommended
+    frame['confidence'] = confidence
+    frame['error'] = errors
+
+    if output_format == 'parquet':
+        frame.to_parquet(part_path + '.tmp', index=False)
+        os.replace(part_path + '.tmp', part_path)
+        return len(frame), int(valid.sum()), None
+    return len(frame), int(valid.sum()), frame.to_csv(index=False, header=False)
+
+def load_progress(progress_path, settings):
+    """Return the saved progress if it was written for the same job settings"""
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path) as handle:
+        progress = json.load(handle)
+    return progress if progress.get('settings') == settings else None
+
+def save_progress(progress_path, progress):
+    with open(progress_path + '.tmp', 'w') as handle:
+        json.dump(progress, handle)
+    os.replace(progress_path + '.tmp', progress_path)
+
+def run(paths, output, output_format, engine_name, workers, chunk_bytes, resume=True):
+    """Score every input file into output, printing progress as chunks finish"""
+    engines = load_engines()
+    if engine_name not in engines:
+        raise SystemExit(f"❌ Unknown engine '{engine_name}'. Available engines: {', '.join(engines)}")
+
+    headers, chunks = plan_chunks(paths, chunk_bytes)
+    if len({tuple(header) for header in headers}) > 1:
+        raise SystemExit("❌ All input files must have the same columns")
+    columns = headers[0]
+
+    # CSV output is one file plus a progress sidecar; parquet output is a
+    # directory of part files, and parts that already exist are skipped
+    settings = {'inputs': [os.path.abspath(path) for path in paths], 'chunk_bytes': chunk_bytes,
+                'engine': engine_name}
+    progress_path = output + '.progress'
+    done = set()
+    rows_done = 0
+    if output_format == 'parquet':
+        os.makedirs(output, exist_ok=True)
+        if resume:
+            done = {index for index in range(len(chunks)) if os.path.exists(os.path.join(output, f"part-{index:05d}.parquet"))}
+        out = None
+    else:
+        progress = load_progress(progress_path, settings) if resume else None
+        if progress:
+            done = set(range(progress['chunks_done']))
+            rows_done = progress['rows_done']
+            out = open(output, 'r+b')
+            out.truncate(progress['bytes_written'])
+            out.seek(progress['bytes_written'])
+        else:
+            out = open(output, 'wb')
+            out.write((','.join(columns + ['recommended_crop', 'confidence', 'error']) + '\n').encode('utf-8'))
+            progress = {'settings': settings, 'chunks_done': 0, 'rows_done': 0, 'bytes_written': out.tell()}
+            save_progress(progress_path, progress)
+    if done:
+        print(f"⏩ Resuming: {len(done)}/{len(chunks)} chunks already scored")
+
+    tasks = [
+        (index, (paths[file_index], columns, start, end, output_format,
+                 os.path.join(output, f"part-{index:05d}.parquet")))
+        for index, (file_index, start, end) in enumerate(chunks) if index not in done
+    ]
+    bytes_todo = sum(chunks[index][2] - chunks[index][1] for index, _ in tasks)
+
+    print(f"🚜 Scoring {len(tasks)} chunks with {workers} workers ({engine_name} engine)")
+    started = time.perf_counter()
+    rows = 0
+    valid_rows = 0
+    bytes_scored = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(engines[engine_name],)) as executor:
+        # Keep a bounded window of chunks in flight and consume them in order
+        pending = deque()
+        task_iter = iter(tasks)
+        for index, task in task_iter:
+            pending.append((index, task, executor.submit(score_chunk, task)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            index, task, future = pending.popleft()
+            chunk_rows, chunk_valid, text = future.result()
+            if out is not None:
+                out.write(text.encode('utf-8'))
+                out.flush()
+                progress.update(chunks_done=index + 1, rows_done=rows_done + rows + chunk_rows,
+                                bytes_written=out.tell())
+                save_progress(progress_path, progress)
+            rows += chunk_rows
+            valid_rows += chunk_valid
+            bytes_scored += task[3] - task[2]
+            elapsed = time.perf_counter() - started
+            print(f"   {bytes_scored / bytes_todo * 100:5.1f}% | {rows:,} rows | {rows / elapsed:,.0f} rows/sec")
+            for next_index, next_task in task_iter:
+                pending.append((next_index, next_task, executor.submit(score_chunk, next_task)))
+                break
+
+    if out is not None:
+        out.close()
+        os.remove(progress_path)
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Scored {rows:,} rows ({valid_rows:,} valid) in {elapsed:.1f}s — {rate:,.0f} rows/sec")
+    return rows, valid_rows, rate
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score crop_recommendation.csv-shaped files offline')
+    parser.add_argument('inputs', nargs='+', help='Input CSV files with a header row')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Output CSV file, or a .parquet directory of part files')
+    parser.add_argument('--format', choices=['csv', 'parquet'],
+                        help='Output format (default: parquet for .parquet outputs, otherwise csv)')
+    parser.add_argument('--engine', default=os.environ.get('CROP_ENGINE', 'rule-based'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-mb', type=float, default=8.0, help='Approximate size of each chunk')
+    parser.add_argument('--no-resume', action='store_true', help='Ignore progress from an earlier run')
+    args = parser.parse_args(argv)
+
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+    if output_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+    for path in args.inputs:
+        if not os.path.exists(path):
+            raise SystemExit(f"❌ {path} not found!")
+
+    run(args.inputs, args.output, output_format, args.engine, max(1, args.workers),
+        int(args.chunk_mb * 1024 * 1024), resume=not args.no_resume)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Benchmark and Load-Test Suite for the Crop Recommendation System
+Two parts:
+    micro  - timings of the engine functions in-process
+    load   - starts simple_app locally and drives /predict, /chatbot and
+             /health at fixed concurrency levels over keep-alive connections
+
+Results are written as JSON; --compare checks them against a saved baseline
+and exits non-zero when anything regressed past --threshold percent.
+
+Usage:
+    python benchmark.py micro load --output baseline.json
+    python benchmark.py micro --compare baseline.json --threshold 10
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import timeit
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_RECORD = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.8, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 202.9}
+SAMPLE_MESSAGES = [
+    'How should I grow rice in clay soil?',
+    'Which irrigation is best for vegetables?',
+    'Organic fertilizers for tomatoes?',
+    'How to manage aphids naturally?',
+    'hello there',
+]
+
+def time_call(func, min_time=0.2, repeat=5):
+    """Median and best nanoseconds per call of func over several timed runs"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_time / 0.2))
+    runs = [elapsed / number * 1e9 for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {'ns_per_op': statistics.median(runs), 'best_ns_per_op': min(runs)}
+
+def run_micro():
+    """Micro-benchmarks of each engine function"""
+    from chatbot_engine import get_chatbot_response
+    from crop_engine import (
+        CentroidEngine,
+        FEATURE_FIELDS,
+        simple_crop_recommendation,
+        simple_crop_recommendation_batch,
+        validate_input_batch,
+    )
+    from knowledge_index import KnowledgeIndex
+    from simple_app import validate_input_data
+
+    features = [SAMPLE_RECORD[field] for field in FEATURE_FIELDS]
+    rng = np.random.default_rng(0)
+    batch = np.column_stack([
+        rng.uniform(0, 140, 1000), rng.uniform(0, 140, 1000), rng.uniform(0, 200, 1000),
+        rng.uniform(5, 45, 1000), rng.uniform(10, 100, 1000), rng.uniform(3, 10, 1000), rng.uniform(0, 300, 1000)
+    ])
+    records = [dict(zip(FEATURE_FIELDS, row)) for row in batch.tolist()]
+    centroid = CentroidEngine.from_csv()
+    index = KnowledgeIndex.build()
+
+    cases = {
+        'simple_crop_recommendation': lambda: simple_crop_recommendation(*features),
+        'simple_crop_recommendation_batch_1k': lambda: simple_crop_recommendation_batch(*batch.T),
+        'validate_input_data': lambda: validate_input_data(SAMPLE_RECORD),
+        'validate_input_batch_1k': lambda: validate_input_batch(records),
+        'centroid_predict': lambda: centroid.predict(features),
+        'centroid_predict_batch_1k': lambda: centroid.predict_batch(batch),
+        'get_chatbot_response': lambda: [get_chatbot_response(message) for message in SAMPLE_MESSAGES],
+        'knowledge_index_search': lambda: [index.search(message) for message in SAMPLE_MESSAGES],
+    }
+    results = {}
+    for name, func in cases.items():
+        results[name] = time_call(func)
+        print(f"   {name:<40} {results[name]['ns_per_op'] / 1000:>10.2f} µs/op")
+    return results
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port, production=False, workers=None):
+    """Start simple_app in a subprocess and wait until /health answers"""
+    command = [sys.executable, os.path.join(BASE_DIR, 'simple_app.py'), '--port', str(port)]
+    if production:
+        command += ['--production'] + (['--workers', str(workers)] if workers else [])
+    env = dict(os.environ, LOG_SAMPLE_RATES=os.environ.get('LOG_SAMPLE_RATES', 'INFO=0'))
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.1)
+        if process.poll() is not None:
+            break
+    process.kill()
+    raise RuntimeError("simple_app did not become ready")
+
+def drive(port, method, path, body, concurrency, duration):
+    """Hammer one endpoint from concurrency threads for duration seconds"""
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'} if payload else {}
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local = []
+        local_errors = 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            local.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        return {'requests': 0, 'errors': errors[0], 'rps': 0.0}
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99)
+    }
+
+def run_load(concurrency_levels, duration, production=False, workers=None):
+    """HTTP load test against a locally started simple_app"""
+    port = free_port()
+    process = start_server(port, production, workers)
+    scenarios = {
+        'predict': ('POST', '/predict', SAMPLE_RECORD),
+        'chatbot': ('POST', '/chatbot', {'message': SAMPLE_MESSAGES[0]}),
+        'health': ('GET', '/health', None),
+    }
+    results = {}
+    try:
+        for name, (method, path, body) in scenarios.items():
+            for concurrency in concurrency_levels:
+                key = f"{name}@{concurrency}"
+                results[key] = drive(port, method, path, body, concurrency, duration)
+                result = results[key]
+                print(f"   {key:<16} {result['rps']:>9.0f} req/s  p50 {result.get('p50_ms', 0):6.2f}ms  "
+                      f"p95 {result.get('p95_ms', 0):6.2f}ms  p99 {result.get('p99_ms', 0):6.2f}ms  "
+                      f"errors {result['errors']}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return results
+
+# For each metric, whether a larger value is better
+METRIC_DIRECTIONS = {'ns_per_op': False, 'rps': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False}
+
+def compare(results, baseline, threshold):
+    """List regressions of results against baseline past threshold percent"""
+    regressions = []
+    for section in ('micro', 'load'):
+        for name, metrics in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            for metric, higher_is_better in METRIC_DIRECTIONS.items():
+                if metric not in metrics or not previous.get(metric):
+                    continue
+                change = (metrics[metric] - previous[metric]) / previous[metric] * 100
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(f"{section}/{name} {metric}: {previous[metric]:.4g} -> {metrics[metric]:.4g} "
+                                       f"({change:+.1f}%)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Crop Recommendation System benchmarks')
+    parser.add_argument('suites', nargs='*', choices=['micro', 'load'], default=['micro', 'load'])
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent')
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per load scenario')
+    parser.add_argument('--production', action='store_true', help='Load-test the prefork production server')
+    parser.add_argument('--workers', type=int, help='Workers for --production')
+    args = parser.parse_args(argv)
+
+    results = {'meta': {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }}
+    if 'micro' in args.suites:
+        print("⏱️  Micro-benchmarks")
+        results['micro'] = run_micro()
+    if 'load' in args.suites:
+        print("🚀 Load test")
+        levels = [int(level) for level in args.concurrency.split(',')]
+        results['load'] = run_load(levels, args.duration, args.production, args.workers)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) past {args.threshold}%:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"✅ No regressions past {args.threshold}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
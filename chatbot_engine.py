@@ -0,0 +1,469 @@
+"""
+AI Farming Assistant for the Crop Recommendation System
+Knowledge base plus an intent index built once at import: one compiled regex
+finds every keyword in a message in a single pass and every response body is
+pre-rendered, so answering a message is a handful of dict lookups.
+"""
+
+import re
+
+# AI Farming Assistant Knowledge Base
+FARMING_KNOWLEDGE = {
+    'crops': {
+        'rice': {
+            'soil': 'Clay or loamy soil with good water retention',
+            'climate': 'Warm, humid climate with temperatures 20-35°C',
+            'water': 'Requires flooding or consistent moisture',
+            'fertilizer': 'High nitrogen, moderate phosphorus and potassium',
+            'season': 'Monsoon season (June-October)',
+            'tips': 'Maintain 2-5cm water level, transplant after 25-30 days'
+        },
+        'wheat': {
+            'soil': 'Well-drained loamy soil with pH 6.0-7.5',
+            'climate': 'Cool, dry climate with temperatures 15-25°C',
+            'water': 'Moderate water requirement, avoid waterlogging',
+            'fertilizer': 'Balanced NPK with emphasis on nitrogen',
+            'season': 'Winter season (November-April)',
+            'tips': 'Sow after monsoon, harvest when grain moisture is 20-25%'
+        },
+        'maize': {
+            'soil': 'Well-drained fertile soil with pH 5.8-8.0',
+            'climate': 'Warm climate with temperatures 21-27°C',
+            'water': 'Regular watering, especially during tasseling',
+            'fertilizer': 'High nitrogen requirement, split application',
+            'season': 'Kharif (June-October) and Rabi (November-April)',
+            'tips': 'Plant after soil temperature reaches 16°C'
+        },
+        'cotton': {
+            'soil': 'Deep, well-drained black cotton soil',
+            'climate': 'Hot climate with temperatures 21-30°C',
+            'water': 'Moderate water, avoid excess moisture',
+            'fertilizer': 'Balanced NPK with micronutrients',
+            'season': 'Kharif season (May-October)',
+            'tips': 'Requires 180-200 frost-free days'
+        }
+    },
+    'soil_management': {
+        'sandy': {
+            'characteristics': 'Good drainage, low water retention, low fertility',
+            'improvements': 'Add organic matter, compost, cover crops',
+            'suitable_crops': 'Carrots, radish, potatoes, groundnuts',
+            'fertilizer': 'Frequent light applications, organic fertilizers'
+        },
+        'clay': {
+            'characteristics': 'Poor drainage, high water retention, high fertility',
+            'improvements': 'Add sand, organic matter, improve drainage',
+            'suitable_crops': 'Rice, wheat, sugarcane, cotton',
+            'fertilizer': 'Less frequent, heavy applications'
+        },
+        'loamy': {
+            'characteristics': 'Ideal soil, good drainage and retention',
+            'improvements': 'Maintain organic matter, regular testing',
+            'suitable_crops': 'Most crops grow well',
+            'fertilizer': 'Balanced application based on crop needs'
+        }
+    },
+    'irrigation': {
+        'drip': {
+            'description': 'Water delivered directly to plant roots',
+            'advantages': 'Water efficient, reduces weeds, precise control',
+            'suitable_for': 'Vegetables, fruits, cash crops',
+            'cost': 'High initial, low operational'
+        },
+        'sprinkler': {
+            'description': 'Water sprayed over crops like rainfall',
+            'advantages': 'Good coverage, suitable for various terrains',
+            'suitable_for': 'Field crops, lawns, orchards',
+            'cost': 'Moderate initial and operational'
+        },
+        'flood': {
+            'description': 'Field flooded with water',
+            'advantages': 'Simple, low cost, suitable for rice',
+            'suitable_for': 'Rice, sugarcane',
+            'cost': 'Low initial, high water usage'
+        }
+    },
+    'fertilizers': {
+        'organic': {
+            'types': 'Compost, manure, vermicompost, green manure',
+            'benefits': 'Improves soil structure, slow release, eco-friendly',
+            'application': 'Apply before planting, mix with soil',
+            'crops': 'All crops, especially vegetables and fruits'
+        },
+        'chemical': {
+            'types': 'NPK, urea, DAP, potash',
+            'benefits': 'Quick results, precise nutrient control',
+            'application': 'Follow soil test recommendations',
+            'crops': 'Field crops, high-yield varieties'
+        },
+        'bio': {
+            'types': 'Rhizobium, Azotobacter, PSB, KSB',
+            'benefits': 'Enhance nutrient availability, eco-friendly',
+            'application': 'Seed treatment or soil application',
+            'crops': 'Legumes, cereals, all crops'
+        }
+    }
+}
+
+# Alternative names that map onto a FARMING_KNOWLEDGE['crops'] key
+CROP_ALIASES = {
+    'corn': 'maize',
+}
+
+# Response templates for entries of each knowledge category
+CROP_TEMPLATE = """🌾 **{title} Cultivation Guide:**
+
+**Soil Requirements:** {soil}
+**Climate:** {climate}
+**Water Needs:** {water}
+**Fertilizer:** {fertilizer}
+**Growing Season:** {season}
+
+💡 **Pro Tip:** {tips}
+
+Would you like specific advice on any aspect of {name} cultivation?"""
+
+SOIL_TEMPLATE = """🌱 **{title} Soil Management:**
+
+**Characteristics:** {characteristics}
+**Improvements:** {improvements}
+**Suitable Crops:** {suitable_crops}
+**Fertilizer Strategy:** {fertilizer}
+
+Need help with specific soil problems?"""
+
+IRRIGATION_TEMPLATE = """💧 **{title} Irrigation System:**
+
+**How it works:** {description}
+**Advantages:** {advantages}
+**Best for:** {suitable_for}
+**Cost consideration:** {cost}
+
+Would you like installation or maintenance tips?"""
+
+FERTILIZER_TEMPLATE = """🌿 **{title} Fertilizers:**
+
+**Types:** {types}
+**Benefits:** {benefits}
+**Application:** {application}
+**Best for:** {crops}
+
+Need specific application rates or timing advice?"""
+
+# Fixed responses for questions without a specific knowledge entry
+SOIL_GENERAL_RESPONSE = """🌱 **Soil Management Tips:**
+
+**Know Your Soil Type:**
+• Sandy: Good drainage, needs organic matter
+• Clay: Rich but heavy, improve drainage
+• Loamy: Ideal balance of sand, silt, clay
+
+**General Improvements:**
+• Add compost regularly
+• Test pH levels (6.0-7.5 ideal for most crops)
+• Use cover crops
+• Avoid overworking wet soil
+
+Which soil type would you like specific advice for?"""
+
+IRRIGATION_GENERAL_RESPONSE = """💧 **Irrigation Methods Comparison:**
+
+**Drip Irrigation:** Most efficient, 90-95% efficiency
+**Sprinkler:** Good for field crops, 70-80% efficiency  
+**Flood/Furrow:** Traditional method, 40-60% efficiency
+
+**Water-Saving Tips:**
+• Water early morning or evening
+• Mulch around plants
+• Check soil moisture before watering
+• Use drought-resistant varieties
+
+Which irrigation method interests you most?"""
+
+FERTILIZER_GENERAL_RESPONSE = """🌿 **Fertilizer Guide:**
+
+**Organic Fertilizers:** Slow release, improve soil health
+**Chemical Fertilizers:** Quick results, precise control
+**Bio-fertilizers:** Enhance nutrient availability naturally
+
+**NPK Basics:**
+• N (Nitrogen): Leaf growth, green color
+• P (Phosphorus): Root development, flowering
+• K (Potassium): Disease resistance, fruit quality
+
+**Application Tips:**
+• Test soil before applying
+• Follow recommended doses
+• Apply at right growth stages
+
+Which type of fertilizer would you like to know more about?"""
+
+PEST_RESPONSE = """🐛 **Integrated Pest Management (IPM):**
+
+**Prevention First:**
+• Crop rotation
+• Resistant varieties
+• Proper spacing
+• Clean cultivation
+
+**Natural Control:**
+• Beneficial insects (ladybugs, spiders)
+• Neem oil spray
+• Companion planting
+• Pheromone traps
+
+**Chemical Control (Last Resort):**
+• Use only when necessary
+• Follow label instructions
+• Rotate different chemicals
+• Protect beneficial insects
+
+**Common Issues:**
+• Aphids: Use neem oil or ladybugs
+• Fungal diseases: Improve air circulation
+• Caterpillars: Bt spray or hand picking
+
+What specific pest problem are you facing?"""
+
+WEATHER_RESPONSE = """🌤️ **Weather & Climate Management:**
+
+**Monsoon Preparation:**
+• Ensure proper drainage
+• Choose flood-resistant varieties
+• Store seeds and fertilizers safely
+
+**Drought Management:**
+• Mulching to retain moisture
+• Drought-tolerant crops
+• Efficient irrigation systems
+• Rainwater harvesting
+
+**Temperature Stress:**
+• Shade nets for extreme heat
+• Windbreaks for cold protection
+• Proper planting timing
+
+**Weather Monitoring:**
+• Use weather apps/forecasts
+• Plan operations accordingly
+• Have contingency plans
+
+Are you dealing with any specific weather challenges?"""
+
+FARMING_RESPONSE = """🚜 **Smart Farming Practices:**
+
+**Planning Phase:**
+• Soil testing
+• Crop selection based on climate
+• Market research
+• Resource planning
+
+**Execution:**
+• Quality seeds/seedlings
+• Proper spacing
+• Timely operations
+• Record keeping
+
+**Technology Integration:**
+• Weather monitoring
+• Soil sensors
+• Precision agriculture
+• Mobile apps for guidance
+
+**Sustainability:**
+• Crop rotation
+• Organic practices
+• Water conservation
+• Biodiversity preservation
+
+**Success Factors:**
+• Continuous learning
+• Networking with other farmers
+• Government scheme utilization
+• Market linkages
+
+What specific aspect of farming would you like to explore?"""
+
+RECOMMEND_RESPONSE = """🎯 **Crop Recommendation Service:**
+
+I can help you choose the best crop based on your conditions! 
+
+**For personalized recommendations, please use the main form above with:**
+• Soil nutrients (N, P, K levels)
+• Temperature and humidity
+• pH level
+• Expected rainfall
+
+**Quick Guidelines:**
+• **High temperature + humidity:** Rice, sugarcane
+• **Moderate temperature:** Wheat, maize
+• **Low rainfall:** Cotton, millet
+• **High rainfall:** Rice, jute
+
+**Factors to Consider:**
+• Local market demand
+• Your experience level
+• Available resources
+• Government support schemes
+
+Would you like to fill the recommendation form above, or do you have specific conditions to discuss?"""
+
+DEFAULT_RESPONSE = """🌱 **I'm here to help with your farming questions!**
+
+I can assist you with:
+• 🌾 **Crop cultivation** (rice, wheat, maize, cotton, etc.)
+• 🌱 **Soil management** (sandy, clay, loamy soils)
+• 💧 **Irrigation systems** (drip, sprinkler, flood)
+• 🌿 **Fertilizers** (organic, chemical, bio-fertilizers)
+• 🐛 **Pest & disease management**
+• 🌤️ **Weather & climate adaptation**
+• 🎯 **Crop recommendations** (use the form above)
+
+**Example questions you can ask:**
+• "How to grow rice in clay soil?"
+• "Best irrigation for vegetables?"
+• "Organic fertilizers for tomatoes?"
+• "How to manage aphids naturally?"
+
+What would you like to know about farming?"""
+
+# Intents in the order they are tried. A message belongs to the first intent
+# whose trigger keywords it contains; 'keys' then picks the knowledge entry by
+# the first key whose keywords appear, falling back to 'general'.
+INTENTS = [
+    {
+        'name': 'crops',
+        'triggers': list(FARMING_KNOWLEDGE['crops']) + list(CROP_ALIASES),
+        'keys': [
+            (crop, [crop] + [alias for alias, target in CROP_ALIASES.items() if target == crop])
+            for crop in FARMING_KNOWLEDGE['crops']
+        ],
+        'template': CROP_TEMPLATE,
+        'general': None
+    },
+    {
+        'name': 'soil_management',
+        'triggers': ['soil', 'sandy', 'clay', 'loamy', 'fertility'],
+        'keys': [('sandy', ['sandy']), ('clay', ['clay']), ('loamy', ['loamy'])],
+        'template': SOIL_TEMPLATE,
+        'general': SOIL_GENERAL_RESPONSE
+    },
+    {
+        'name': 'irrigation',
+        'triggers': ['irrigation', 'watering', 'drip', 'sprinkler', 'water'],
+        'keys': [('drip', ['drip']), ('sprinkler', ['sprinkler']), ('flood', ['flood'])],
+        'template': IRRIGATION_TEMPLATE,
+        'general': IRRIGATION_GENERAL_RESPONSE
+    },
+    {
+        'name': 'fertilizers',
+        'triggers': ['fertilizer', 'fertiliser', 'nutrient', 'npk', 'organic', 'compost'],
+        'keys': [('organic', ['organic']), ('chemical', ['chemical', 'npk']), ('bio', ['bio'])],
+        'template': FERTILIZER_TEMPLATE,
+        'general': FERTILIZER_GENERAL_RESPONSE
+    },
+    {
+        'name': 'pest',
+        'triggers': ['pest', 'disease', 'insect', 'fungus', 'bug'],
+        'keys': [],
+        'general': PEST_RESPONSE
+    },
+    {
+        'name': 'weather',
+        'triggers': ['weather', 'climate', 'rain', 'drought', 'temperature'],
+        'keys': [],
+        'general': WEATHER_RESPONSE
+    },
+    {
+        'name': 'farming',
+        'triggers': ['farming', 'agriculture', 'cultivation', 'growing'],
+        'keys': [],
+        'general': FARMING_RESPONSE
+    },
+    {
+        'name': 'recommend',
+        'triggers': ['recommend', 'suggestion', 'best crop', 'which crop'],
+        'keys': [],
+        'general': RECOMMEND_RESPONSE
+    },
+]
+
+def trie_pattern(words):
+    """
+    Build a regex alternation factored by common prefixes
+    Each position then costs one branch per character instead of one attempt
+    per keyword, so matching time stays flat as the vocabulary grows
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional group so the longest keyword wins at each position
+        return '(?:' + body + ')?' if '' in node else body
+
+    return render(trie)
+
+def build_intent_index(intents=INTENTS, knowledge=FARMING_KNOWLEDGE):
+    """
+    Compile the keyword matcher and pre-render every response body
+    Returns (pattern, prefixes, triggers, keys, responses) used by match_intent
+    """
+    triggers = {}
+    keys = {}
+    responses = {('default', None): DEFAULT_RESPONSE}
+    for intent_index, intent in enumerate(intents):
+        for keyword in intent['triggers']:
+            triggers.setdefault(keyword, set()).add(intent_index)
+        for key_index, (key, keywords) in enumerate(intent['keys']):
+            for keyword in keywords:
+                keys.setdefault(keyword, []).append((intent_index, key_index))
+            entry = knowledge[intent['name']][key]
+            responses[(intent['name'], key)] = intent['template'].format(title=key.title(), name=key, **entry)
+        responses[(intent['name'], None)] = intent['general']
+
+    # A lookahead over the keyword trie reports the longest keyword starting at
+    # every position; shorter keywords starting there are always prefixes of it
+    vocabulary = sorted(set(triggers) | set(keys), key=len, reverse=True)
+    pattern = re.compile('(?=(' + trie_pattern(vocabulary) + '))')
+    prefixes = {
+        keyword: tuple(other for other in vocabulary if keyword.startswith(other))
+        for keyword in vocabulary
+    }
+    return pattern, prefixes, triggers, keys, responses
+
+KEYWORD_PATTERN, KEYWORD_PREFIXES, KEYWORD_TRIGGERS, KEYWORD_KEYS, RESPONSES = build_intent_index()
+
+def match_intent(message):
+    """
+    Map a message to its (intent, knowledge key) pair
+    The key is None for an intent's general answer; unmatched messages map to
+    ('default', None)
+    """
+    present = set()
+    for match in KEYWORD_PATTERN.finditer(message.lower()):
+        present.update(KEYWORD_PREFIXES[match.group(1)])
+
+    intent_index = min((index for keyword in present for index in KEYWORD_TRIGGERS.get(keyword, ())), default=None)
+    if intent_index is None:
+        return 'default', None
+
+    key_index = min(
+        (key for keyword in present for index, key in KEYWORD_KEYS.get(keyword, ()) if index == intent_index),
+        default=None
+    )
+    intent = INTENTS[intent_index]
+    return intent['name'], None if key_index is None else intent['keys'][key_index][0]
+
+def get_chatbot_response(message):
+    """
+    Generate AI-powered farming assistant responses based on user queries
+    """
+    return RESPONSES[match_intent(message)]
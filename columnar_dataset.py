@@ -0,0 +1,281 @@
+"""
+Binary columnar dataset format for the Crop Recommendation System
+A .cropcol file stores training rows as float32 feature columns with
+dictionary-encoded crop labels, so loading it is a memory map instead of
+parsing text.
+
+Layout:
+    header   HEADER_SIZE bytes: magic, JSON schema length, JSON schema
+             (columns, dtypes, label dictionary, committed row count)
+    blocks   repeated: block magic, row count, then every feature column
+             as rows float32 values, then rows uint8 label codes
+
+Appends write a new block at the end of the file and then rewrite the
+header in place; the header row count is the commit point, so a torn append
+is ignored by readers. A file with a single block maps as one (rows, 7)
+array without copying; compact() merges blocks back into one.
+
+Usage:
+    python columnar_dataset.py convert crop_recommendation.csv crop_recommendation.cropcol
+    python columnar_dataset.py append crop_recommendation.cropcol new_rows.csv
+    python columnar_dataset.py info crop_recommendation.cropcol
+    python columnar_dataset.py compact crop_recommendation.cropcol
+"""
+
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from crop_engine import FEATURE_FIELDS
+
+MAGIC = b'CROPCOL1'
+BLOCK_MAGIC = b'CBLK'
+FORMAT_VERSION = 1
+# Fixed header size leaves room for the label dictionary to grow in place
+HEADER_SIZE = 4096
+BLOCK_HEADER = struct.Struct('<4sI8x')
+FEATURE_DTYPE = np.dtype('<f4')
+LABEL_DTYPE = np.dtype('u1')
+# uint8 codes; the dataset has 22 crops
+MAX_LABELS = 256
+CSV_CHUNK_ROWS = 1_000_000
+
+def is_columnar(path):
+    """True when path starts with the .cropcol magic bytes"""
+    try:
+        with open(path, 'rb') as handle:
+            return handle.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def _block_size(rows):
+    """Bytes taken by a block, padded so the next block stays 8-byte aligned"""
+    size = BLOCK_HEADER.size + rows * len(FEATURE_FIELDS) * FEATURE_DTYPE.itemsize + rows * LABEL_DTYPE.itemsize
+    return size + (-size) % 8
+
+def read_header(handle):
+    handle.seek(0)
+    raw = handle.read(HEADER_SIZE)
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a columnar crop dataset")
+    (length,) = struct.unpack_from('<I', raw, len(MAGIC))
+    header = json.loads(raw[len(MAGIC) + 4:len(MAGIC) + 4 + length].decode('utf-8'))
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version {header['format_version']}")
+    return header
+
+def header_bytes(header):
+    """The fixed-size encoded header; raises when the schema no longer fits"""
+    payload = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    if len(MAGIC) + 4 + len(payload) > HEADER_SIZE:
+        raise ValueError("Columnar header is full (too many distinct labels)")
+    return MAGIC + struct.pack('<I', len(payload)) + payload.ljust(HEADER_SIZE - len(MAGIC) - 4, b'\0')
+
+def write_header(handle, header):
+    encoded = header_bytes(header)
+    handle.seek(0)
+    handle.write(encoded)
+
+def new_header():
+    return {
+        'format_version': FORMAT_VERSION,
+        'columns': list(FEATURE_FIELDS),
+        'feature_dtype': FEATURE_DTYPE.str,
+        'label_dtype': LABEL_DTYPE.str,
+        'labels': [],
+        'rows': 0,
+        'blocks': 0,
+        'data_end': HEADER_SIZE,
+    }
+
+def encode_labels(header, labels):
+    """uint8 codes for labels, adding unseen labels to the header dictionary"""
+    dictionary = header['labels']
+    index = {label: code for code, label in enumerate(dictionary)}
+    codes = np.empty(len(labels), dtype=LABEL_DTYPE)
+    for row, label in enumerate(labels):
+        code = index.get(label)
+        if code is None:
+            if len(dictionary) >= MAX_LABELS:
+                raise ValueError(f"More than {MAX_LABELS} distinct labels")
+            code = index[label] = len(dictionary)
+            dictionary.append(label)
+        codes[row] = code
+    return codes
+
+def append_rows(path, X, labels):
+    """
+    Append rows to a columnar file, creating it when missing
+    Only the new block and the header are written
+    """
+    X = np.asarray(X, dtype=FEATURE_DTYPE).reshape(-1, len(FEATURE_FIELDS))
+    if len(X) != len(labels):
+        raise ValueError("X and labels must have the same number of rows")
+    if not os.path.exists(path):
+        with open(path, 'wb') as handle:
+            write_header(handle, new_header())
+    with open(path, 'r+b') as handle:
+        header = read_header(handle)
+        if header['columns'] != list(FEATURE_FIELDS):
+            raise ValueError(f"{path} has columns {header['columns']}, expected {FEATURE_FIELDS}")
+        codes = encode_labels(header, labels)
+        # Fail before touching the file if the grown dictionary does not fit
+        header_bytes(header)
+        if len(X):
+            # Overwrite anything a torn append left behind the committed data
+            handle.seek(header['data_end'])
+            handle.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(X)))
+            handle.write(np.ascontiguousarray(X.T).tobytes())
+            handle.write(codes.tobytes())
+            handle.write(b'\0' * ((-handle.tell()) % 8))
+            handle.truncate()
+            handle.flush()
+            os.fsync(handle.fileno())
+            header['rows'] += len(X)
+            header['blocks'] += 1
+            header['data_end'] = handle.tell()
+        # Commit point: readers only see rows counted in the header
+        write_header(handle, header)
+        handle.flush()
+        os.fsync(handle.fileno())
+    return header['rows']
+
+class ColumnarDataset:
+    """Memory-mapped view of a .cropcol file"""
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self.header = read_header(handle)
+        self.columns = self.header['columns']
+        self.dictionary = np.array(self.header['labels'], dtype=object)
+        self.blocks = []
+        if self.header['rows'] == 0:
+            return
+        if mmap:
+            data = np.memmap(path, dtype=np.uint8, mode='r', shape=(self.header['data_end'],))
+        else:
+            with open(path, 'rb') as handle:
+                data = np.frombuffer(handle.read(self.header['data_end']), dtype=np.uint8)
+        offset = HEADER_SIZE
+        for _ in range(self.header['blocks']):
+            magic, rows = BLOCK_HEADER.unpack_from(data, offset)
+            if magic != BLOCK_MAGIC:
+                raise ValueError(f"Corrupt block at byte {offset} of {path}")
+            start = offset + BLOCK_HEADER.size
+            width = rows * len(self.columns) * FEATURE_DTYPE.itemsize
+            # Columns are stored one after another, so the block is a
+            # (columns, rows) array and its transpose is the (rows, columns) view
+            columns = data[start:start + width].view(FEATURE_DTYPE).reshape(len(self.columns), rows)
+            codes = data[start + width:start + width + rows].view(LABEL_DTYPE)
+            self.blocks.append((columns.T, codes))
+            offset += _block_size(rows)
+
+    def __len__(self):
+        return self.header['rows']
+
+    def features(self):
+        """(rows, columns) float32 array; zero-copy for a single-block file"""
+        if len(self.blocks) == 1:
+            return self.blocks[0][0]
+        if not self.blocks:
+            return np.empty((0, len(self.columns)), dtype=FEATURE_DTYPE)
+        return np.concatenate([features for features, _ in self.blocks])
+
+    def column(self, name):
+        """One feature column as a float32 array"""
+        index = self.columns.index(name)
+        if len(self.blocks) == 1:
+            return self.blocks[0][0][:, index]
+        return self.features()[:, index]
+
+    def label_codes(self):
+        if len(self.blocks) == 1:
+            return self.blocks[0][1]
+        return np.concatenate([codes for _, codes in self.blocks]) if self.blocks else np.empty(0, dtype=LABEL_DTYPE)
+
+    def labels(self):
+        """Decoded crop labels as an object array"""
+        return self.dictionary[self.label_codes()]
+
+def load_columnar(path, mmap=True):
+    return ColumnarDataset(path, mmap)
+
+def iter_csv_chunks(path, chunk_rows=CSV_CHUNK_ROWS):
+    """(X, labels) chunks of a CSV shaped like crop_recommendation.csv"""
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle)
+        rows, labels = [], []
+        for record in reader:
+            rows.append([float(record[field]) for field in FEATURE_FIELDS])
+            labels.append(record['label'])
+            if len(rows) >= chunk_rows:
+                yield np.array(rows, dtype=FEATURE_DTYPE), labels
+                rows, labels = [], []
+        if rows:
+            yield np.array(rows, dtype=FEATURE_DTYPE), labels
+
+def convert_csv(csv_path, output_path, chunk_rows=CSV_CHUNK_ROWS):
+    """Write a fresh columnar file from a CSV, one block per chunk_rows rows"""
+    temp_path = output_path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    with open(temp_path, 'wb') as handle:
+        write_header(handle, new_header())
+    rows = 0
+    for X, labels in iter_csv_chunks(csv_path, chunk_rows):
+        rows = append_rows(temp_path, X, labels)
+    os.replace(temp_path, output_path)
+    return rows
+
+def compact(path):
+    """Rewrite a multi-block file as a single block so it maps zero-copy"""
+    dataset = load_columnar(path, mmap=False)
+    temp_path = path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    with open(temp_path, 'wb') as handle:
+        write_header(handle, new_header())
+    append_rows(temp_path, dataset.features(), dataset.labels().tolist())
+    os.replace(temp_path, path)
+    return len(dataset)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert, append to and inspect .cropcol datasets')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help='Convert a CSV into a new columnar file')
+    convert.add_argument('csv')
+    convert.add_argument('output')
+    convert.add_argument('--chunk-rows', type=int, default=CSV_CHUNK_ROWS)
+    append = commands.add_parser('append', help='Append the rows of a CSV to a columnar file')
+    append.add_argument('dataset')
+    append.add_argument('csv')
+    append.add_argument('--chunk-rows', type=int, default=CSV_CHUNK_ROWS)
+    info = commands.add_parser('info', help='Show the schema of a columnar file')
+    info.add_argument('dataset')
+    compact_command = commands.add_parser('compact', help='Merge all blocks into one')
+    compact_command.add_argument('dataset')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        rows = convert_csv(args.csv, args.output, args.chunk_rows)
+        print(f"✅ Wrote {rows:,} rows to {args.output} ({os.path.getsize(args.output):,} bytes)")
+    elif args.command == 'append':
+        rows = 0
+        for X, labels in iter_csv_chunks(args.csv, args.chunk_rows):
+            rows = append_rows(args.dataset, X, labels)
+        print(f"✅ {args.dataset} now holds {rows:,} rows")
+    elif args.command == 'info':
+        print(json.dumps(load_columnar(args.dataset).header, indent=2))
+    elif args.command == 'compact':
+        rows = compact(args.dataset)
+        print(f"✅ Compacted {args.dataset} into one block of {rows:,} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
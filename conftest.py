@@ -0,0 +1,40 @@
+"""
+Shared pytest setup for the Crop Recommendation System
+simple_app reads its configuration from the environment at import time, so
+the scratch locations are set here, before any test module imports it: the
+app logs, captures, profiles and folds feedback into copies under a temporary
+directory instead of the files in the repository.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRATCH_DIR = tempfile.mkdtemp(prefix='crop-tests-')
+atexit.register(shutil.rmtree, SCRATCH_DIR, True)
+
+shutil.copy(os.path.join(BASE_DIR, 'crop_recommendation.csv'), SCRATCH_DIR)
+os.environ.update({
+    'LOG_FILE': os.path.join(SCRATCH_DIR, 'crop_recommendation.log'),
+    'CROP_DATASET_PATH': os.path.join(SCRATCH_DIR, 'crop_recommendation.csv'),
+    'CROP_MODEL_PATH': os.path.join(SCRATCH_DIR, 'crop_model.npz'),
+    'CROP_FEEDBACK_PATH': os.path.join(SCRATCH_DIR, 'feedback.cropcol'),
+    'CROP_ADMIN_TOKEN': 'test-admin-token',
+    'CROP_CAPTURE_PATH': os.path.join(SCRATCH_DIR, 'requests.jsonl'),
+    'CROP_PROFILE_DIR': os.path.join(SCRATCH_DIR, 'profiles'),
+    # No background model polling or feedback compaction during tests
+    'CROP_MODEL_POLL_SECONDS': '0',
+    'CROP_FEEDBACK_COMPACT_SECONDS': '0',
+})
+
+@pytest.fixture
+def client():
+    """Flask test client for simple_app"""
+    import simple_app
+    simple_app.app.config['TESTING'] = True
+    with simple_app.app.test_client() as test_client:
+        yield test_client
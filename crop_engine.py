@@ -0,0 +1,454 @@
+"""
+Prediction engines for the Crop Recommendation System
+Holds the rule-based engine and a data-driven nearest-centroid engine built
+from crop_recommendation.csv. Engines are built once at process start and
+only do array arithmetic per call.
+"""
+
+import csv
+import hashlib
+import logging
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Feature columns, in the order engines expect them
+FEATURE_FIELDS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+DATASET_PATH = os.environ.get('CROP_DATASET_PATH', os.path.join(BASE_DIR, 'crop_recommendation.csv'))
+MODEL_PATH = os.environ.get('CROP_MODEL_PATH', os.path.join(BASE_DIR, 'crop_model.npz'))
+
+# Simple rule-based crop recommendation system
+def simple_crop_recommendation(N, P, K, temperature, humidity, ph, rainfall):
+    """
+    Simple rule-based crop recommendation system
+    This is a fallback when the ML model is not available
+    """
+    # Simple rules based on typical crop requirements
+    if temperature < 15:
+        if humidity > 80:
+            return "rice", 0.85
+        else:
+            return "wheat", 0.80
+    elif temperature < 25:
+        if ph > 7:
+            return "maize", 0.82
+        elif rainfall > 200:
+            return "rice", 0.88
+        else:
+            return "chickpea", 0.75
+    elif temperature < 35:
+        if humidity > 70:
+            return "banana", 0.90
+        elif ph > 6.5:
+            return "mango", 0.85
+        else:
+            return "cotton", 0.78
+    else:
+        if rainfall > 150:
+            return "sugarcane", 0.80
+        else:
+            return "cotton", 0.75
+
+# Crop labels and confidences produced by the rule branches, in branch order
+RULE_OUTCOMES = [
+    ("rice", 0.85),
+    ("wheat", 0.80),
+    ("maize", 0.82),
+    ("rice", 0.88),
+    ("chickpea", 0.75),
+    ("banana", 0.90),
+    ("mango", 0.85),
+    ("cotton", 0.78),
+    ("sugarcane", 0.80),
+    ("cotton", 0.75),
+]
+
+def simple_crop_recommendation_batch(N, P, K, temperature, humidity, ph, rainfall):
+    """
+    Vectorized version of simple_crop_recommendation
+    Takes equal-length arrays and returns (crops, confidences) arrays that
+    match the scalar rules row for row
+    """
+    temperature = np.asarray(temperature, dtype=float)
+    humidity = np.asarray(humidity, dtype=float)
+    ph = np.asarray(ph, dtype=float)
+    rainfall = np.asarray(rainfall, dtype=float)
+
+    cold = temperature < 15
+    mild = ~cold & (temperature < 25)
+    warm = ~cold & ~mild & (temperature < 35)
+    hot = ~cold & ~mild & ~warm
+
+    # Same branch order as the scalar if/elif chain; the last branch is the default
+    conditions = [
+        cold & (humidity > 80),
+        cold,
+        mild & (ph > 7),
+        mild & (rainfall > 200),
+        mild,
+        warm & (humidity > 70),
+        warm & (ph > 6.5),
+        warm,
+        hot & (rainfall > 150),
+    ]
+    branch = np.select(conditions, np.arange(len(conditions)), default=len(conditions))
+
+    labels = np.array([crop for crop, _ in RULE_OUTCOMES], dtype=object)
+    scores = np.array([confidence for _, confidence in RULE_OUTCOMES], dtype=float)
+    return labels[branch], scores[branch]
+
+# Range checks of validate_input_data as (column, low, high, message), in order
+RANGE_CHECKS = [
+    (FEATURE_FIELDS.index('ph'), 0, 14, "pH value must be between 0 and 14"),
+    (FEATURE_FIELDS.index('humidity'), 0, 100, "Humidity value must be between 0 and 100"),
+    (FEATURE_FIELDS.index('temperature'), -50, 60, "Temperature value must be between -50 and 60 degrees Celsius"),
+    (FEATURE_FIELDS.index('rainfall'), 0, None, "Rainfall value must be non-negative"),
+]
+
+# Extra bounds on feedback samples, which change the centroid model rather
+# than just being scored: generous limits on the fields RANGE_CHECKS leaves open
+FEEDBACK_RANGE_CHECKS = [
+    (FEATURE_FIELDS.index('N'), 0, 1000, "N value must be between 0 and 1000"),
+    (FEATURE_FIELDS.index('P'), 0, 1000, "P value must be between 0 and 1000"),
+    (FEATURE_FIELDS.index('K'), 0, 1000, "K value must be between 0 and 1000"),
+    (FEATURE_FIELDS.index('rainfall'), 0, 5000, "Rainfall value must be between 0 and 5000"),
+]
+
+def apply_range_checks(features, errors, checks=RANGE_CHECKS):
+    """
+    Fill in range-check messages for rows of an (n, 7) array that passed so far
+    Checks run over whole columns, in the same order as validate_input_data
+    """
+    for column, low, high, message in checks:
+        values = features[:, column]
+        failed = values < low
+        if high is not None:
+            failed |= values > high
+        for row in np.flatnonzero(failed):
+            if errors[row] is None:
+                errors[row] = message
+    return errors
+
+# Compact typed record handed from request parsing to the engines
+SoilReading = namedtuple('SoilReading', FEATURE_FIELDS)
+
+class RecordSchema:
+    """
+    Compiled single-pass parser for one prediction record
+    Checks presence, converts each field with one float() call and applies
+    the range checks to the converted values, producing exactly the
+    validate_input_data messages. NaN and infinities count as non-numbers,
+    since they would pass every range check
+    """
+
+    def __init__(self, fields=FEATURE_FIELDS, range_checks=RANGE_CHECKS):
+        self.fields = tuple(fields)
+        self.range_checks = tuple(range_checks)
+
+    def parse(self, data):
+        """
+        Returns (reading, None, ()) for a valid record, otherwise
+        (None, message, fields) naming the fields that failed
+        """
+        missing_fields = [field for field in self.fields if field not in data]
+        if missing_fields:
+            return None, f"Missing required fields: {', '.join(missing_fields)}", tuple(missing_fields)
+
+        values = []
+        for field in self.fields:
+            try:
+                value = float(data[field])
+            except (ValueError, TypeError):
+                value = math.nan
+            if not math.isfinite(value):
+                return None, f"Invalid value for {field}: must be a number", (field,)
+            values.append(value)
+
+        for column, low, high, message in self.range_checks:
+            value = values[column]
+            if value < low or (high is not None and value > high):
+                return None, message, (self.fields[column],)
+
+        return SoilReading(*values), None, ()
+
+REQUEST_SCHEMA = RecordSchema()
+
+def validate_input_batch(records):
+    """
+    Validate a list of input records for batch prediction
+    Returns (features, errors): a float array of shape (n, 7) and a list with
+    the validate_input_data message for each invalid row (None for valid rows)
+    """
+    required_fields = FEATURE_FIELDS
+    features = np.full((len(records), len(required_fields)), np.nan)
+    errors = [None] * len(records)
+
+    # Presence and numeric checks need per-value float() to match the scalar path
+    for row, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[row] = "Each record must be a JSON object"
+            continue
+        missing_fields = [field for field in required_fields if field not in record]
+        if missing_fields:
+            errors[row] = f"Missing required fields: {', '.join(missing_fields)}"
+            continue
+        for col, field in enumerate(required_fields):
+            try:
+                value = float(record[field])
+            except (ValueError, TypeError):
+                value = math.nan
+            # NaN and infinities parse as floats but are no more usable than text
+            if not math.isfinite(value):
+                errors[row] = f"Invalid value for {field}: must be a number"
+                break
+            features[row, col] = value
+
+    apply_range_checks(features, errors)
+    return features, errors
+
+def validate_feedback_batch(records):
+    """
+    validate_input_batch for labelled feedback samples, which must also be
+    within FEEDBACK_RANGE_CHECKS
+    """
+    features, errors = validate_input_batch(records)
+    apply_range_checks(features, errors, FEEDBACK_RANGE_CHECKS)
+    return features, errors
+
+def read_dataset(path=DATASET_PATH):
+    """
+    Feature matrix and label array of a CSV shaped like crop_recommendation.csv
+    or of a .cropcol file, whose features are memory-mapped float32 columns
+    """
+    from columnar_dataset import is_columnar, load_columnar
+
+    if is_columnar(path):
+        dataset = load_columnar(path)
+        return dataset.features(), dataset.labels()
+    # The csv module keeps pandas (a slow import) off the server start path
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        rows = list(csv.DictReader(handle))
+    X = np.array([[float(row[field]) for field in FEATURE_FIELDS] for row in rows], dtype=float)
+    return X.reshape(-1, len(FEATURE_FIELDS)), np.array([row['label'] for row in rows], dtype=object)
+
+class RuleEngine:
+    """Engine wrapper around the rule-based recommendation functions"""
+
+    name = 'rule-based'
+    # Bump when the rules change so cached results and clients can tell
+    version = 'rules-1'
+    classes = np.array(sorted({crop for crop, _ in RULE_OUTCOMES}), dtype=object)
+
+    def predict(self, features):
+        """Score one row of FEATURE_FIELDS values, returns (crop, confidence)"""
+        return simple_crop_recommendation(*features)
+
+    def predict_batch(self, X):
+        """Score an (n, 7) array, returns (crops, confidences) arrays"""
+        X = np.asarray(X, dtype=float).reshape(-1, len(FEATURE_FIELDS))
+        return simple_crop_recommendation_batch(*X.T)
+
+    def predict_top_k(self, X, k=3):
+        """Rules only ever produce a single crop, so top-k has one column"""
+        crops, confidences = self.predict_batch(X)
+        return crops[:, None], confidences[:, None]
+
+# Decimal places of the model parameters that make up a centroid model version
+FINGERPRINT_DECIMALS = 8
+
+class CentroidEngine:
+    """
+    Nearest-centroid engine over standardized features
+    Class probabilities are a softmax over negative squared distances to the
+    per-crop centroids, so scoring a row is a single (n, 7) x (7, c) product.
+    """
+
+    name = 'centroid'
+
+    def __init__(self, classes, centroids, counts, mean, scale):
+        self.classes = np.asarray(classes, dtype=object)
+        self.centroids = np.asarray(centroids, dtype=float)
+        self.counts = np.asarray(counts, dtype=float)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self._prepare()
+
+    def _prepare(self):
+        """Precompute the standardized centroids used on every call"""
+        self._scaled_centroids = (self.centroids - self.mean) / self.scale
+        self._centroid_norms = (self._scaled_centroids ** 2).sum(axis=1)
+        self.version = self.fingerprint()
+
+    def fingerprint(self):
+        """
+        Content hash of the model parameters, the same in every process
+        Parameters are rounded first, so models that differ only by the order
+        samples were folded in (see updated) share a version
+        """
+        digest = hashlib.sha1()
+        digest.update('\n'.join(self.classes.astype(str)).encode('utf-8'))
+        for array in (self.centroids, self.counts, self.mean, self.scale):
+            digest.update(np.ascontiguousarray(np.round(array, FINGERPRINT_DECIMALS)).tobytes())
+        return 'centroid-' + digest.hexdigest()[:12]
+
+    @classmethod
+    def fit(cls, X, labels):
+        """
+        Build the engine from a feature matrix and matching crop labels
+        float32 (e.g. memory-mapped) features are used in place and
+        accumulated in float64
+        """
+        X = np.asarray(X)
+        if X.dtype.kind != 'f':
+            X = X.astype(float)
+        # Factorize through a dict; np.unique sorts every object label, which
+        # dominates fitting on large archives
+        labels = np.asarray(labels, dtype=object).tolist()
+        classes = sorted(set(labels))
+        codes = {label: code for code, label in enumerate(classes)}
+        inverse = np.fromiter(map(codes.__getitem__, labels), dtype=np.intp, count=len(labels))
+        counts = np.bincount(inverse, minlength=len(classes))
+        centroids = np.column_stack([
+            np.bincount(inverse, weights=X[:, column], minlength=len(classes)) for column in range(X.shape[1])
+        ])
+        centroids /= counts[:, None]
+        scale = X.std(axis=0, dtype=np.float64)
+        scale[scale == 0] = 1.0
+        return cls(classes, centroids, counts, X.mean(axis=0, dtype=np.float64), scale)
+
+    def updated(self, X, labels):
+        """
+        New engine with labelled rows folded in, without revisiting the data
+        it was fitted on. Class sums, the feature mean and the sum of squared
+        deviations (scale**2 * rows) are combined with those of the new rows,
+        so the cost depends only on the new rows and the number of classes.
+        Labels not seen before become new classes. Non-finite rows raise
+        ValueError, since one would poison the mean for every later call.
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, len(FEATURE_FIELDS))
+        labels = np.asarray(labels, dtype=object).tolist()
+        if not labels:
+            return self
+        if not np.isfinite(X).all():
+            raise ValueError("Samples must be finite numbers")
+        classes = sorted(set(self.classes.tolist()) | set(labels))
+        codes = {label: code for code, label in enumerate(classes)}
+        existing = np.fromiter(map(codes.__getitem__, self.classes.tolist()), dtype=np.intp, count=len(self.classes))
+        inverse = np.fromiter(map(codes.__getitem__, labels), dtype=np.intp, count=len(labels))
+
+        counts = np.zeros(len(classes))
+        counts[existing] = self.counts
+        sums = np.zeros((len(classes), X.shape[1]))
+        sums[existing] = self.centroids * self.counts[:, None]
+        counts += np.bincount(inverse, minlength=len(classes))
+        sums += np.column_stack([
+            np.bincount(inverse, weights=X[:, column], minlength=len(classes)) for column in range(X.shape[1])
+        ])
+
+        # Pairwise combination of mean and squared deviations (Chan et al.)
+        seen, added = self.counts.sum(), len(X)
+        total = seen + added
+        added_mean = X.mean(axis=0)
+        delta = added_mean - self.mean
+        mean = self.mean + delta * added / total
+        squares = self.scale ** 2 * seen + ((X - added_mean) ** 2).sum(axis=0) + delta ** 2 * seen * added / total
+        scale = np.sqrt(squares / total)
+        scale[scale == 0] = 1.0
+        return type(self)(classes, sums / counts[:, None], counts, mean, scale)
+
+    @classmethod
+    def from_csv(cls, path=DATASET_PATH):
+        """Build the engine from a crop_recommendation.csv-shaped CSV or .cropcol file"""
+        return cls.fit(*read_dataset(path))
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        """Load an engine saved with save()"""
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(
+                artifact['classes'].astype(object),
+                artifact['centroids'],
+                artifact['counts'],
+                artifact['mean'],
+                artifact['scale'],
+            )
+
+    def save(self, path=MODEL_PATH):
+        """Serialize the engine to a compact .npz artifact"""
+        np.savez(
+            path,
+            classes=self.classes.astype(str),
+            centroids=self.centroids,
+            counts=self.counts,
+            mean=self.mean,
+            scale=self.scale,
+        )
+
+    def predict_proba(self, X):
+        """Return an (n, classes) array of class probabilities"""
+        Z = (np.asarray(X, dtype=float).reshape(-1, len(FEATURE_FIELDS)) - self.mean) / self.scale
+        # Squared distances via |z|^2 - 2 z.c + |c|^2, then a stable softmax
+        distances = (Z ** 2).sum(axis=1)[:, None] - 2 * Z @ self._scaled_centroids.T + self._centroid_norms
+        logits = -0.5 * distances
+        logits -= logits.max(axis=1, keepdims=True)
+        weights = np.exp(logits)
+        return weights / weights.sum(axis=1, keepdims=True)
+
+    def predict(self, features):
+        """Score one row of FEATURE_FIELDS values, returns (crop, probability)"""
+        probabilities = self.predict_proba(features)[0]
+        best = int(probabilities.argmax())
+        return self.classes[best], float(probabilities[best])
+
+    def predict_batch(self, X):
+        """Score an (n, 7) array, returns (crops, probabilities) arrays"""
+        probabilities = self.predict_proba(X)
+        best = probabilities.argmax(axis=1)
+        return self.classes[best], probabilities[np.arange(len(best)), best]
+
+    def predict_top_k(self, X, k=3):
+        """Return (crops, probabilities) arrays of shape (n, k), best first"""
+        probabilities = self.predict_proba(X)
+        k = min(k, len(self.classes))
+        top = np.argsort(-probabilities, axis=1)[:, :k]
+        return self.classes[top], np.take_along_axis(probabilities, top, axis=1)
+
+def artifact_is_fresh(model_path=MODEL_PATH, dataset_path=DATASET_PATH):
+    """True when the model artifact exists and is at least as new as the dataset"""
+    return os.path.exists(model_path) and (
+        not os.path.exists(dataset_path) or os.path.getmtime(model_path) >= os.path.getmtime(dataset_path)
+    )
+
+def load_centroid_engine(model_path=MODEL_PATH, dataset_path=DATASET_PATH):
+    """
+    Load the centroid engine from its artifact, or build it from the CSV
+    The artifact is used when it exists and is at least as new as the dataset
+    """
+    if artifact_is_fresh(model_path, dataset_path):
+        logger.info("Loading centroid model from %s", model_path)
+        return CentroidEngine.load(model_path)
+    logger.info("Building centroid model from %s", dataset_path)
+    return CentroidEngine.from_csv(dataset_path)
+
+def load_engines():
+    """Build every available engine, keyed by engine name"""
+    engines = {RuleEngine.name: RuleEngine()}
+    try:
+        engines[CentroidEngine.name] = load_centroid_engine()
+    except Exception as e:
+        logger.warning("Centroid engine unavailable, using rules only: %s", e)
+    return engines
+
+if __name__ == '__main__':
+    # Build the serialized artifact so servers can skip reading the CSV
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    engine = CentroidEngine.from_csv(DATASET_PATH)
+    engine.save(MODEL_PATH)
+    logger.info("Saved centroid model with %d crops to %s", len(engine.classes), MODEL_PATH)
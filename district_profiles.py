@@ -0,0 +1,119 @@
+"""
+Gujarat district profiles for the Crop Recommendation System
+Profiles (climate, soil, water resources and agronomist-recommended crops) are
+read once from gujarat_districts.json. Engine recommendations, the state-wide
+summary and an ETag for every response are computed at load time, so serving
+a district is a dict lookup.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+
+import numpy as np
+
+from crop_engine import FEATURE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DISTRICTS_PATH = os.environ.get('CROP_DISTRICTS_PATH', os.path.join(BASE_DIR, 'gujarat_districts.json'))
+
+# Typical N, P, K for a soil fertility class: the quartiles of the training
+# data (low = 25th, medium = median, high = 75th percentile)
+FERTILITY_NPK = {
+    'low': (30.0, 25.5, 30.0),
+    'medium': (50.0, 40.0, 40.0),
+    'high': (70.0, 52.5, 55.0),
+}
+
+# Profiles give annual rainfall; the training data uses growing-season
+# rainfall, so spread the annual total over the four monsoon months
+MONSOON_MONTHS = 4
+
+TOP_CROPS = 5
+TOP_K = 3
+
+def profile_features(profile):
+    """Engine features for a district profile, in FEATURE_FIELDS order"""
+    N, P, K = FERTILITY_NPK.get(profile['soil']['fertility'], FERTILITY_NPK['medium'])
+    climate = profile['climate']
+    values = {
+        'N': N, 'P': P, 'K': K,
+        'temperature': float(climate['temp']),
+        'humidity': float(climate['humidity']),
+        'ph': float(profile['soil']['ph']),
+        'rainfall': float(climate['rainfall']) / MONSOON_MONTHS,
+    }
+    return [values[field] for field in FEATURE_FIELDS]
+
+def payload_etag(payload):
+    """Strong ETag derived from the canonical JSON of a response payload"""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:20]
+
+class DistrictRegistry:
+    """District profiles with precomputed engine recommendations and ETags"""
+
+    def __init__(self, profiles, engines):
+        self.names = list(profiles)
+        self._lookup = {name.lower(): name for name in self.names}
+        X = np.array([profile_features(profiles[name]) for name in self.names], dtype=float)
+
+        model_recommendations = {name: {} for name in self.names}
+        for engine_name, engine in engines.items():
+            crops, confidences = engine.predict_batch(X)
+            top_crops, top_probabilities = engine.predict_top_k(X, TOP_K)
+            for row, name in enumerate(self.names):
+                model_recommendations[name][engine_name] = {
+                    'recommended_crop': str(crops[row]),
+                    'confidence': float(confidences[row]),
+                    'top_crops': [
+                        {'crop': str(crop), 'probability': float(probability)}
+                        for crop, probability in zip(top_crops[row], top_probabilities[row])
+                    ]
+                }
+
+        self.details = {}
+        for row, name in enumerate(self.names):
+            self.details[name] = dict(
+                profiles[name],
+                district=name,
+                features=dict(zip(FEATURE_FIELDS, X[row].tolist())),
+                model_recommendations=model_recommendations[name]
+            )
+
+        crop_frequency = Counter(crop for name in self.names for crop in profiles[name]['recommended_crops'])
+        self.summary = {
+            'total_districts': len(self.names),
+            'top_crops': crop_frequency.most_common(TOP_CROPS),
+            'soil_types': dict(Counter(profiles[name]['soil']['type'] for name in self.names)),
+            'irrigation_methods': dict(Counter(profiles[name]['environment']['irrigation'] for name in self.names)),
+            'districts': {
+                name: {key: profiles[name][key] for key in ('climate', 'soil', 'environment', 'recommended_crops')}
+                for name in self.names
+            }
+        }
+
+        self.summary_etag = payload_etag(self.summary)
+        self.detail_etags = {name: payload_etag(detail) for name, detail in self.details.items()}
+
+    @classmethod
+    def from_json(cls, engines, path=DISTRICTS_PATH):
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.load(handle), engines)
+
+    def resolve(self, name):
+        """Canonical district name for a case-insensitive lookup, or None"""
+        return self._lookup.get(name.strip().lower())
+
+def load_district_registry(engines, path=DISTRICTS_PATH):
+    """Load the district registry, or None when the profiles file is unusable"""
+    try:
+        registry = DistrictRegistry.from_json(engines, path)
+    except Exception as e:
+        logger.warning("District profiles unavailable from %s: %s", path, e)
+        return None
+    logger.info("Loaded %d district profiles from %s", len(registry.names), path)
+    return registry
@@ -0,0 +1,50 @@
+"""
+Optional fast JSON for the Crop Recommendation System
+When orjson is installed, request.get_json() and jsonify() go through it
+instead of the standard library json module. Without orjson the app keeps
+Flask's default provider.
+"""
+
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to json for odd types"""
+
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Hand orjson's bytes straight to the response without a str round trip
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.options),
+            mimetype=self.mimetype
+        )
+
+def install_fast_json(app, enabled=True):
+    """Switch app to OrjsonProvider when enabled and orjson is importable"""
+    if not enabled:
+        return False
+    if orjson is None:
+        logger.info("orjson not installed, using the standard JSON provider")
+        return False
+    app.json = OrjsonProvider(app)
+    return True
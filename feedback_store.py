@@ -0,0 +1,197 @@
+"""
+Feedback store for the Crop Recommendation System
+Labelled samples reported by farmers (the seven features plus the crop they
+planted) are appended to a columnar log (see columnar_dataset.py). Each
+append writes one block and commits it through the header, so it costs the
+same however long the log is. compact() folds the log into the base dataset
+and starts a new, empty log.
+
+The log header carries a random log_id, so readers can tell a compacted and
+recreated log from one that merely grew. Appends and compaction take a lock
+file, so several worker processes can share one log.
+
+Usage:
+    python feedback_store.py info
+    python feedback_store.py compact
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+from columnar_dataset import (
+    append_rows,
+    is_columnar,
+    load_columnar,
+    new_header,
+    read_header,
+    write_header,
+)
+from crop_engine import BASE_DIR, DATASET_PATH, FEATURE_FIELDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serializes threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_PATH = os.environ.get('CROP_FEEDBACK_PATH', os.path.join(BASE_DIR, 'feedback.cropcol'))
+
+class FeedbackStore:
+    """Append-only log of labelled samples"""
+
+    def __init__(self, path=FEEDBACK_PATH):
+        self.path = path
+        self.pending_path = path + '.compacting'
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        """Hold the store lock against other threads and processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + '.lock', 'a') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _create(self):
+        header = new_header()
+        header['log_id'] = uuid.uuid4().hex
+        with open(self.path, 'wb') as handle:
+            write_header(handle, header)
+
+    def append(self, X, labels):
+        """Append samples; returns (log_id, rows in the log afterwards)"""
+        with self.locked():
+            if not os.path.exists(self.path):
+                self._create()
+            rows = append_rows(self.path, X, labels)
+            with open(self.path, 'rb') as handle:
+                return read_header(handle)['log_id'], rows
+
+    def position(self):
+        """(log_id, committed rows) of the current log, (None, 0) when there is none"""
+        try:
+            with open(self.path, 'rb') as handle:
+                header = read_header(handle)
+        except FileNotFoundError:
+            return None, 0
+        return header.get('log_id'), header['rows']
+
+    def read(self, start=0):
+        """(log_id, X, labels) of the committed samples from row start on"""
+        if not os.path.exists(self.path):
+            return None, np.empty((0, len(FEATURE_FIELDS))), np.empty(0, dtype=object)
+        log = load_columnar(self.path, mmap=False)
+        X = np.array(log.features()[start:], dtype=float)
+        return log.header.get('log_id'), X, log.labels()[start:]
+
+    def compact(self, dataset_path=DATASET_PATH):
+        """
+        Fold the logged samples into the dataset and start a new log
+        The log is first renamed aside with the dataset's current length
+        recorded in it, so a compaction interrupted at any point is finished
+        by the next call without duplicating rows. Returns the rows folded.
+        """
+        if not os.path.exists(self.path) and not os.path.exists(self.pending_path):
+            return 0
+        with self.locked():
+            if not os.path.exists(self.pending_path):
+                log_id, rows = self.position()
+                if not rows:
+                    return 0
+                with open(self.path, 'r+b') as handle:
+                    header = read_header(handle)
+                    header['fold_from'] = dataset_length(dataset_path)
+                    write_header(handle, header)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                os.replace(self.path, self.pending_path)
+            pending = load_columnar(self.pending_path, mmap=False)
+            fold_into_dataset(dataset_path, pending.header['fold_from'],
+                              pending.features(), pending.labels().tolist())
+            os.remove(self.pending_path)
+            return len(pending)
+
+def finite_samples(X, labels):
+    """
+    The samples whose features are all finite; logs written before feedback
+    was range-checked may hold others, which must not reach a model
+    """
+    X = np.asarray(X)
+    keep = np.isfinite(X).all(axis=1)
+    if keep.all():
+        return X, labels
+    logger.warning("Skipping %d non-finite feedback samples", int((~keep).sum()))
+    return X[keep], np.asarray(labels, dtype=object)[keep]
+
+def dataset_length(path):
+    """Committed rows of a .cropcol dataset, bytes of a CSV one"""
+    if is_columnar(path):
+        with open(path, 'rb') as handle:
+            return read_header(handle)['rows']
+    return os.path.getsize(path)
+
+def fold_into_dataset(path, fold_from, X, labels):
+    """Append samples to the dataset unless a previous attempt already did"""
+    X, labels = finite_samples(X, labels)
+    if is_columnar(path):
+        # The header is the commit point: either all rows landed or none did
+        if dataset_length(path) < fold_from + len(labels):
+            append_rows(path, X, labels)
+        return
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        columns = [column.strip() for column in next(csv.reader(handle))]
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    # Shortest text that reads back as the same float32 the log holds
+    for row, label in zip(np.asarray(X, dtype=np.float32), labels):
+        values = {field: np.format_float_positional(value, trim='-') for field, value in zip(FEATURE_FIELDS, row)}
+        values['label'] = label
+        writer.writerow([values[column] for column in columns])
+    with open(path, 'r+b') as handle:
+        # Drop whatever an interrupted attempt appended, then write the rows
+        handle.truncate(fold_from)
+        handle.seek(fold_from)
+        if fold_from:
+            handle.seek(fold_from - 1)
+            if handle.read(1) not in (b'\n', b'\r'):
+                handle.write(b'\n')
+        handle.write(output.getvalue().encode('utf-8'))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect and compact the crop feedback log')
+    parser.add_argument('command', choices=['info', 'compact'])
+    parser.add_argument('--feedback', default=FEEDBACK_PATH, help='Feedback log path')
+    parser.add_argument('--dataset', default=DATASET_PATH, help='Dataset the log is folded into')
+    args = parser.parse_args(argv)
+
+    store = FeedbackStore(args.feedback)
+    if args.command == 'info':
+        log_id, rows = store.position()
+        print(json.dumps({'path': args.feedback, 'log_id': log_id, 'rows': rows,
+                          'compaction_pending': os.path.exists(store.pending_path)}, indent=2))
+    else:
+        rows = store.compact(args.dataset)
+        print(f"✅ Folded {rows:,} feedback samples into {args.dataset}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+TF-IDF retrieval index over FARMING_KNOWLEDGE
+Every knowledge entry becomes one document. The index is precomputed (or
+loaded from disk) at startup; a query only tokenizes the message and multiplies
+a handful of sparse rows, so it stays sub-millisecond at thousands of entries.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from chatbot_engine import FARMING_KNOWLEDGE, RESPONSES
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.environ.get('KNOWLEDGE_INDEX_PATH', os.path.join(BASE_DIR, 'knowledge_index.npz'))
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Common words that carry no signal for matching farming questions
+STOP_WORDS = frozenset(
+    'a an and are as at be best can do for from how i in is it my of on or should the to what which with you your'.split()
+)
+
+def tokenize(text):
+    """Lowercase word tokens without stop words"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+def knowledge_fingerprint(knowledge):
+    """Stable hash of the knowledge base, used to detect stale index files"""
+    return hashlib.sha1(json.dumps(knowledge, sort_keys=True).encode('utf-8')).hexdigest()
+
+def entry_text(category, key, entry):
+    """Searchable text of one entry; the entry name is repeated to weight it up"""
+    name = key.replace('_', ' ')
+    return ' '.join([name, name, category.replace('_', ' ')] + [str(value) for value in entry.values()])
+
+def render_entry(category, key, entry):
+    """Response body for an entry, pre-rendered by chatbot_engine when available"""
+    rendered = RESPONSES.get((category, key))
+    if rendered is not None:
+        return rendered
+    lines = [f"**{key.replace('_', ' ').title()}**", '']
+    lines += [f"**{field.replace('_', ' ').title()}:** {value}" for field, value in entry.items()]
+    return '\n'.join(lines)
+
+class KnowledgeIndex:
+    """
+    Sparse TF-IDF matrix over knowledge entries with cosine top-k lookup
+    The matrix is stored term-major (terms x entries) so a query only slices
+    the rows of its own terms.
+    """
+
+    def __init__(self, entries, vocabulary, idf, term_matrix, fingerprint, knowledge=FARMING_KNOWLEDGE):
+        self.entries = entries
+        self.vocabulary = vocabulary
+        # scipy is imported only once an index is actually needed
+        from scipy import sparse
+
+        self.idf = np.asarray(idf, dtype=float)
+        self.term_matrix = sparse.csr_matrix(term_matrix)
+        self.fingerprint = fingerprint
+        self.bodies = {
+            (category, key): render_entry(category, key, knowledge.get(category, {}).get(key, {}))
+            for category, key in entries
+        }
+
+    @classmethod
+    def build(cls, knowledge=FARMING_KNOWLEDGE):
+        """Build the index from a knowledge dict of {category: {key: fields}}"""
+        from scipy import sparse
+
+        entries = []
+        documents = []
+        for category, items in knowledge.items():
+            for key, entry in items.items():
+                entries.append((category, key))
+                documents.append(Counter(tokenize(entry_text(category, key, entry))))
+
+        vocabulary = {term: index for index, term in enumerate(sorted(set().union(*documents)))}
+        document_frequency = np.zeros(len(vocabulary))
+        rows, cols, values = [], [], []
+        for doc_index, counts in enumerate(documents):
+            for term, count in counts.items():
+                term_index = vocabulary[term]
+                document_frequency[term_index] += 1
+                rows.append(term_index)
+                cols.append(doc_index)
+                values.append(1.0 + math.log(count))
+
+        # Smoothed idf, then L2-normalise every document column
+        idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1.0
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(vocabulary), len(documents)))
+        matrix = sparse.diags(idf) @ matrix
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+        norms[norms == 0] = 1.0
+        matrix = matrix @ sparse.diags(1.0 / norms)
+        return cls(entries, vocabulary, idf, matrix, knowledge_fingerprint(knowledge), knowledge)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Load an index saved with save()"""
+        from scipy import sparse
+
+        with np.load(path, allow_pickle=False) as artifact:
+            matrix = sparse.csr_matrix(
+                (artifact['data'], artifact['indices'], artifact['indptr']),
+                shape=tuple(artifact['shape'])
+            )
+            terms = artifact['terms'].tolist()
+            entries = [tuple(entry) for entry in artifact['entries'].tolist()]
+            return cls(entries, {term: index for index, term in enumerate(terms)}, artifact['idf'], matrix,
+                       str(artifact['fingerprint']))
+
+    def save(self, path=INDEX_PATH):
+        """Persist the index so later startups skip the build"""
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(
+            path,
+            data=self.term_matrix.data,
+            indices=self.term_matrix.indices,
+            indptr=self.term_matrix.indptr,
+            shape=np.array(self.term_matrix.shape),
+            terms=np.array(terms, dtype=str),
+            entries=np.array(self.entries, dtype=str).reshape(-1, 2),
+            idf=self.idf,
+            fingerprint=np.array(self.fingerprint)
+        )
+
+    def search(self, message, top_k=3):
+        """Return up to top_k (category, key, score) tuples, best first"""
+        counts = Counter(term for term in tokenize(message) if term in self.vocabulary)
+        if not counts:
+            return []
+        term_indices = [self.vocabulary[term] for term in counts]
+        weights = np.array([1.0 + math.log(count) for count in counts.values()]) * self.idf[term_indices]
+        weights /= np.linalg.norm(weights)
+        # Accumulate straight from the CSR arrays; a term row never repeats an entry
+        matrix = self.term_matrix
+        scores = np.zeros(matrix.shape[1])
+        for term_index, weight in zip(term_indices, weights):
+            start, end = matrix.indptr[term_index], matrix.indptr[term_index + 1]
+            scores[matrix.indices[start:end]] += weight * matrix.data[start:end]
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(*self.entries[index], float(scores[index])) for index in best if scores[index] > 0]
+
+def load_knowledge_index(path=INDEX_PATH, knowledge=FARMING_KNOWLEDGE):
+    """Load the persisted index if it matches the knowledge base, else rebuild it"""
+    fingerprint = knowledge_fingerprint(knowledge)
+    if os.path.exists(path):
+        try:
+            index = KnowledgeIndex.load(path)
+            if index.fingerprint == fingerprint:
+                logger.info("Loaded knowledge index from %s", path)
+                return index
+            logger.info("Knowledge index at %s is stale, rebuilding", path)
+        except Exception as e:
+            logger.warning("Could not load knowledge index from %s: %s", path, e)
+    return KnowledgeIndex.build(knowledge)
+
+if __name__ == '__main__':
+    # Precompute the index so servers start without rebuilding it
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = KnowledgeIndex.build(FARMING_KNOWLEDGE)
+    index.save(INDEX_PATH)
+    logger.info("Saved knowledge index with %d entries to %s", len(index.entries), INDEX_PATH)
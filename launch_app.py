@@ -3,52 +3,218 @@ Crop Recommendation System Launcher
 Automatically starts the backend server and opens the frontend
 """
 
+import argparse
+import http.client
+import logging
+import os
+import signal
+import socket
 import subprocess
 import webbrowser
 import time
-import os
 import sys
 import threading
-import requests
+from collections import deque
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
-def check_server_running():
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Server stdout/stderr is drained into this rotating file
+SERVER_LOG = os.environ.get('CROP_SERVER_LOG', os.path.join(BASE_DIR, 'server_output.log'))
+SERVER_LOG_MAX_BYTES = int(os.environ.get('CROP_SERVER_LOG_MAX_BYTES', 5 * 1024 * 1024))
+SERVER_LOG_BACKUP_COUNT = int(os.environ.get('CROP_SERVER_LOG_BACKUP_COUNT', 3))
+
+STARTUP_TIMEOUT = float(os.environ.get('CROP_STARTUP_TIMEOUT', 30))
+SHUTDOWN_TIMEOUT = float(os.environ.get('CROP_SHUTDOWN_TIMEOUT', 10))
+# Restart delays double after each crash up to the maximum, and reset once
+# the server has stayed up for RESTART_RESET_AFTER seconds
+RESTART_INITIAL_DELAY = 1.0
+RESTART_MAX_DELAY = 30.0
+RESTART_RESET_AFTER = 60.0
+
+def check_server_running(host="127.0.0.1", port=5000):
     """Check if the server is already running"""
     try:
-        response = requests.get("http://127.0.0.1:5000/health", timeout=2)
-        return response.status_code == 200
+        connection = http.client.HTTPConnection(host, port, timeout=2)
+        connection.request("GET", "/health")
+        return connection.getresponse().status == 200
     except:
         return False
 
-def start_backend_server():
+def port_open(host, port, timeout=0.2):
+    """True once something accepts TCP connections on host:port"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def server_address(argv):
+    """Host and port the server will bind, from the arguments passed through to it"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--host', default=os.environ.get('CROP_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('CROP_PORT', 5000)))
+    args, _ = parser.parse_known_args(argv)
+    # A wildcard bind is reachable on loopback
+    host = '127.0.0.1' if args.host in ('0.0.0.0', '::', '') else args.host
+    return host, args.port
+
+def server_output_logger(path=SERVER_LOG):
+    """Logger writing raw server output lines to a rotating file"""
+    output_logger = logging.getLogger('launcher.server_output')
+    output_logger.setLevel(logging.INFO)
+    output_logger.propagate = False
+    if not output_logger.handlers:
+        handler = RotatingFileHandler(path, maxBytes=SERVER_LOG_MAX_BYTES, backupCount=SERVER_LOG_BACKUP_COUNT,
+                                      encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        output_logger.addHandler(handler)
+    return output_logger
+
+class ServerSupervisor:
+    """
+    Runs simple_app.py as a child process and keeps it running
+    Child output is read continuously so the server never blocks on a full
+    pipe, readiness is a TCP probe of the server port, crashes are restarted
+    with exponential backoff, and stop() shuts the child down gracefully.
+    """
+
+    def __init__(self, server_args=(), log_path=SERVER_LOG):
+        self.command = [sys.executable, os.path.join(BASE_DIR, 'simple_app.py')] + list(server_args)
+        self.host, self.port = server_address(list(server_args))
+        self.output_logger = server_output_logger(log_path)
+        self.log_path = log_path
+        self.recent_output = deque(maxlen=20)
+        self.process = None
+        self.restarts = 0
+        self._started_at = 0.0
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._monitor = None
+
+    def _spawn(self):
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        # Give the server its own process group so Ctrl+C reaches only the
+        # launcher, which then stops the server (and any reloader child) itself
+        if os.name == 'nt':
+            group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {'start_new_session': True}
+        process = subprocess.Popen(self.command, cwd=BASE_DIR, env=env, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **group)
+        threading.Thread(target=self._drain, args=(process.stdout,), name='server-output', daemon=True).start()
+        self._started_at = time.monotonic()
+        return process
+
+    def _drain(self, pipe):
+        """Copy child output lines into the rotating log until the pipe closes"""
+        with pipe:
+            for raw in iter(pipe.readline, b''):
+                line = raw.decode('utf-8', errors='replace').rstrip()
+                self.recent_output.append(line)
+                self.output_logger.info(line)
+
+    def start(self):
+        """Start the server and its crash monitor"""
+        with self._lock:
+            self.process = self._spawn()
+        self._monitor = threading.Thread(target=self._watch, name='server-monitor', daemon=True)
+        self._monitor.start()
+
+    def wait_ready(self, timeout=STARTUP_TIMEOUT):
+        """Wait until the server port accepts connections; False on timeout or exit"""
+        process = self.process
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if port_open(self.host, self.port):
+                return True
+            if process.poll() is not None:
+                return False
+            time.sleep(0.05)
+        return False
+
+    def _watch(self):
+        delay = RESTART_INITIAL_DELAY
+        while not self._stopping.is_set():
+            returncode = self.process.wait()
+            if self._stopping.is_set():
+                break
+            if time.monotonic() - self._started_at >= RESTART_RESET_AFTER:
+                delay = RESTART_INITIAL_DELAY
+            print(f"\n⚠️  Backend server exited with code {returncode}, restarting in {delay:g}s "
+                  f"(output in {self.log_path})")
+            if self._stopping.wait(delay):
+                break
+            with self._lock:
+                if self._stopping.is_set():
+                    break
+                self.process = self._spawn()
+                self.restarts += 1
+            if self.wait_ready():
+                print("✅ Backend server restarted")
+            delay = min(delay * 2, RESTART_MAX_DELAY)
+
+    def _signal(self, process, graceful):
+        if os.name == 'nt':
+            if graceful:
+                process.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGTERM if graceful else signal.SIGKILL)
+
+    def stop(self, timeout=SHUTDOWN_TIMEOUT):
+        """Stop the server: graceful signal first, forced kill after timeout"""
+        self._stopping.set()
+        with self._lock:
+            process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            self._signal(process, graceful=True)
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._signal(process, graceful=False)
+            process.wait()
+        except OSError:
+            pass
+        if self._monitor is not None:
+            self._monitor.join(timeout=1)
+
+def start_backend_server(supervisor):
     """Start the Flask backend server"""
     print("🚀 Starting Crop Recommendation Backend Server...")
     
     # Check if server is already running
-    if check_server_running():
+    if check_server_running(supervisor.host, supervisor.port):
         print("✅ Backend server is already running!")
         return True
     
     try:
-        # Start the server in a separate process
-        server_process = subprocess.Popen([
-            sys.executable, "simple_app.py"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # Start the server under the supervisor
+        # Extra launcher arguments (e.g. --production --workers 4) go to the server
+        supervisor.start()
         
-        # Wait for server to start
+        # Wait for the server port to accept connections
         print("⏳ Waiting for server to start...")
-        for i in range(30):  # Wait up to 30 seconds
-            time.sleep(1)
-            if check_server_running():
-                print("✅ Backend server started successfully!")
-                return True
-            print(f"   Attempt {i+1}/30...")
+        started = time.monotonic()
+        if supervisor.wait_ready():
+            print(f"✅ Backend server started successfully in {time.monotonic() - started:.1f}s!")
+            return True
         
         print("❌ Failed to start backend server")
+        if supervisor.recent_output:
+            print("   Last server output:")
+            for line in supervisor.recent_output:
+                print(f"   {line}")
+        supervisor.stop()
         return False
         
     except Exception as e:
         print(f"❌ Error starting backend server: {str(e)}")
+        supervisor.stop()
         return False
 
 def open_frontend():
@@ -78,7 +244,8 @@ def main():
     print("=" * 50)
     
     # Start backend server
-    if not start_backend_server():
+    supervisor = ServerSupervisor(sys.argv[1:])
+    if not start_backend_server(supervisor):
         print("\n❌ Failed to start the application. Please check the error messages above.")
         input("Press Enter to exit...")
         return
@@ -87,16 +254,17 @@ def main():
     if not open_frontend():
         print("\n❌ Failed to open the frontend. Please manually open Crop_Project.html in your browser.")
         input("Press Enter to exit...")
+        supervisor.stop()
         return
     
     print("\n🎉 Crop Recommendation System is now running!")
     print("\n📋 What's running:")
-    print("   • Backend API: http://127.0.0.1:5000")
+    print(f"   • Backend API: http://{supervisor.host}:{supervisor.port}")
     print("   • Frontend: Crop_Project.html (opened in browser)")
     print("\n💡 Tips:")
     print("   • Keep this window open to keep the server running")
     print("   • Close this window to stop the server")
-    print("   • If you see errors in the web app, check this window for server messages")
+    print(f"   • If you see errors in the web app, check {supervisor.log_path} for server messages")
     
     try:
         # Keep the script running
@@ -105,6 +273,7 @@ def main():
             time.sleep(1)
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping Crop Recommendation System...")
+        supervisor.stop()
         print("✅ Application stopped successfully!")
 
 if __name__ == "__main__":
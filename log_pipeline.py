@@ -0,0 +1,121 @@
+"""
+Non-blocking logging for the Crop Recommendation System
+Request threads only put log records on a bounded queue; a background
+listener thread formats them and writes to a rotating log file and the
+console. Per-request INFO lines can be sampled per level.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Logger for per-request lines; sampling applies to this logger only
+REQUEST_LOGGER_NAME = 'crop.requests'
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+    The stock handler merges args into the message before enqueueing, which
+    puts formatting back on the request path. Records stay in-process, so the
+    listener can format them later. Records are dropped (and counted) rather
+    than blocking when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LevelSamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records per level
+    rates maps level names to a keep probability in [0, 1]; levels that are
+    not listed are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {logging.getLevelName(level.upper()): rate for level, rate in rates.items()}
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        return rate is None or rate >= 1 or random.random() < rate
+
+def parse_sample_rates(spec):
+    """Parse "INFO=0.1,DEBUG=0" into a {level: rate} mapping"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        level, _, rate = item.partition('=')
+        rates[level.strip().upper()] = float(rate)
+    return rates
+
+def configure_logging(log_file='crop_recommendation.log', level=logging.INFO, max_bytes=10 * 1024 * 1024,
+                      backup_count=5, rotate_when=None, sample_rates=None, queue_size=10000):
+    """
+    Route the root logger through a queue to a background writer thread
+    Rotation is by time when rotate_when is set (e.g. 'midnight'), otherwise
+    by size. log_file=None logs to the console only, as forked workers do:
+    several processes rotating one file lose lines. Returns the started
+    QueueListener.
+    """
+    if not log_file:
+        file_handler = None
+    elif rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+    formatter = logging.Formatter(LOG_FORMAT)
+    stream_handler = logging.StreamHandler()
+    handlers = [handler for handler in (file_handler, stream_handler) if handler is not None]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+
+    request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+    for log_filter in list(request_logger.filters):
+        request_logger.removeFilter(log_filter)
+    if sample_rates:
+        request_logger.addFilter(LevelSamplingFilter(sample_rates))
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def configure_logging_from_env(log_file='crop_recommendation.log'):
+    """
+    configure_logging with settings taken from LOG_* environment variables
+    log_file=None keeps LOG_FILE from applying and logs to the console only
+    """
+    return configure_logging(
+        log_file=os.environ.get('LOG_FILE', log_file) if log_file else None,
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+        max_bytes=int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        backup_count=int(os.environ.get('LOG_BACKUP_COUNT', 5)),
+        rotate_when=os.environ.get('LOG_ROTATE_WHEN') or None,
+        sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES'))
+    )
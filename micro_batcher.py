@@ -0,0 +1,132 @@
+"""
+Micro-batching scheduler for the Crop Recommendation System
+Concurrent /predict calls are queued for a short window and scored together
+with one vectorized engine call, then each result is handed back to the
+request thread that is waiting for it.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Longest a request waits for its batched result before giving up
+PREDICT_TIMEOUT = 5.0
+
+class MicroBatcher:
+    """
+    Coalesces single-row predictions into batches for one engine
+    A batch is dispatched when it reaches max_batch_size or when max_wait
+    seconds have passed since its first request arrived. Once closed, the
+    rows already queued are still scored and later rows go straight to the
+    engine, so a request holding a batcher across a model swap is answered.
+    """
+
+    def __init__(self, engine, max_wait=0.002, max_batch_size=64):
+        self.engine = engine
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=f"micro-batcher-{engine.name}", daemon=True)
+        self._worker.start()
+
+    def submit(self, features):
+        """Queue one row of features, returns a Future of (crop, confidence)"""
+        future = Future()
+        # Queued under the lock so no row can land behind close()'s sentinel
+        with self._lock:
+            if not self._closed:
+                self._queue.put((features, future))
+                return future
+        try:
+            future.set_result(self.engine.predict(features))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        """Stop the worker once the requests already queued are scored"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def predict(self, features, timeout=PREDICT_TIMEOUT):
+        """Blocking helper with the same signature as engine.predict"""
+        return self.submit(features).result(timeout)
+
+    def _collect(self):
+        """
+        Block for the first request, then gather more until the window closes
+        Returns (batch, closing); closing is set once close() was called
+        """
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch, closing = self._collect()
+            if not batch:
+                break
+            futures = [future for _, future in batch]
+            try:
+                crops, confidences = self.engine.predict_batch(np.array([features for features, _ in batch], dtype=float))
+                for future, crop, confidence in zip(futures, crops.tolist(), confidences.tolist()):
+                    future.set_result((crop, confidence))
+            except Exception as e:
+                logger.error("Error in micro-batch of %d: %s", len(batch), e)
+                with self._lock:
+                    self._errors += 1
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] += 1
+
+    def stats(self):
+        """Settings and achieved batch-size counters"""
+        with self._lock:
+            return {
+                'engine': self.engine.name,
+                'max_wait_ms': self.max_wait * 1000,
+                'max_batch_size': self.max_batch_size,
+                'batches': self._batches,
+                'items': self._items,
+                'errors': self._errors,
+                'mean_batch_size': self._items / self._batches if self._batches else 0.0,
+                'max_batch_size_seen': max(self._batch_sizes) if self._batch_sizes else 0,
+                'batch_size_counts': {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                'queue_depth': self._queue.qsize()
+            }
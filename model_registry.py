@@ -0,0 +1,340 @@
+"""
+Versioned, hot-reloadable engines for the Crop Recommendation System
+ModelRegistry holds an immutable snapshot of the engines. A watcher thread
+polls the dataset and the model artifact; when either changes, the new
+centroid model is built off the request path, validated on a holdout slice
+of the dataset and swapped in with a single assignment. Requests read the
+snapshot once, so requests in flight finish on the version they started with.
+
+With a FeedbackStore, logged feedback samples are folded into the centroid
+model incrementally: samples posted to this process right away, samples
+logged by other workers when the watcher sees the log grow. A periodic
+compaction folds the log into the dataset and rebuilds from it.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from crop_engine import (
+    DATASET_PATH,
+    FEATURE_FIELDS,
+    MODEL_PATH,
+    CentroidEngine,
+    artifact_is_fresh,
+    load_engines,
+    read_dataset,
+)
+from feedback_store import finite_samples
+
+logger = logging.getLogger(__name__)
+
+# Every HOLDOUT_EVERY-th dataset row is held out to validate new models
+HOLDOUT_EVERY = 5
+
+# incremental marks snapshots that only folded feedback into the previous one
+ModelSnapshot = namedtuple('ModelSnapshot', ['engines', 'generation', 'loaded_at', 'holdout_accuracy', 'incremental'],
+                           defaults=(False,))
+
+def holdout_mask(n, every=HOLDOUT_EVERY):
+    """Deterministic boolean mask of the holdout rows"""
+    return np.arange(n) % every == 0
+
+def accuracy(engine, X, labels):
+    """Share of rows the engine labels correctly, None without rows"""
+    if len(labels) == 0:
+        return None
+    crops, _ = engine.predict_batch(X)
+    return float((crops == labels).mean())
+
+def file_signature(path):
+    """(mtime, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class ModelRegistry:
+    """
+    Current engines plus the machinery to replace the centroid model live
+    Listeners registered with add_listener(snapshot) run after every swap.
+    """
+
+    def __init__(self, dataset_path=DATASET_PATH, model_path=MODEL_PATH, poll_interval=5.0,
+                 min_accuracy=0.2, max_accuracy_drop=0.05, feedback=None, compact_interval=0.0):
+        self.dataset_path = dataset_path
+        self.model_path = model_path
+        self.poll_interval = poll_interval
+        self.min_accuracy = min_accuracy
+        self.max_accuracy_drop = max_accuracy_drop
+        self.feedback = feedback
+        self.compact_interval = compact_interval
+        self._signature = self._files_signature()
+        # (log_id, rows) of the feedback log already folded into the snapshot
+        self._feedback_seen = (None, 0)
+        engines = load_engines()
+        engine = engines.get(CentroidEngine.name)
+        if feedback is not None and engine is not None:
+            engine, self._feedback_seen = self._with_feedback(engine)
+            engines[CentroidEngine.name] = engine
+        self.snapshot = ModelSnapshot(engines, 0, time.time(), self._initial_accuracy(engines))
+        self.last_reload = None
+        self.reloads = Counter()
+        self.feedback_samples = 0
+        self.last_compaction = None
+        self._last_compaction_check = time.monotonic()
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._stop = None
+
+    def _files_signature(self):
+        return file_signature(self.dataset_path), file_signature(self.model_path)
+
+    def _holdout(self):
+        X, labels = read_dataset(self.dataset_path)
+        mask = holdout_mask(len(labels))
+        return X, labels, mask
+
+    def _initial_accuracy(self, engines):
+        engine = engines.get(CentroidEngine.name)
+        if engine is None or not os.path.exists(self.dataset_path):
+            return None
+        try:
+            X, labels, mask = self._holdout()
+            return accuracy(engine, X[mask], labels[mask])
+        except Exception as e:
+            logger.warning("Could not score the centroid model on the holdout: %s", e)
+            return None
+
+    @property
+    def engines(self):
+        return self.snapshot.engines
+
+    def crop_labels(self):
+        """Crops the current engines can recommend, the labels feedback may use"""
+        labels = set()
+        for engine in self.snapshot.engines.values():
+            labels.update(engine.classes.tolist())
+        return labels
+
+    def versions(self):
+        return {name: engine.version for name, engine in self.snapshot.engines.items()}
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    @property
+    def feedback_rows(self):
+        """Feedback samples folded in since the last compaction"""
+        return self._feedback_seen[1]
+
+    def _with_feedback(self, engine):
+        """engine with the whole feedback log folded in, and the log position"""
+        log_id, X, labels = self.feedback.read()
+        return engine.updated(*finite_samples(X, labels)), (log_id, len(labels))
+
+    def _feedback_replaced(self, log_id):
+        """True when the log we folded from was compacted or replaced"""
+        seen_id, seen_rows = self._feedback_seen
+        return seen_rows > 0 and log_id != seen_id
+
+    def _keep_current_feedback(self, log_id):
+        """
+        After a rebuild was not swapped in, fold a replacement log into the
+        current model from its first row rather than retrying the rebuild
+        """
+        if self._feedback_replaced(log_id):
+            self._feedback_seen = (log_id, 0)
+
+    def _swap(self, snapshot):
+        self.snapshot = snapshot
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error("Model swap listener failed: %s", e)
+
+    def _build_candidate(self):
+        """
+        Build the candidate centroid model and its holdout accuracy
+        When it is rebuilt from the CSV, the accuracy comes from a model fitted
+        without the holdout rows, while the served model uses every row
+        """
+        seen = (None, 0)
+        if not os.path.exists(self.dataset_path):
+            candidate = CentroidEngine.load(self.model_path)
+            if self.feedback is not None:
+                candidate, seen = self._with_feedback(candidate)
+            return candidate, None, None, seen
+        X, labels, mask = self._holdout()
+        if artifact_is_fresh(self.model_path, self.dataset_path):
+            candidate = validator = CentroidEngine.load(self.model_path)
+        else:
+            candidate = CentroidEngine.fit(X, labels)
+            validator = CentroidEngine.fit(X[~mask], labels[~mask])
+        if self.feedback is not None:
+            log_id, feedback_X, feedback_labels = self.feedback.read()
+            seen = (log_id, len(feedback_labels))
+            feedback_X, feedback_labels = finite_samples(feedback_X, feedback_labels)
+            if validator is not candidate:
+                validator = validator.updated(feedback_X, feedback_labels)
+                candidate = candidate.updated(feedback_X, feedback_labels)
+            else:
+                candidate = validator = candidate.updated(feedback_X, feedback_labels)
+        current = self.snapshot.engines.get(CentroidEngine.name)
+        baseline = accuracy(current, X[mask], labels[mask]) if current is not None else None
+        return candidate, accuracy(validator, X[mask], labels[mask]), baseline, seen
+
+    def check_for_update(self, force=False):
+        """
+        Reload the centroid model if its inputs changed (or when forced)
+        Returns a status dict, or None when nothing changed on disk
+        """
+        with self._reload_lock:
+            return self._check_locked(force)
+
+    def _check_locked(self, force):
+        signature = self._files_signature()
+        log_id = self.feedback.position()[0] if self.feedback is not None else None
+        if not force and signature == self._signature and not self._feedback_replaced(log_id):
+            return None
+        self._signature = signature
+        current = self.snapshot
+        result = {'previous_version': self.versions().get(CentroidEngine.name)}
+        try:
+            candidate, holdout_accuracy, baseline, seen = self._build_candidate()
+        except Exception as e:
+            logger.warning("Model reload failed, keeping the current model: %s", e)
+            result.update(status='failed', error=str(e))
+            self._keep_current_feedback(log_id)
+            return self._finish(result)
+
+        result.update(version=candidate.version, holdout_accuracy=holdout_accuracy,
+                      baseline_accuracy=baseline)
+        if candidate.version == result['previous_version']:
+            self._feedback_seen = seen
+            result['status'] = 'unchanged'
+            return self._finish(result)
+        if holdout_accuracy is not None and (
+            holdout_accuracy < self.min_accuracy
+            or (baseline is not None and holdout_accuracy < baseline - self.max_accuracy_drop)
+        ):
+            logger.warning("Rejected model %s: holdout accuracy %.3f (current %s, minimum %.3f)",
+                           candidate.version, holdout_accuracy, baseline, self.min_accuracy)
+            result['status'] = 'rejected'
+            self._keep_current_feedback(log_id)
+            return self._finish(result)
+
+        engines = dict(current.engines)
+        engines[CentroidEngine.name] = candidate
+        self._feedback_seen = seen
+        self._swap(ModelSnapshot(engines, current.generation + 1, time.time(), holdout_accuracy))
+        logger.info("Swapped centroid model %s -> %s (holdout accuracy %s)",
+                    result['previous_version'], candidate.version, holdout_accuracy)
+        result['status'] = 'swapped'
+        return self._finish(result)
+
+    def _finish(self, result):
+        result['checked_at'] = time.time()
+        self.last_reload = result
+        self.reloads[result['status']] += 1
+        return result
+
+    def _fold_feedback(self, X, labels, seen):
+        """Swap in the centroid model with samples folded in, without revalidating"""
+        self._feedback_seen = seen
+        current = self.snapshot
+        engine = current.engines.get(CentroidEngine.name)
+        if engine is None or not len(labels):
+            return
+        engines = dict(current.engines)
+        engines[CentroidEngine.name] = engine.updated(*finite_samples(X, labels))
+        self.feedback_samples += len(labels)
+        # Holdout accuracy stays that of the last validated rebuild
+        self._swap(ModelSnapshot(engines, current.generation + 1, time.time(), current.holdout_accuracy,
+                                 incremental=True))
+
+    def record_feedback(self, X, labels):
+        """
+        Log labelled samples and fold them into the live centroid model
+        Returns the number of samples in the feedback log
+        """
+        # The log keeps float32; fold in exactly what other workers will read
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(FEATURE_FIELDS))
+        labels = list(labels)
+        if not np.isfinite(X).all():
+            # Checked before logging, so a bad sample cannot come back on restart
+            raise ValueError("Feedback samples must be finite numbers")
+        unknown = set(labels) - self.crop_labels()
+        if unknown:
+            # Labels become classes and fill the log's label dictionary for good
+            raise ValueError(f"{len(unknown)} feedback labels are not known crops")
+        with self._reload_lock:
+            log_id, rows = self.feedback.append(X, labels)
+            seen_id, seen_rows = self._feedback_seen
+            if rows - len(labels) == seen_rows and (log_id == seen_id or seen_rows == 0):
+                # Nothing was logged elsewhere since the last sync
+                self._fold_feedback(X.astype(float), labels, (log_id, rows))
+            else:
+                self._sync_feedback_locked()
+            return rows
+
+    def sync_feedback(self):
+        """Fold in samples other processes logged since the last sync"""
+        with self._reload_lock:
+            self._sync_feedback_locked()
+
+    def _sync_feedback_locked(self):
+        log_id, rows = self.feedback.position()
+        if self._feedback_replaced(log_id):
+            # Compacted into the dataset: rebuild from it and the new log
+            self._check_locked(force=True)
+            return
+        seen_rows = self._feedback_seen[1]
+        if rows > seen_rows:
+            log_id, X, labels = self.feedback.read(seen_rows)
+            self._fold_feedback(X, labels, (log_id, seen_rows + len(labels)))
+
+    def compact_feedback(self):
+        """Fold the feedback log into the dataset, then rebuild from the dataset"""
+        with self._reload_lock:
+            self._last_compaction_check = time.monotonic()
+            if not os.path.exists(self.dataset_path):
+                return 0
+            rows = self.feedback.compact(self.dataset_path)
+            if rows:
+                logger.info("Compacted %d feedback samples into %s", rows, self.dataset_path)
+                self.last_compaction = {'rows': rows, 'compacted_at': time.time()}
+                self._check_locked(force=True)
+            return rows
+
+    def _watch(self, stop):
+        while not stop.wait(self.poll_interval):
+            try:
+                self.check_for_update()
+                if self.feedback is not None:
+                    self.sync_feedback()
+                    if self.compact_interval and time.monotonic() - self._last_compaction_check >= self.compact_interval:
+                        self.compact_feedback()
+            except Exception as e:
+                logger.error("Model watcher error: %s", e)
+
+    def stop_watching(self):
+        """Stop the watcher thread, e.g. in a master process that only forks workers"""
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    def start_watching(self):
+        """Poll the dataset and artifact in a daemon thread; call again after fork"""
+        if self._stop is not None:
+            self._stop.set()
+        if not self.poll_interval or self.poll_interval <= 0:
+            return
+        self._stop = threading.Event()
+        threading.Thread(target=self._watch, args=(self._stop,), name='model-watcher', daemon=True).start()
@@ -0,0 +1,96 @@
+"""
+Prediction cache for the Crop Recommendation System
+LRUCache is a bounded, thread-safe LRU cache with optional TTL. PredictionCache
+keys it on the exact input values so repeated presets and sensor readings skip
+the engine. Keys are never rounded: a rounded key could land on the other side
+of a rule threshold or a centroid boundary and serve an answer the inputs
+would not get.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Bounded LRU cache with optional TTL
+    max_size bounds the number of entries (0 disables the cache); ttl
+    (seconds) expires entries, None keeps them until evicted.
+    """
+
+    def __init__(self, max_size=4096, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry if full"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. when the underlying model changes"""
+        with self._lock:
+            self._entries.clear()
+            self.flushes += 1
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'flushes': self.flushes
+            }
+
+class PredictionCache(LRUCache):
+    """LRU cache of prediction results keyed on exact feature values"""
+
+    def __init__(self, fields, max_size=4096, ttl=None):
+        super().__init__(max_size, ttl)
+        self.fields = list(fields)
+
+    def make_key(self, features, *extra):
+        """The features as a tuple; extra values scope the key"""
+        return extra + tuple(features)
@@ -0,0 +1,273 @@
+"""
+Traffic Replay for the Crop Recommendation System
+Replays requests captured by simple_app (CROP_CAPTURE=1) against a running
+server, at the original pacing or sped up, then reports latency
+distributions per route and every response that differs from the captured
+one. The capture file is read as a stream, so it may be larger than memory.
+
+Requests are sent in capture order; with --concurrency 1 the replay is fully
+sequential and deterministic. Records of requests that change server state
+(feedback, cache flushes, model reloads) are refused and counted, never sent. Fields that legitimately change between runs
+(timestamps) are ignored when comparing responses. Captured latencies are
+measured inside the app and replayed ones at the client, so the latter also
+include connection and HTTP overhead.
+
+Usage:
+    python replay_traffic.py requests.jsonl --speed 10
+    python replay_traffic.py requests.jsonl --speed 0 --concurrency 8 --output replay.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from traffic_capture import replayable
+
+# Response fields that differ on every run
+DEFAULT_IGNORED_FIELDS = ('timestamp', 'model_loaded_at', 'checked_at')
+PERCENTILES = (50, 90, 99)
+
+def iter_captured(path, limit=None):
+    """
+    (line number, record) for each captured request, skipping other lines
+    Stops at the size the file had when reading began, so a server that is
+    still capturing to it does not feed the replay its own requests
+    """
+    count = 0
+    remaining = os.path.getsize(path)
+    with open(path, 'rb') as handle:
+        for number, line in enumerate(handle, start=1):
+            remaining -= len(line)
+            if remaining < 0:
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or not {'ts', 'method', 'path'} <= record.keys():
+                continue
+            yield number, record
+            count += 1
+            if limit and count >= limit:
+                return
+
+def strip_fields(value, ignored):
+    """value with the ignored keys removed at every depth"""
+    if isinstance(value, dict):
+        return {key: strip_fields(item, ignored) for key, item in value.items() if key not in ignored}
+    if isinstance(value, list):
+        return [strip_fields(item, ignored) for item in value]
+    return value
+
+def first_difference(expected, actual, path='$'):
+    """JSON path of the first place two values differ, or None"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            if key not in expected or key not in actual:
+                return f"{path}.{key}"
+            found = first_difference(expected[key], actual[key], f"{path}.{key}")
+            if found:
+                return found
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return f"{path}[len {len(expected)} != {len(actual)}]"
+        for index, (left, right) in enumerate(zip(expected, actual)):
+            found = first_difference(left, right, f"{path}[{index}]")
+            if found:
+                return found
+        return None
+    return None if expected == actual else path
+
+class Replayer:
+    """Sends captured requests over one keep-alive connection per thread"""
+
+    def __init__(self, base_url, timeout=30):
+        url = urlsplit(base_url)
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def send(self, record):
+        """(status, decoded body, seconds) for one captured request"""
+        body = record.get('body')
+        headers = {}
+        if body is not None:
+            if not isinstance(body, str):
+                body = json.dumps(body)
+            body = body.encode('utf-8')
+            headers['Content-Type'] = record.get('content_type') or 'application/json'
+        connection = self._connection()
+        started = time.perf_counter()
+        try:
+            connection.request(record['method'], record['path'], body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+        elapsed = time.perf_counter() - started
+        content_type = response.getheader('Content-Type', '')
+        text = data.decode('utf-8', errors='replace')
+        decoded = text or None
+        if text and 'json' in content_type:
+            try:
+                decoded = json.loads(text)
+            except ValueError:
+                pass
+        return response.status, decoded, elapsed
+
+def summarize(latencies):
+    """Count and latency percentiles in milliseconds"""
+    if not latencies:
+        return {'requests': 0}
+    values = np.array(latencies) * 1000
+    summary = {'requests': len(latencies)}
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{percentile}_ms"] = float(value)
+    summary['max_ms'] = float(values.max())
+    return summary
+
+def replay(path, base_url, speed=1.0, concurrency=4, limit=None, ignored=DEFAULT_IGNORED_FIELDS, max_diffs=20):
+    """
+    Replay a capture file and compare the responses
+    speed scales the captured pacing (2 = twice as fast, 0 = no pauses)
+    """
+    replayer = Replayer(base_url)
+    ignored = set(ignored)
+    replayed = defaultdict(list)
+    captured = defaultdict(list)
+    diffs = []
+    counts = defaultdict(int)
+    lock = threading.Lock()
+    # Bounds the requests waiting for a thread so the file is read as a stream
+    slots = threading.BoundedSemaphore(concurrency * 2)
+
+    def run(number, record):
+        route = record.get('route') or record['path']
+        try:
+            status, body, elapsed = replayer.send(record)
+        except (OSError, http.client.HTTPException) as e:
+            with lock:
+                counts['errors'] += 1
+                if len(diffs) < max_diffs:
+                    diffs.append({'line': number, 'route': route, 'error': str(e)})
+            return
+        finally:
+            slots.release()
+        difference = None
+        if status != record.get('status'):
+            difference = f"status {record.get('status')} -> {status}"
+        elif record.get('response') is not None:
+            found = first_difference(strip_fields(record['response'], ignored), strip_fields(body, ignored))
+            if found:
+                difference = f"body differs at {found}"
+        with lock:
+            replayed[route].append(elapsed)
+            if record.get('latency_ms') is not None:
+                captured[route].append(record['latency_ms'] / 1000)
+            if difference:
+                counts['status_mismatches' if difference.startswith('status') else 'body_mismatches'] += 1
+                if len(diffs) < max_diffs:
+                    diffs.append({'line': number, 'route': route, 'path': record['path'], 'difference': difference})
+
+    first_ts = None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for number, record in iter_captured(path, limit):
+            if not replayable(record['method'], record.get('route')):
+                counts['refused'] += 1
+                continue
+            if first_ts is None:
+                first_ts = record['ts']
+            if speed > 0:
+                delay = started + (record['ts'] - first_ts) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -0.01:
+                    counts['late'] += 1
+            slots.acquire()
+            counts['sent'] += 1
+            pool.submit(run, number, record)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': counts['sent'],
+        'refused': counts['refused'],
+        'errors': counts['errors'],
+        'status_mismatches': counts['status_mismatches'],
+        'body_mismatches': counts['body_mismatches'],
+        'late_dispatches': counts['late'],
+        'elapsed_seconds': elapsed,
+        'routes': {
+            route: {'replayed': summarize(replayed[route]), 'captured': summarize(captured[route])}
+            for route in sorted(replayed)
+        },
+        'overall': summarize([latency for values in replayed.values() for latency in values]),
+        'diffs': sorted(diffs, key=lambda diff: diff['line'])
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured Crop Recommendation traffic')
+    parser.add_argument('capture', help='JSON-lines file written with CROP_CAPTURE=1')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Server to replay against')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Pacing multiplier: 1 = as captured, 10 = ten times faster, 0 = no pauses')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once')
+    parser.add_argument('--limit', type=int, help='Replay only the first N captured requests')
+    parser.add_argument('--ignore', default=','.join(DEFAULT_IGNORED_FIELDS),
+                        help='Comma-separated response fields left out of the comparison')
+    parser.add_argument('--max-diffs', type=int, default=20, help='Differences to list in the report')
+    parser.add_argument('--output', help='Write the full report to this JSON file')
+    parser.add_argument('--fail-on-diff', action='store_true', help='Exit non-zero when any response differs')
+    args = parser.parse_args(argv)
+
+    print(f"🔁 Replaying {args.capture} against {args.url} "
+          f"({'no pauses' if args.speed <= 0 else f'{args.speed:g}x speed'}, concurrency {args.concurrency})")
+    report = replay(args.capture, args.url, args.speed, args.concurrency, args.limit,
+                    [field for field in args.ignore.split(',') if field], args.max_diffs)
+
+    print(f"   {report['requests']} requests in {report['elapsed_seconds']:.1f}s, {report['errors']} errors, "
+          f"{report['late_dispatches']} sent behind schedule")
+    if report['refused']:
+        print(f"⛔ {report['refused']} captured requests that change server state were not replayed")
+    for route, result in report['routes'].items():
+        replayed, captured = result['replayed'], result['captured']
+        line = (f"   {route:<22} {replayed['requests']:>6}  p50 {replayed['p50_ms']:7.2f}ms  "
+                f"p90 {replayed['p90_ms']:7.2f}ms  p99 {replayed['p99_ms']:7.2f}ms")
+        if captured['requests']:
+            line += f"  (captured p50 {captured['p50_ms']:.2f}ms, p99 {captured['p99_ms']:.2f}ms)"
+        print(line)
+    mismatches = report['status_mismatches'] + report['body_mismatches']
+    if mismatches:
+        print(f"⚠️  {report['status_mismatches']} status and {report['body_mismatches']} body differences")
+        for diff in report['diffs']:
+            print(f"   line {diff['line']} {diff.get('path', diff['route'])}: {diff.get('difference', diff.get('error'))}")
+    else:
+        print("✅ All responses match the capture")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"💾 Report written to {args.output}")
+    return 1 if args.fail_on_diff and (mismatches or report['errors']) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Request profiling for the Crop Recommendation System
+PhaseTimer splits one request's time into named phases (JSON parse,
+validation, engine call, serialization) so slow requests can be logged with
+a breakdown. RequestProfiler runs a single request under cProfile when the
+caller presents the profiling token, and keeps the last few profiles on disk
+as .pstats files.
+"""
+
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+
+PROFILE_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+class PhaseTimer:
+    """Consecutive phases of one request, timed from started"""
+
+    __slots__ = ('started', '_last', 'phases')
+
+    def __init__(self, started=None):
+        self.started = self._last = started if started is not None else time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        """Close the phase that ran since the previous mark"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def finish(self):
+        """Count the time since the last mark as 'other'; returns the total seconds"""
+        self.mark('other')
+        return self._last - self.started
+
+    def summary(self):
+        return ', '.join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in self.phases)
+
+def token_matches(supplied, token):
+    """Constant-time check of a supplied secret; False when either is missing"""
+    return bool(token) and bool(supplied) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+class RequestProfiler:
+    """
+    cProfile for requests that present token, one request at a time
+    Profiles are written to directory and only the newest keep are retained.
+    Without a token profiling is disabled.
+    """
+
+    def __init__(self, token, directory, keep=20, sort='cumulative', top=40):
+        self.token = token
+        self.directory = directory
+        self.keep = keep
+        self.sort = sort
+        self.top = top
+        # One profiled request at a time bounds the overhead
+        self._busy = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def authorized(self, supplied):
+        return token_matches(supplied, self.token)
+
+    def start(self):
+        """A running profiler, or None while another request is being profiled"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler, label):
+        """Stop profiler, save it and return the profile id"""
+        profiler.disable()
+        self._busy.release()
+        os.makedirs(self.directory, exist_ok=True)
+        label = re.sub(r'[^\w]+', '-', label).strip('-') or 'root'
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._ids)}-{label}"
+        profiler.dump_stats(os.path.join(self.directory, profile_id + '.pstats'))
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith('.pstats')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in profiles[:-self.keep] if self.keep else []:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def list(self):
+        """Saved profile ids, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith('.pstats')),
+            key=lambda entry: entry.stat().st_mtime, reverse=True
+        )
+        return [entry.name[:-len('.pstats')] for entry in profiles]
+
+    def report(self, profile_id):
+        """Text report of the slowest functions of a saved profile, or None"""
+        path = os.path.join(self.directory, profile_id + '.pstats')
+        if not PROFILE_ID_PATTERN.match(profile_id) or not os.path.exists(path):
+            return None
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats(self.sort).print_stats(self.top)
+        return stream.getvalue()
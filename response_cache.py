@@ -0,0 +1,76 @@
+"""
+Pre-serialized JSON response bodies for the Crop Recommendation System
+A PreparedBody holds a response serialized once, with the per-request field
+(the timestamp) left as a gap to splice into. The gzip variant compresses the
+large constant part once; at send time the spliced tail is appended as a
+stored deflate block and the CRC is extended, so no compressor runs per
+request. Streamed chatbot answers are kept as ready-made server-sent event
+frames the same way.
+"""
+
+import struct
+import zlib
+
+# Placeholder serialized in place of the spliced value; never valid user text
+SPLICE_MARKER = '\x00splice\x00'
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+# Largest payload of one stored deflate block (LEN is 16 bits)
+MAX_STORED_BLOCK = 0xFFFF
+
+class PreparedBody:
+    """JSON body bytes split around one spliced string value"""
+
+    __slots__ = ('prefix', 'suffix', '_gzip_prefix', '_crc', '_size')
+
+    def __init__(self, body, splice_field, dumps, compress_level=6):
+        """
+        body is the response dict without splice_field; dumps is the app's JSON
+        serializer. splice_field is placed last so the tail after it is tiny
+        """
+        encoded = dumps(dict(body, **{splice_field: SPLICE_MARKER}))
+        marker = dumps(SPLICE_MARKER)[1:-1]
+        prefix, _, suffix = encoded.partition(marker)
+        self.prefix = prefix.encode('utf-8')
+        self.suffix = suffix.encode('utf-8')
+        self._gzip_prefix = None
+        if compress_level:
+            # Raw deflate of the prefix, sync-flushed to a byte boundary so a
+            # stored block can follow it
+            compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._gzip_prefix = GZIP_HEADER + compressor.compress(self.prefix) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._crc = zlib.crc32(self.prefix)
+            self._size = len(self.prefix)
+
+    def render(self, value):
+        """Uncompressed body with value spliced in"""
+        return b''.join((self.prefix, value.encode('utf-8'), self.suffix))
+
+    def render_gzip(self, value):
+        """gzip body with value spliced in, or None when compression is off"""
+        if self._gzip_prefix is None:
+            return None
+        tail = value.encode('utf-8') + self.suffix
+        size = len(tail)
+        # Stored blocks hold at most 65535 bytes each: BFINAL on the last one,
+        # BTYPE=00, then LEN and its complement
+        parts = [self._gzip_prefix]
+        for start in range(0, max(size, 1), MAX_STORED_BLOCK):
+            chunk = tail[start:start + MAX_STORED_BLOCK]
+            final = start + MAX_STORED_BLOCK >= size
+            parts += (struct.pack('<BHH', final, len(chunk), len(chunk) ^ 0xFFFF), chunk)
+        parts.append(struct.pack('<II', zlib.crc32(tail, self._crc), (self._size + size) & 0xFFFFFFFF))
+        return b''.join(parts)
+
+    def __len__(self):
+        return len(self.prefix) + len(self.suffix)
+
+def answer_sections(text):
+    """Blank-line separated sections of a markdown answer, the unit that is streamed"""
+    return [section for section in text.split('\n\n') if section.strip()]
+
+def sse_frame(event, data):
+    """One server-sent event; data is JSON text, which never holds a raw newline"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return b''.join((b'event: ', event.encode('ascii'), b'\ndata: ', data, b'\n\n'))
@@ -0,0 +1,161 @@
+"""
+What-if scenario sweeps for the Crop Recommendation System
+A sweep varies some of the seven input fields of a base record over grids,
+scores the full cartesian product in one engine pass and summarizes where
+the recommended crop changes along each varied field.
+
+Each grid is given per field as one of:
+    [v1, v2, ...]                              explicit values
+    {"min": a, "max": b, "steps": n}           n evenly spaced values
+    {"scale": [0.7, 0.85, 1.0]}                multiples of the base value
+    {"offset": [-1, 0, 1]}                     base value plus each offset
+"""
+
+import numpy as np
+
+from crop_engine import FEATURE_FIELDS, RANGE_CHECKS
+
+# Confidences are rounded to keep large grids compact on the wire
+CONFIDENCE_DECIMALS = 4
+
+class SweepError(ValueError):
+    """Invalid sweep request; the message is safe to return to the client"""
+
+def grid_numbers(field, key, values):
+    """Float array of a list-valued grid option"""
+    if not isinstance(values, list):
+        raise SweepError(f"Grid for {field}: {key} must be a list of numbers")
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        raise SweepError(f"Grid for {field}: {key} must contain only numbers")
+
+def axis_values(field, spec, base_value, max_points):
+    """Grid values of one field from its spec"""
+    if isinstance(spec, list):
+        values = spec
+    elif isinstance(spec, dict) and 'values' in spec:
+        values = spec['values']
+    elif isinstance(spec, dict) and {'min', 'max', 'steps'} <= spec.keys():
+        try:
+            steps = int(spec['steps'])
+            low, high = float(spec['min']), float(spec['max'])
+        except (TypeError, ValueError, OverflowError):
+            raise SweepError(f"Grid for {field}: min, max and steps must be numbers")
+        if steps < 1:
+            raise SweepError(f"Grid for {field}: steps must be at least 1")
+        # Checked before linspace allocates the axis
+        if steps > max_points:
+            raise SweepError(f"Grid for {field} has {steps} steps, the maximum is {max_points} points")
+        values = np.linspace(low, high, steps)
+    elif isinstance(spec, dict) and 'scale' in spec:
+        values = base_value * grid_numbers(field, 'scale', spec['scale'])
+    elif isinstance(spec, dict) and 'offset' in spec:
+        values = base_value + grid_numbers(field, 'offset', spec['offset'])
+    else:
+        raise SweepError(f"Grid for {field} must be a list or an object with values, min/max/steps, scale or offset")
+    try:
+        values = np.asarray(values, dtype=float).ravel()
+    except (TypeError, ValueError):
+        raise SweepError(f"Grid for {field} must contain only numbers")
+    if not len(values):
+        raise SweepError(f"Grid for {field} is empty")
+    if not np.isfinite(values).all():
+        raise SweepError(f"Grid for {field} must contain only finite numbers")
+    for column, low, high, message in RANGE_CHECKS:
+        if FEATURE_FIELDS[column] == field and ((values < low).any() or (high is not None and (values > high).any())):
+            raise SweepError(f"Grid for {field}: {message}")
+    return values
+
+def parse_grid(grid, base, max_points):
+    """[(field, values)] in FEATURE_FIELDS order from the request grid"""
+    if not isinstance(grid, dict) or not grid:
+        raise SweepError("Provide a grid object mapping fields to the values to sweep")
+    unknown = [field for field in grid if field not in FEATURE_FIELDS]
+    if unknown:
+        raise SweepError(f"Unknown grid fields: {', '.join(unknown)}")
+    axes = []
+    points = 1
+    for field in FEATURE_FIELDS:
+        if field not in grid:
+            continue
+        values = axis_values(field, grid[field], base[FEATURE_FIELDS.index(field)], max_points)
+        # Running product, so no later axis is built once the grid is too large
+        points *= len(values)
+        if points > max_points:
+            raise SweepError(f"Grid has at least {points} points, the maximum is {max_points}")
+        axes.append((field, values))
+    return axes
+
+def grid_features(base, axes):
+    """(points, 7) feature matrix of the cartesian grid, last axis fastest"""
+    shape = tuple(len(values) for _, values in axes)
+    X = np.empty((int(np.prod(shape)), len(FEATURE_FIELDS)))
+    X[:] = base
+    for (field, _), column in zip(axes, np.meshgrid(*[values for _, values in axes], indexing='ij')):
+        X[:, FEATURE_FIELDS.index(field)] = column.ravel()
+    return X, shape
+
+def factorize(crops):
+    """(crop names, integer codes) of an array of crop labels, in first-seen order"""
+    names = {}
+    codes = np.fromiter((names.setdefault(crop, len(names)) for crop in crops.tolist()),
+                        dtype=np.int32, count=len(crops))
+    return list(names), codes
+
+def boundaries(codes, crop_names, axes, base):
+    """
+    Per swept field: how many neighbouring grid cells change crop along it,
+    and the crop changes along the line through the grid point nearest base
+    """
+    nearest = tuple(int(np.abs(values - base[FEATURE_FIELDS.index(field)]).argmin()) for field, values in axes)
+    result = {}
+    for axis, (field, values) in enumerate(axes):
+        changes = np.diff(codes, axis=axis) != 0
+        index = list(nearest)
+        index[axis] = slice(None)
+        line = codes[tuple(index)]
+        through_base = [
+            {
+                'between': [float(values[step]), float(values[step + 1])],
+                'at': float((values[step] + values[step + 1]) / 2),
+                'from': crop_names[line[step]],
+                'to': crop_names[line[step + 1]],
+            }
+            for step in np.flatnonzero(line[1:] != line[:-1]).tolist()
+        ]
+        result[field] = {'changes': int(changes.sum()), 'through_base': through_base}
+    return result
+
+def run_sweep(engine, base, grid, max_points, include_matrix=True):
+    """
+    Sweep the grid around base (a FEATURE_FIELDS-ordered sequence) with engine
+    Returns the response body; raises SweepError for invalid grids
+    """
+    base = np.asarray(base, dtype=float)
+    axes = parse_grid(grid, base, max_points)
+    X, shape = grid_features(base, axes)
+    crops, confidences = engine.predict_batch(X)
+    crop_names, codes = factorize(crops)
+    base_crop, base_confidence = engine.predict(base.tolist())
+
+    body = {
+        'model_type': engine.name,
+        'model_version': engine.version,
+        'base': dict(zip(FEATURE_FIELDS, base.tolist()),
+                     recommended_crop=str(base_crop), confidence=float(base_confidence)),
+        'axes': [{'field': field, 'values': values.tolist()} for field, values in axes],
+        'shape': list(shape),
+        'points': len(X),
+        'crops': [str(crop) for crop in crop_names],
+        'crop_share': {
+            str(crop): float(count) / len(X)
+            for crop, count in zip(crop_names, np.bincount(codes, minlength=len(crop_names)).tolist())
+        },
+        'boundaries': boundaries(codes.reshape(shape), [str(crop) for crop in crop_names], axes, base),
+    }
+    if include_matrix:
+        # Row-major over axes: index = ((i0 * n1 + i1) * n2 + i2) ...
+        body['crop_codes'] = codes.tolist()
+        body['confidence'] = np.round(np.asarray(confidences, dtype=float), CONFIDENCE_DECIMALS).tolist()
+    return body
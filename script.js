@@ -2,6 +2,14 @@
 
 // Global variables
 
+// Escape text from the server (e.g. crop names learned from feedback) before
+// it goes into an innerHTML template
+function escapeHtml(text) {
+  const span = document.createElement('span');
+  span.textContent = String(text);
+  return span.innerHTML;
+}
+
 // Add typing animation effect
 function typeWriter(element, text, speed = 50) {
   let i = 0;
@@ -248,7 +256,7 @@ function displayResult(resultData, inputData) {
   
   result.innerHTML = `
     <div class="crop-icon">${cropEmoji}</div>
-    <div><strong>Recommended Crop:</strong> <span style="text-transform: capitalize; color: #1a5f3f;">${cropName}</span></div>
+    <div><strong>Recommended Crop:</strong> <span style="text-transform: capitalize; color: #1a5f3f;">${escapeHtml(cropName)}</span></div>
     <div style="margin-top: 15px; font-size: 1rem; opacity: 0.9; background: rgba(255,255,255,0.3); padding: 8px 16px; border-radius: 20px; display: inline-block;">
       <i class="fas fa-chart-line"></i> Confidence: <strong>${(resultData.confidence * 100).toFixed(1)}%</strong>
     </div>
@@ -521,28 +529,18 @@ async function sendMessage() {
   showTypingIndicator();
   
   try {
-    // Send message to backend
-    const response = await fetch('http://127.0.0.1:5000/chatbot', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ message: message })
-    });
-    
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
+    // Stream the answer section by section, falling back to the JSON endpoint
+    let reply = await streamChatbotReply(message);
+    if (reply === null) {
+      reply = await fetchChatbotReply(message);
+      hideTypingIndicator();
+      if (reply) {
+        displayMessage(reply, 'bot');
+      }
     }
     
-    const data = await response.json();
-    
-    // Hide typing indicator
-    hideTypingIndicator();
-    
-    // Display bot response
-    if (data.response) {
-      chatbotState.messageHistory.push({ type: 'bot', content: data.response });
-      displayMessage(data.response, 'bot');
+    if (reply) {
+      chatbotState.messageHistory.push({ type: 'bot', content: reply });
     } else {
       displayMessage('Sorry, I couldn\'t process your request. Please try again.', 'bot');
     }
@@ -557,6 +555,88 @@ async function sendMessage() {
   }
 }
 
+async function fetchChatbotReply(message) {
+  const response = await fetch('http://127.0.0.1:5000/chatbot', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ message: message })
+  });
+  
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  
+  const data = await response.json();
+  return data.response;
+}
+
+// Reads the server-sent events of /chatbot/stream, rendering each section as it
+// arrives. Returns the full answer, or null when streaming is unavailable.
+async function streamChatbotReply(message) {
+  const response = await fetch('http://127.0.0.1:5000/chatbot/stream', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify({ message: message })
+  });
+  
+  if (!response.ok || !response.body || !response.body.getReader) {
+    return null;
+  }
+  
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const sections = [];
+  let messageContent = null;
+  let buffer = '';
+  
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      
+      let event = 'message';
+      let data = '';
+      frame.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) {
+          event = line.slice(7);
+        } else if (line.startsWith('data: ')) {
+          data += line.slice(6);
+        }
+      });
+      
+      if (event === 'section') {
+        sections.push(JSON.parse(data).text);
+        if (!messageContent) {
+          hideTypingIndicator();
+          messageContent = displayMessage(sections.join('\n\n'), 'bot');
+        } else {
+          messageContent.innerHTML = formatMessageContent(sections.join('\n\n'));
+          const messagesContainer = document.getElementById('chatbotMessages');
+          messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        }
+      }
+    }
+  }
+  
+  if (!messageContent) {
+    hideTypingIndicator();
+  }
+  return sections.join('\n\n');
+}
+
 function displayMessage(content, type) {
   const messagesContainer = document.getElementById('chatbotMessages');
   const messageDiv = document.createElement('div');
@@ -593,6 +673,8 @@ function displayMessage(content, type) {
     messageDiv.style.opacity = '1';
     messageDiv.style.transform = 'translateY(0)';
   }, 50);
+  
+  return messageContent;
 }
 
 function formatMessageContent(content) {
@@ -727,147 +809,32 @@ document.getElementById('chatbotContainer')?.addEventListener('click', function(
 
 // Gujarat District-wise Crop Recommendation System
 
-// Gujarat Districts Data with Weather, Soil & Environmental Factors
-const GUJARAT_DISTRICTS = {
-  'Ahmedabad': {
-    climate: { temp: 28, humidity: 65, rainfall: 800 },
-    soil: { type: 'alluvial', ph: 7.2, fertility: 'medium' },
-    environment: { water_availability: 'moderate', irrigation: 'canal' },
-    recommended_crops: ['cotton', 'wheat', 'bajra', 'groundnut']
-  },
-  'Surat': {
-    climate: { temp: 30, humidity: 75, rainfall: 1200 },
-    soil: { type: 'alluvial', ph: 6.8, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'river' },
-    recommended_crops: ['sugarcane', 'cotton', 'rice', 'banana']
-  },
-  'Vadodara': {
-    climate: { temp: 29, humidity: 70, rainfall: 900 },
-    soil: { type: 'black_cotton', ph: 7.5, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'canal' },
-    recommended_crops: ['cotton', 'wheat', 'maize', 'sugarcane']
-  },
-  'Rajkot': {
-    climate: { temp: 27, humidity: 60, rainfall: 600 },
-    soil: { type: 'black_cotton', ph: 7.8, fertility: 'medium' },
-    environment: { water_availability: 'limited', irrigation: 'groundwater' },
-    recommended_crops: ['cotton', 'groundnut', 'castor', 'wheat']
-  },
-  'Bhavnagar': {
-    climate: { temp: 28, humidity: 65, rainfall: 550 },
-    soil: { type: 'coastal_alluvial', ph: 7.0, fertility: 'medium' },
-    environment: { water_availability: 'limited', irrigation: 'groundwater' },
-    recommended_crops: ['cotton', 'groundnut', 'bajra', 'sesame']
-  },
-  'Jamnagar': {
-    climate: { temp: 29, humidity: 70, rainfall: 400 },
-    soil: { type: 'sandy_loam', ph: 7.3, fertility: 'low' },
-    environment: { water_availability: 'scarce', irrigation: 'drip' },
-    recommended_crops: ['groundnut', 'castor', 'bajra', 'cotton']
-  },
-  'Junagadh': {
-    climate: { temp: 26, humidity: 68, rainfall: 900 },
-    soil: { type: 'black_cotton', ph: 7.4, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'canal' },
-    recommended_crops: ['cotton', 'groundnut', 'wheat', 'mango']
-  },
-  'Gandhinagar': {
-    climate: { temp: 28, humidity: 62, rainfall: 750 },
-    soil: { type: 'alluvial', ph: 7.1, fertility: 'medium' },
-    environment: { water_availability: 'moderate', irrigation: 'canal' },
-    recommended_crops: ['wheat', 'bajra', 'cotton', 'vegetables']
-  },
-  'Anand': {
-    climate: { temp: 27, humidity: 68, rainfall: 850 },
-    soil: { type: 'alluvial', ph: 6.9, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'canal' },
-    recommended_crops: ['tobacco', 'cotton', 'wheat', 'sugarcane']
-  },
-  'Kutch': {
-    climate: { temp: 30, humidity: 55, rainfall: 350 },
-    soil: { type: 'sandy', ph: 8.0, fertility: 'low' },
-    environment: { water_availability: 'very_limited', irrigation: 'drip' },
-    recommended_crops: ['castor', 'bajra', 'mustard', 'cumin']
-  },
-  'Banaskantha': {
-    climate: { temp: 26, humidity: 58, rainfall: 650 },
-    soil: { type: 'sandy_loam', ph: 7.6, fertility: 'medium' },
-    environment: { water_availability: 'moderate', irrigation: 'tube_well' },
-    recommended_crops: ['bajra', 'wheat', 'mustard', 'castor']
-  },
-  'Sabarkantha': {
-    climate: { temp: 25, humidity: 62, rainfall: 800 },
-    soil: { type: 'red_sandy', ph: 6.5, fertility: 'medium' },
-    environment: { water_availability: 'moderate', irrigation: 'tube_well' },
-    recommended_crops: ['maize', 'wheat', 'bajra', 'vegetables']
-  },
-  'Mehsana': {
-    climate: { temp: 27, humidity: 60, rainfall: 700 },
-    soil: { type: 'alluvial', ph: 7.3, fertility: 'medium' },
-    environment: { water_availability: 'moderate', irrigation: 'tube_well' },
-    recommended_crops: ['bajra', 'wheat', 'mustard', 'cumin']
-  },
-  'Patan': {
-    climate: { temp: 28, humidity: 58, rainfall: 650 },
-    soil: { type: 'sandy_loam', ph: 7.5, fertility: 'medium' },
-    environment: { water_availability: 'limited', irrigation: 'tube_well' },
-    recommended_crops: ['bajra', 'castor', 'mustard', 'wheat']
-  },
-  'Kheda': {
-    climate: { temp: 28, humidity: 65, rainfall: 800 },
-    soil: { type: 'black_cotton', ph: 7.2, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'canal' },
-    recommended_crops: ['tobacco', 'cotton', 'wheat', 'rice']
-  },
-  'Panchmahals': {
-    climate: { temp: 26, humidity: 70, rainfall: 950 },
-    soil: { type: 'red_loam', ph: 6.8, fertility: 'medium' },
-    environment: { water_availability: 'good', irrigation: 'canal' },
-    recommended_crops: ['maize', 'wheat', 'cotton', 'vegetables']
-  },
-  'Dahod': {
-    climate: { temp: 25, humidity: 72, rainfall: 1000 },
-    soil: { type: 'red_loam', ph: 6.6, fertility: 'medium' },
-    environment: { water_availability: 'good', irrigation: 'canal' },
-    recommended_crops: ['maize', 'wheat', 'cotton', 'soybean']
-  },
-  'Valsad': {
-    climate: { temp: 31, humidity: 80, rainfall: 1800 },
-    soil: { type: 'coastal_alluvial', ph: 6.5, fertility: 'high' },
-    environment: { water_availability: 'abundant', irrigation: 'river' },
-    recommended_crops: ['rice', 'sugarcane', 'coconut', 'mango']
-  },
-  'Navsari': {
-    climate: { temp: 30, humidity: 78, rainfall: 1500 },
-    soil: { type: 'alluvial', ph: 6.7, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'river' },
-    recommended_crops: ['sugarcane', 'rice', 'banana', 'vegetables']
-  },
-  'Bharuch': {
-    climate: { temp: 29, humidity: 72, rainfall: 1100 },
-    soil: { type: 'alluvial', ph: 7.0, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'river' },
-    recommended_crops: ['cotton', 'sugarcane', 'rice', 'banana']
-  },
-  'Narmada': {
-    climate: { temp: 28, humidity: 75, rainfall: 1200 },
-    soil: { type: 'alluvial', ph: 6.9, fertility: 'high' },
-    environment: { water_availability: 'abundant', irrigation: 'river' },
-    recommended_crops: ['rice', 'sugarcane', 'cotton', 'wheat']
-  },
-  'Tapi': {
-    climate: { temp: 29, humidity: 76, rainfall: 1300 },
-    soil: { type: 'alluvial', ph: 6.8, fertility: 'high' },
-    environment: { water_availability: 'good', irrigation: 'river' },
-    recommended_crops: ['rice', 'sugarcane', 'cotton', 'vegetables']
-  },
-  'Dang': {
-    climate: { temp: 24, humidity: 85, rainfall: 2200 },
-    soil: { type: 'red_loam', ph: 6.2, fertility: 'medium' },
-    environment: { water_availability: 'abundant', irrigation: 'natural' },
-    recommended_crops: ['rice', 'maize', 'vegetables', 'fruits']
+// District profiles are served by the backend (GET /districts); the browser
+// revalidates them with ETags, and single districts are fetched on demand
+const DISTRICTS_API = 'http://127.0.0.1:5000/districts';
+let districtSummaryPromise = null;
+
+async function fetchDistrictJson(url) {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`District request failed with status ${response.status}`);
   }
-};
+  return response.json();
+}
+
+function fetchDistrictSummary() {
+  if (!districtSummaryPromise) {
+    districtSummaryPromise = fetchDistrictJson(DISTRICTS_API).catch(error => {
+      districtSummaryPromise = null;
+      throw error;
+    });
+  }
+  return districtSummaryPromise;
+}
+
+function fetchDistrict(districtName) {
+  return fetchDistrictJson(`${DISTRICTS_API}/${encodeURIComponent(districtName)}`);
+}
 
 // Gujarat District-wise Crop Recommendation Function
 async function getGujaratRecommendations() {
@@ -902,7 +869,7 @@ async function getGujaratRecommendations() {
     result.classList.remove('show');
     
     // Generate analysis data
-    const analysisData = generateGujaratAnalysis();
+    const analysisData = await generateGujaratAnalysis();
     console.log('Generated analysis data:', analysisData);
     
     // Hide loading and display results
@@ -933,41 +900,16 @@ async function getGujaratRecommendations() {
   }
 }
 
-function generateGujaratAnalysis() {
-  const districts = Object.keys(GUJARAT_DISTRICTS);
-  const totalDistricts = districts.length;
-  
-  // Analyze crop distribution
-  const cropFrequency = {};
-  const soilTypes = {};
-  const irrigationMethods = {};
-  
-  districts.forEach(district => {
-    const data = GUJARAT_DISTRICTS[district];
-    
-    // Count crop recommendations
-    data.recommended_crops.forEach(crop => {
-      cropFrequency[crop] = (cropFrequency[crop] || 0) + 1;
-    });
-    
-    // Count soil types
-    soilTypes[data.soil.type] = (soilTypes[data.soil.type] || 0) + 1;
-    
-    // Count irrigation methods
-    irrigationMethods[data.environment.irrigation] = (irrigationMethods[data.environment.irrigation] || 0) + 1;
-  });
-  
-  // Get top recommendations
-  const topCrops = Object.entries(cropFrequency)
-    .sort(([,a], [,b]) => b - a)
-    .slice(0, 5);
+async function generateGujaratAnalysis() {
+  // Aggregates are computed once by the server
+  const summary = await fetchDistrictSummary();
   
   return {
-    totalDistricts,
-    topCrops,
-    soilTypes,
-    irrigationMethods,
-    districts: GUJARAT_DISTRICTS
+    totalDistricts: summary.total_districts,
+    topCrops: summary.top_crops,
+    soilTypes: summary.soil_types,
+    irrigationMethods: summary.irrigation_methods,
+    districts: summary.districts
   };
 }
 
@@ -1096,8 +1038,15 @@ function displayGujaratResults(analysisData) {
 }
 
 // Download Gujarat report function
-function downloadGujaratReport() {
-  const analysisData = generateGujaratAnalysis();
+async function downloadGujaratReport() {
+  let analysisData;
+  try {
+    analysisData = await generateGujaratAnalysis();
+  } catch (error) {
+    console.error('Gujarat report error:', error);
+    displayError('Failed to load Gujarat district data. Please try again.');
+    return;
+  }
   const reportContent = `
 Gujarat Agricultural Analysis Report
 Generated on: ${new Date().toLocaleDateString()}
@@ -1140,8 +1089,15 @@ For detailed district-wise recommendations, please refer to the complete analysi
 }
 
 // Show district details function
-function showDistrictDetails() {
-  const analysisData = generateGujaratAnalysis();
+async function showDistrictDetails() {
+  let analysisData;
+  try {
+    analysisData = await generateGujaratAnalysis();
+  } catch (error) {
+    console.error('District details error:', error);
+    displayError('Failed to load Gujarat district data. Please try again.');
+    return;
+  }
   const result = document.getElementById('result');
   
   result.innerHTML = `
@@ -1198,12 +1154,17 @@ function showDistrictDetails() {
 }
 
 // Show single district detail function
-function showSingleDistrictDetail(districtName) {
-  const analysisData = generateGujaratAnalysis();
-  const districtData = analysisData.districts[districtName];
+async function showSingleDistrictDetail(districtName) {
+  let districtData;
+  try {
+    districtData = await fetchDistrict(districtName);
+  } catch (error) {
+    console.error('District detail error:', error);
+    displayError(`Failed to load ${districtName} district data. Please try again.`);
+    return;
+  }
   const result = document.getElementById('result');
-  
-  if (!districtData) return;
+  const modelRecommendation = Object.values(districtData.model_recommendations || {})[0];
   
   result.innerHTML = `
     <div class="success-container">
@@ -1273,6 +1234,12 @@ function showSingleDistrictDetail(districtName) {
                 </div>
               `).join('')}
             </div>
+            ${modelRecommendation ? `
+              <div class="detail-item">
+                <span>Model Recommendation:</span>
+                <strong>${escapeHtml(modelRecommendation.recommended_crop)} (${Math.round(modelRecommendation.confidence * 100)}% confidence)</strong>
+              </div>
+            ` : ''}
           </div>
         </div>
       </div>
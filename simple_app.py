@@ -3,478 +3,584 @@ Simplified Flask Backend for Crop Recommendation System
 This version works without requiring model training
 """
 
-from flask import Flask, request, jsonify
+# Startup phases are timed from here (python simple_app.py --profile-startup)
+from startup import LazyResource, StartupProfile
+STARTUP = StartupProfile()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+import argparse
+import csv
+import io
+import itertools
 import logging
 import numpy as np
 from datetime import datetime
 import os
+import time
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('crop_recommendation.log'),
-        logging.StreamHandler()
-    ]
+from admission import AdmissionController, Rejection
+from chatbot_engine import FARMING_KNOWLEDGE, RESPONSES, get_chatbot_response, match_intent
+from crop_engine import (
+    FEATURE_FIELDS,
+    REQUEST_SCHEMA,
+    simple_crop_recommendation,
+    simple_crop_recommendation_batch,
+    validate_feedback_batch,
+    validate_input_batch,
 )
+from district_profiles import load_district_registry
+from feedback_store import FeedbackStore
+from fast_json import install_fast_json
+from knowledge_index import load_knowledge_index
+from log_pipeline import REQUEST_LOGGER_NAME, configure_logging_from_env
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry
+from prediction_cache import LRUCache, PredictionCache
+from request_profiling import PhaseTimer, RequestProfiler, token_matches
+from response_cache import PreparedBody, answer_sections, sse_frame
+from scenario_sweep import SweepError, run_sweep
+from traffic_capture import TrafficRecorder, decode_body, replayable, response_body
+from wsgi_server import run_production
+
+STARTUP.mark('imports')
+
+# Configure logging: records are queued and written by a background thread
+configure_logging_from_env('crop_recommendation.log')
 logger = logging.getLogger(__name__)
+# Per-request INFO lines go through their own logger so they can be sampled
+request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+STARTUP.mark('logging')
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Enable CORS for every route but the admin ones, which browsers on other
+# origins have no business calling
+CORS(app, resources={r"^/(?!feedback|cache/flush|models/reload).*": {"origins": "*"}})
 
-# Simple rule-based crop recommendation system
-def simple_crop_recommendation(N, P, K, temperature, humidity, ph, rainfall):
-    """
-    Simple rule-based crop recommendation system
-    This is a fallback when the ML model is not available
-    """
-    # Simple rules based on typical crop requirements
-    if temperature < 15:
-        if humidity > 80:
-            return "rice", 0.85
-        else:
-            return "wheat", 0.80
-    elif temperature < 25:
-        if ph > 7:
-            return "maize", 0.82
-        elif rainfall > 200:
-            return "rice", 0.88
-        else:
-            return "chickpea", 0.75
-    elif temperature < 35:
-        if humidity > 70:
-            return "banana", 0.90
-        elif ph > 6.5:
-            return "mango", 0.85
-        else:
-            return "cotton", 0.78
-    else:
-        if rainfall > 150:
-            return "sugarcane", 0.80
+# Use orjson for request parsing and responses when it is installed
+FAST_JSON = install_fast_json(app, os.environ.get('CROP_FAST_JSON', '1').lower() not in ('0', 'false', 'no'))
+
+# Request and engine metrics served at /metrics
+METRICS = Registry()
+REQUEST_LATENCY = METRICS.histogram(
+    'crop_http_request_duration_seconds', 'Request latency by route', ['route', 'method'])
+REQUEST_COUNT = METRICS.counter(
+    'crop_http_requests_total', 'Requests by route and status code', ['route', 'method', 'status'])
+REQUESTS_IN_FLIGHT = METRICS.gauge(
+    'crop_http_requests_in_flight', 'Requests currently being handled', ['route'])
+PREDICTIONS = METRICS.counter(
+    'crop_predictions_total', 'Predictions by engine and recommended crop', ['engine', 'crop'])
+VALIDATION_FAILURES = METRICS.counter(
+    'crop_validation_failures_total', 'Rejected prediction inputs by field', ['field'])
+CHATBOT_INTENTS = METRICS.counter(
+    'crop_chatbot_intents_total', 'Chatbot answers by mode and intent', ['mode', 'intent'])
+SLOW_REQUESTS = METRICS.counter(
+    'crop_slow_requests_total', 'Requests slower than CROP_SLOW_REQUEST_MS by route', ['route'])
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(route=g.metrics_route)
+
+@app.after_request
+def record_request_metrics(response):
+    route = g.get('metrics_route', 'unmatched')
+    REQUEST_LATENCY.observe(time.perf_counter() - g.get('metrics_start', time.perf_counter()),
+                            route=route, method=request.method)
+    REQUEST_COUNT.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'metrics_route' in g:
+        REQUESTS_IN_FLIGHT.dec(route=g.pop('metrics_route'))
+
+# Requests slower than CROP_SLOW_REQUEST_MS (0 = never) are logged with the
+# time spent in each phase. Sending CROP_PROFILE_TOKEN in the X-Profile header
+# runs that request under cProfile; the profile id comes back in X-Profile-Id
+# and the report is served at /debug/profiles/<id>. The token is never taken
+# from the query string, which access logs and traffic capture record
+SLOW_REQUEST_SECONDS = float(os.environ.get('CROP_SLOW_REQUEST_MS', 500)) / 1000
+PROFILER = RequestProfiler(
+    os.environ.get('CROP_PROFILE_TOKEN'),
+    os.environ.get('CROP_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')),
+    keep=int(os.environ.get('CROP_PROFILE_KEEP', 20))
+)
+
+def mark_phase(phase):
+    """End a timed phase of the current request"""
+    timer = g.get('phases')
+    if timer is not None:
+        timer.mark(phase)
+
+@app.before_request
+def start_request_profiling():
+    g.phases = PhaseTimer(g.metrics_start)
+    if PROFILER.enabled and PROFILER.authorized(request.headers.get('X-Profile')):
+        g.profiler = PROFILER.start()
+        g.profile_busy = g.profiler is None
+
+@app.after_request
+def finish_request_profiling(response):
+    timer = g.pop('phases', None)
+    if timer is not None and SLOW_REQUEST_SECONDS > 0:
+        total = timer.finish()
+        if total >= SLOW_REQUEST_SECONDS:
+            SLOW_REQUESTS.inc(route=g.get('metrics_route', 'unmatched'))
+            logger.warning("Slow request %s %s (%d) took %.1fms: %s",
+                           request.method, request.path, response.status_code, total * 1000, timer.summary())
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = PROFILER.stop(profiler, request.path)
+    elif g.pop('profile_busy', False):
+        response.headers['X-Profile-Id'] = 'busy'
+    return response
+
+@app.teardown_request
+def stop_request_profiling(exc):
+    # The profiler is still running when the request failed before after_request
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        PROFILER.stop(profiler, request.path)
+
+# Admission control: CROP_RATE_LIMIT requests per second per client (0 = off,
+# bursts up to CROP_RATE_BURST), at most CROP_MAX_IN_FLIGHT requests at once
+# (0 = unbounded) and a CROP_QUEUE_BUDGET_MS wait for a free slot before 503.
+# CROP_ADMISSION_BACKEND=shared shares the limits between gunicorn workers
+ADMISSION = AdmissionController(
+    rate=float(os.environ.get('CROP_RATE_LIMIT', 0)),
+    burst=float(os.environ.get('CROP_RATE_BURST', 0)) or None,
+    max_in_flight=int(os.environ.get('CROP_MAX_IN_FLIGHT', 64)),
+    queue_budget=float(os.environ.get('CROP_QUEUE_BUDGET_MS', 50)) / 1000,
+    backend=os.environ.get('CROP_ADMISSION_BACKEND', 'memory')
+)
+# Clients are told apart by X-API-Key when it is one of the comma-separated
+# CROP_API_KEYS, else by address (an unknown key would let a client pick a
+# fresh rate bucket per request); behind a reverse proxy set
+# CROP_TRUST_FORWARDED so X-Forwarded-For names the client
+API_KEYS = frozenset(filter(None, (key.strip() for key in os.environ.get('CROP_API_KEYS', '').split(','))))
+TRUST_FORWARDED = os.environ.get('CROP_TRUST_FORWARDED', '0').lower() in ('1', 'true', 'yes')
+# Probes and scrapes are never shed
+ADMISSION_EXEMPT_ROUTES = {'/health', '/metrics'}
+
+def client_key():
+    api_key = request.headers.get('X-API-Key')
+    if api_key in API_KEYS:
+        return 'key:' + api_key
+    address = request.access_route[0] if TRUST_FORWARDED and request.access_route else request.remote_addr
+    return 'ip:' + (address or 'unknown')
+
+@app.before_request
+def admit_request():
+    if not ADMISSION.enabled or request.method == 'OPTIONS' or g.metrics_route in ADMISSION_EXEMPT_ROUTES:
+        return None
+    try:
+        ADMISSION.admit(client_key())
+    except Rejection as rejection:
+        logger.warning("Shed %s %s from %s: %s", request.method, request.path, request.remote_addr, rejection.reason)
+        if rejection.status == 429:
+            body = {'error': 'Too many requests', 'message': 'Rate limit exceeded, please slow down'}
         else:
-            return "cotton", 0.75
+            body = {'error': 'Server overloaded', 'message': 'The server is busy, please retry shortly'}
+        body['retry_after'] = rejection.retry_after
+        response = jsonify(body)
+        response.status_code = rejection.status
+        response.headers['Retry-After'] = str(rejection.retry_after)
+        return response
+    g.admitted = True
+    mark_phase('admission')
+    return None
 
-def validate_input_data(data):
-    """Validate the input data for prediction"""
-    required_fields = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    
-    # Check if all required fields are present
-    missing_fields = [field for field in required_fields if field not in data]
-    if missing_fields:
-        return False, f"Missing required fields: {', '.join(missing_fields)}"
-    
-    # Check if all values are numeric
-    for field in required_fields:
-        try:
-            float(data[field])
-        except (ValueError, TypeError):
-            return False, f"Invalid value for {field}: must be a number"
-    
-    # Validate pH range (0-14)
-    ph_value = float(data['ph'])
-    if ph_value < 0 or ph_value > 14:
-        return False, "pH value must be between 0 and 14"
-    
-    # Validate humidity range (0-100)
-    humidity_value = float(data['humidity'])
-    if humidity_value < 0 or humidity_value > 100:
-        return False, "Humidity value must be between 0 and 100"
-    
-    # Validate temperature range (reasonable agricultural range)
-    temp_value = float(data['temperature'])
-    if temp_value < -50 or temp_value > 60:
-        return False, "Temperature value must be between -50 and 60 degrees Celsius"
-    
-    # Validate rainfall (non-negative)
-    rainfall_value = float(data['rainfall'])
-    if rainfall_value < 0:
-        return False, "Rainfall value must be non-negative"
-    
-    return True, "Valid input data"
+@app.teardown_request
+def release_admission(exc):
+    if g.pop('admitted', False):
+        ADMISSION.release()
 
-# AI Farming Assistant Knowledge Base
-FARMING_KNOWLEDGE = {
-    'crops': {
-        'rice': {
-            'soil': 'Clay or loamy soil with good water retention',
-            'climate': 'Warm, humid climate with temperatures 20-35°C',
-            'water': 'Requires flooding or consistent moisture',
-            'fertilizer': 'High nitrogen, moderate phosphorus and potassium',
-            'season': 'Monsoon season (June-October)',
-            'tips': 'Maintain 2-5cm water level, transplant after 25-30 days'
-        },
-        'wheat': {
-            'soil': 'Well-drained loamy soil with pH 6.0-7.5',
-            'climate': 'Cool, dry climate with temperatures 15-25°C',
-            'water': 'Moderate water requirement, avoid waterlogging',
-            'fertilizer': 'Balanced NPK with emphasis on nitrogen',
-            'season': 'Winter season (November-April)',
-            'tips': 'Sow after monsoon, harvest when grain moisture is 20-25%'
-        },
-        'maize': {
-            'soil': 'Well-drained fertile soil with pH 5.8-8.0',
-            'climate': 'Warm climate with temperatures 21-27°C',
-            'water': 'Regular watering, especially during tasseling',
-            'fertilizer': 'High nitrogen requirement, split application',
-            'season': 'Kharif (June-October) and Rabi (November-April)',
-            'tips': 'Plant after soil temperature reaches 16°C'
-        },
-        'cotton': {
-            'soil': 'Deep, well-drained black cotton soil',
-            'climate': 'Hot climate with temperatures 21-30°C',
-            'water': 'Moderate water, avoid excess moisture',
-            'fertilizer': 'Balanced NPK with micronutrients',
-            'season': 'Kharif season (May-October)',
-            'tips': 'Requires 180-200 frost-free days'
-        }
-    },
-    'soil_management': {
-        'sandy': {
-            'characteristics': 'Good drainage, low water retention, low fertility',
-            'improvements': 'Add organic matter, compost, cover crops',
-            'suitable_crops': 'Carrots, radish, potatoes, groundnuts',
-            'fertilizer': 'Frequent light applications, organic fertilizers'
-        },
-        'clay': {
-            'characteristics': 'Poor drainage, high water retention, high fertility',
-            'improvements': 'Add sand, organic matter, improve drainage',
-            'suitable_crops': 'Rice, wheat, sugarcane, cotton',
-            'fertilizer': 'Less frequent, heavy applications'
-        },
-        'loamy': {
-            'characteristics': 'Ideal soil, good drainage and retention',
-            'improvements': 'Maintain organic matter, regular testing',
-            'suitable_crops': 'Most crops grow well',
-            'fertilizer': 'Balanced application based on crop needs'
-        }
-    },
-    'irrigation': {
-        'drip': {
-            'description': 'Water delivered directly to plant roots',
-            'advantages': 'Water efficient, reduces weeds, precise control',
-            'suitable_for': 'Vegetables, fruits, cash crops',
-            'cost': 'High initial, low operational'
-        },
-        'sprinkler': {
-            'description': 'Water sprayed over crops like rainfall',
-            'advantages': 'Good coverage, suitable for various terrains',
-            'suitable_for': 'Field crops, lawns, orchards',
-            'cost': 'Moderate initial and operational'
-        },
-        'flood': {
-            'description': 'Field flooded with water',
-            'advantages': 'Simple, low cost, suitable for rice',
-            'suitable_for': 'Rice, sugarcane',
-            'cost': 'Low initial, high water usage'
-        }
-    },
-    'fertilizers': {
-        'organic': {
-            'types': 'Compost, manure, vermicompost, green manure',
-            'benefits': 'Improves soil structure, slow release, eco-friendly',
-            'application': 'Apply before planting, mix with soil',
-            'crops': 'All crops, especially vegetables and fruits'
-        },
-        'chemical': {
-            'types': 'NPK, urea, DAP, potash',
-            'benefits': 'Quick results, precise nutrient control',
-            'application': 'Follow soil test recommendations',
-            'crops': 'Field crops, high-yield varieties'
-        },
-        'bio': {
-            'types': 'Rhizobium, Azotobacter, PSB, KSB',
-            'benefits': 'Enhance nutrient availability, eco-friendly',
-            'application': 'Seed treatment or soil application',
-            'crops': 'Legumes, cereals, all crops'
-        }
-    }
-}
+def reclaim_admission(pid):
+    """Free the admission slots of a worker that died mid-request (runs in the master)"""
+    freed = ADMISSION.reclaim(pid)
+    if freed:
+        logger.warning("Reclaimed %d admission slots held by exited worker %d", freed, pid)
+
+# Opt-in traffic capture for replay_traffic.py: CROP_CAPTURE=1 appends a
+# CROP_CAPTURE_SAMPLE share of requests to CROP_CAPTURE_PATH
+CAPTURE_ENABLED = os.environ.get('CROP_CAPTURE', '0').lower() in ('1', 'true', 'yes')
+CAPTURE = TrafficRecorder(
+    os.environ.get('CROP_CAPTURE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requests.jsonl')),
+    sample_rate=float(os.environ.get('CROP_CAPTURE_SAMPLE', 1.0)),
+    buffer_lines=int(os.environ.get('CROP_CAPTURE_BUFFER', 100)),
+    max_body_bytes=int(os.environ.get('CROP_CAPTURE_MAX_BODY', 65536))
+) if CAPTURE_ENABLED else None
+# Upload streams are consumed by the response generator and cannot be kept.
+# Requests that change state are never captured, so a replay cannot repeat them
+CAPTURE_SKIP_ROUTES = {'/predict/stream', '/metrics'}
+
+@app.after_request
+def capture_request(response):
+    route = g.get('metrics_route')
+    if CAPTURE is None or route in CAPTURE_SKIP_ROUTES or not replayable(request.method, route):
+        return response
+    if (request.content_length or 0) > CAPTURE.max_body_bytes or not CAPTURE.sampled():
+        return response
+    try:
+        CAPTURE.record({
+            'ts': time.time(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'route': g.get('metrics_route', 'unmatched'),
+            'content_type': request.content_type,
+            'body': decode_body(request.get_data(cache=True), request.content_type),
+            'status': response.status_code,
+            'latency_ms': (time.perf_counter() - g.get('metrics_start', time.perf_counter())) * 1000,
+            'response': response_body(response)
+        })
+    except Exception as e:
+        logger.warning("Traffic capture failed: %s", e)
+    return response
+
+# Prediction engines are built once at startup; requests only pick one.
+# The registry swaps in a new centroid model when the dataset or artifact
+# changes, after checking it against a holdout slice of the dataset
+STARTUP.mark('app setup')
+# Farmer feedback (POST /feedback) is logged to CROP_FEEDBACK_PATH, folded
+# into the centroid model as it arrives and compacted into the dataset every
+# CROP_FEEDBACK_COMPACT_SECONDS (0 = only via python feedback_store.py compact)
+MODELS = ModelRegistry(
+    poll_interval=float(os.environ.get('CROP_MODEL_POLL_SECONDS', 5)),
+    min_accuracy=float(os.environ.get('CROP_MODEL_MIN_ACCURACY', 0.2)),
+    max_accuracy_drop=float(os.environ.get('CROP_MODEL_MAX_ACCURACY_DROP', 0.05)),
+    feedback=FeedbackStore(),
+    compact_interval=float(os.environ.get('CROP_FEEDBACK_COMPACT_SECONDS', 3600))
+)
+DEFAULT_ENGINE = os.environ.get('CROP_ENGINE', 'rule-based')
+if DEFAULT_ENGINE not in MODELS.engines:
+    logger.warning("Unknown engine '%s', falling back to rule-based", DEFAULT_ENGINE)
+    DEFAULT_ENGINE = 'rule-based'
+MAX_TOP_K = 10
+STARTUP.mark('engines')
+
+# Optional micro-batching of concurrent /predict calls
+MICROBATCH_ENABLED = os.environ.get('CROP_MICROBATCH', '0').lower() in ('1', 'true', 'yes')
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('CROP_MICROBATCH_WAIT_MS', 2))
+MICROBATCH_MAX_SIZE = int(os.environ.get('CROP_MICROBATCH_SIZE', 64))
+BATCHERS = {}
 
-def get_chatbot_response(message):
+def start_batchers(restart=False):
     """
-    Generate AI-powered farming assistant responses based on user queries
+    Keep one micro-batcher per current engine when micro-batching is enabled
+    Only batchers whose engine was swapped out are replaced, unless restart
+    is set (after fork, when no batcher thread survived)
     """
-    message_lower = message.lower()
-    
-    # Crop-specific queries
-    if any(crop in message_lower for crop in ['rice', 'wheat', 'maize', 'cotton', 'corn']):
-        crop_name = None
-        for crop in ['rice', 'wheat', 'maize', 'cotton']:
-            if crop in message_lower or (crop == 'maize' and 'corn' in message_lower):
-                crop_name = crop
-                break
-        
-        if crop_name and crop_name in FARMING_KNOWLEDGE['crops']:
-            crop_info = FARMING_KNOWLEDGE['crops'][crop_name]
-            return f"""🌾 **{crop_name.title()} Cultivation Guide:**
-
-**Soil Requirements:** {crop_info['soil']}
-**Climate:** {crop_info['climate']}
-**Water Needs:** {crop_info['water']}
-**Fertilizer:** {crop_info['fertilizer']}
-**Growing Season:** {crop_info['season']}
-
-💡 **Pro Tip:** {crop_info['tips']}
-
-Would you like specific advice on any aspect of {crop_name} cultivation?"""
-    
-    # Soil management queries
-    elif any(word in message_lower for word in ['soil', 'sandy', 'clay', 'loamy', 'fertility']):
-        if 'sandy' in message_lower:
-            soil_type = 'sandy'
-        elif 'clay' in message_lower:
-            soil_type = 'clay'
-        elif 'loamy' in message_lower:
-            soil_type = 'loamy'
-        else:
-            return """🌱 **Soil Management Tips:**
+    if not MICROBATCH_ENABLED:
+        return
+    engines = MODELS.engines
+    for name in list(BATCHERS):
+        if restart or engines.get(name) is not BATCHERS[name].engine:
+            BATCHERS.pop(name).close()
+    for name, engine in engines.items():
+        if name not in BATCHERS:
+            BATCHERS[name] = MicroBatcher(engine, MICROBATCH_MAX_WAIT_MS / 1000, MICROBATCH_MAX_SIZE)
 
-**Know Your Soil Type:**
-• Sandy: Good drainage, needs organic matter
-• Clay: Rich but heavy, improve drainage
-• Loamy: Ideal balance of sand, silt, clay
+if MICROBATCH_ENABLED:
+    start_batchers()
+    logger.info("Micro-batching enabled: max wait %sms, max batch %s", MICROBATCH_MAX_WAIT_MS, MICROBATCH_MAX_SIZE)
 
-**General Improvements:**
-• Add compost regularly
-• Test pH levels (6.0-7.5 ideal for most crops)
-• Use cover crops
-• Avoid overworking wet soil
+# Bounded cache of /predict responses keyed on the exact inputs
+PREDICTION_CACHE = PredictionCache(
+    FEATURE_FIELDS,
+    max_size=int(os.environ.get('CROP_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('CROP_CACHE_TTL', 0)) or None
+)
 
-Which soil type would you like specific advice for?"""
-        
-        if soil_type in FARMING_KNOWLEDGE['soil_management']:
-            soil_info = FARMING_KNOWLEDGE['soil_management'][soil_type]
-            return f"""🌱 **{soil_type.title()} Soil Management:**
+# Chatbot answering mode: 'rules' (keyword intents) or 'retrieval' (TF-IDF)
+CHATBOT_MODE = os.environ.get('CHATBOT_MODE', 'rules')
+CHATBOT_MIN_SCORE = float(os.environ.get('CHATBOT_MIN_SCORE', 0.15))
+CHATBOT_TOP_K = int(os.environ.get('CHATBOT_TOP_K', 3))
+# Serialized /chatbot bodies; only the timestamp is spliced in per request.
+# The LRU maps (mode, lowercased message) to a body, and rules-mode bodies are
+# shared per matched intent. Messages longer than CHATBOT_CACHE_MAX_MESSAGE
+# characters are answered but not cached, so the LRU's memory stays bounded.
+# Bodies of at least CHATBOT_GZIP_MIN_BYTES also keep a precompressed gzip
+# variant (CHATBOT_GZIP_LEVEL=0 disables it)
+CHATBOT_CACHE = LRUCache(max_size=int(os.environ.get('CHATBOT_CACHE_SIZE', 1024)))
+CHATBOT_CACHE_MAX_MESSAGE = int(os.environ.get('CHATBOT_CACHE_MAX_MESSAGE', 512))
+CHATBOT_INTENT_BODIES = {}
+CHATBOT_GZIP_LEVEL = int(os.environ.get('CHATBOT_GZIP_LEVEL', 6))
+CHATBOT_GZIP_MIN_BYTES = int(os.environ.get('CHATBOT_GZIP_MIN_BYTES', 256))
 
-**Characteristics:** {soil_info['characteristics']}
-**Improvements:** {soil_info['improvements']}
-**Suitable Crops:** {soil_info['suitable_crops']}
-**Fertilizer Strategy:** {soil_info['fertilizer']}
+# Loaded on first use, or by warm_up() when retrieval is the default mode
+KNOWLEDGE_INDEX = LazyResource('knowledge index', load_knowledge_index, STARTUP)
 
-Need help with specific soil problems?"""
-    
-    # Irrigation queries
-    elif any(word in message_lower for word in ['irrigation', 'watering', 'drip', 'sprinkler', 'water']):
-        if 'drip' in message_lower:
-            method = 'drip'
-        elif 'sprinkler' in message_lower:
-            method = 'sprinkler'
-        elif 'flood' in message_lower:
-            method = 'flood'
-        else:
-            return """💧 **Irrigation Methods Comparison:**
+# District profiles with engine recommendations precomputed on first use
+DISTRICTS = LazyResource('district profiles', lambda: load_district_registry(MODELS.engines), STARTUP)
 
-**Drip Irrigation:** Most efficient, 90-95% efficiency
-**Sprinkler:** Good for field crops, 70-80% efficiency  
-**Flood/Furrow:** Traditional method, 40-60% efficiency
+def on_model_swap(snapshot):
+    """
+    Point batchers and district results at the new models
+    Cached predictions are keyed on the engine version, so entries of the old
+    model just age out. Feedback folds (one per POST /feedback) keep the
+    district results and their ETags until the next validated rebuild
+    """
+    start_batchers()
+    if not snapshot.incremental:
+        DISTRICTS.reset()
 
-**Water-Saving Tips:**
-• Water early morning or evening
-• Mulch around plants
-• Check soil moisture before watering
-• Use drought-resistant varieties
+MODELS.add_listener(on_model_swap)
+MODELS.start_watching()
+STARTUP.mark('batching and caches')
+DISTRICTS_MAX_AGE = int(os.environ.get('CROP_DISTRICTS_MAX_AGE', 3600))
 
-Which irrigation method interests you most?"""
-        
-        if method in FARMING_KNOWLEDGE['irrigation']:
-            irrigation_info = FARMING_KNOWLEDGE['irrigation'][method]
-            return f"""💧 **{method.title()} Irrigation System:**
+def answer_message(message, mode):
+    """
+    Answer a chatbot message, returns (response, mode_used, matches, intent)
+    Retrieval falls back to the keyword rules when no entry scores at least
+    CHATBOT_MIN_SCORE
+    """
+    if mode == 'retrieval':
+        index = KNOWLEDGE_INDEX.get()
+        matches = index.search(message, CHATBOT_TOP_K)
+        if matches and matches[0][2] >= CHATBOT_MIN_SCORE:
+            category, key, _ = matches[0]
+            return index.bodies[(category, key)], 'retrieval', [
+                {'category': category, 'key': key, 'score': score} for category, key, score in matches
+            ], category
+    # Same answer as get_chatbot_response, keeping the intent for metrics
+    intent = match_intent(message)
+    return RESPONSES[intent], 'rules', None, intent[0]
+
+def prepared_chatbot_stream(bot_response, body):
+    """
+    Server-sent event frames for a streamed answer: one 'section' frame per
+    section and the final 'done' metadata frame, awaiting its timestamp
+    """
+    sections = answer_sections(bot_response)
+    frames = tuple(
+        sse_frame('section', app.json.dumps({'index': index, 'text': section}))
+        for index, section in enumerate(sections)
+    )
+    done = {key: value for key, value in body.items() if key != 'response'}
+    done['sections'] = len(sections)
+    return frames, PreparedBody(done, 'timestamp', app.json.dumps, 0)
 
-**How it works:** {irrigation_info['description']}
-**Advantages:** {irrigation_info['advantages']}
-**Best for:** {irrigation_info['suitable_for']}
-**Cost consideration:** {irrigation_info['cost']}
+def prepared_chatbot_reply(message, mode):
+    """Cached (PreparedBody, mode_used, intent, response, stream) for a chatbot message"""
+    # Both the keyword matcher and retrieval ignore case
+    key = (mode, message.lower()) if len(message) <= CHATBOT_CACHE_MAX_MESSAGE else None
+    entry = CHATBOT_CACHE.get(key) if key is not None else None
+    if entry is None:
+        intent_key = ('rules', match_intent(message)) if mode == 'rules' else None
+        entry = CHATBOT_INTENT_BODIES.get(intent_key)
+        if entry is None:
+            bot_response, mode_used, matches, intent = answer_message(message, mode)
+            body = {'response': bot_response, 'status': 'success', 'mode': mode_used}
+            if matches:
+                body['matches'] = matches
+            level = CHATBOT_GZIP_LEVEL if len(bot_response.encode('utf-8')) >= CHATBOT_GZIP_MIN_BYTES else 0
+            entry = (PreparedBody(body, 'timestamp', app.json.dumps, level), mode_used, intent, bot_response,
+                     prepared_chatbot_stream(bot_response, dict(body, intent=intent)))
+            if intent_key is not None:
+                CHATBOT_INTENT_BODIES[intent_key] = entry
+        if key is not None:
+            CHATBOT_CACHE.put(key, entry)
+    return entry
 
-Would you like installation or maintenance tips?"""
+def score_features(engine, features, top_k=None):
+    """Run one row through the engine and build the /predict response body"""
+    # Make prediction using the selected engine, through its batcher if enabled.
+    # A request that picked its engine before a model swap keeps that engine
+    batcher = BATCHERS.get(engine.name)
+    scorer = batcher if batcher is not None and batcher.engine is engine else engine
+    prediction, confidence = scorer.predict(features)
     
-    # Fertilizer queries
-    elif any(word in message_lower for word in ['fertilizer', 'fertiliser', 'nutrient', 'npk', 'organic', 'compost']):
-        if 'organic' in message_lower:
-            fert_type = 'organic'
-        elif 'chemical' in message_lower or 'npk' in message_lower:
-            fert_type = 'chemical'
-        elif 'bio' in message_lower:
-            fert_type = 'bio'
-        else:
-            return """🌿 **Fertilizer Guide:**
+    response = {
+        'recommended_crop': prediction,
+        'confidence': confidence,
+        'model_type': engine.name,
+        'model_version': engine.version
+    }
+    
+    if top_k:
+        crops, probabilities = engine.predict_top_k([features], top_k)
+        response['top_crops'] = [
+            {'crop': crop, 'probability': probability}
+            for crop, probability in zip(crops[0].tolist(), probabilities[0].tolist())
+        ]
+    
+    return response
 
-**Organic Fertilizers:** Slow release, improve soil health
-**Chemical Fertilizers:** Quick results, precise control
-**Bio-fertilizers:** Enhance nutrient availability naturally
+def select_engine(data):
+    """
+    Pick the engine and top-k requested via JSON body or query string
+    Returns (engine, top_k, error_message)
+    """
+    engines = MODELS.engines
+    engine_name = data.get('engine') or request.args.get('engine') or DEFAULT_ENGINE
+    if not isinstance(engine_name, str) or engine_name not in engines:
+        return None, None, f"Unknown engine '{engine_name}'. Available engines: {', '.join(engines)}"
+    top_k = data.get('top_k', request.args.get('top_k'))
+    if top_k is not None:
+        try:
+            top_k = int(top_k)
+        except (ValueError, TypeError):
+            return None, None, "top_k must be an integer"
+        if top_k < 1 or top_k > MAX_TOP_K:
+            return None, None, f"top_k must be between 1 and {MAX_TOP_K}"
+    return engines[engine_name], top_k, None
 
-**NPK Basics:**
-• N (Nitrogen): Leaf growth, green color
-• P (Phosphorus): Root development, flowering
-• K (Potassium): Disease resistance, fruit quality
+# Field named by each validate_input_data range-check message
+RANGE_ERROR_FIELDS = {
+    "pH value must be between 0 and 14": 'ph',
+    "Humidity value must be between 0 and 100": 'humidity',
+    "Temperature value must be between -50 and 60 degrees Celsius": 'temperature',
+    "Rainfall value must be non-negative": 'rainfall',
+}
 
-**Application Tips:**
-• Test soil before applying
-• Follow recommended doses
-• Apply at right growth stages
+def invalid_fields(message):
+    """Fields blamed by a validate_input_data error message, for metrics"""
+    if message.startswith("Missing required fields: "):
+        return message[len("Missing required fields: "):].split(', ')
+    if message.startswith("Invalid value for "):
+        return [message[len("Invalid value for "):].split(':')[0]]
+    return [RANGE_ERROR_FIELDS.get(message, 'other')]
 
-Which type of fertilizer would you like to know more about?"""
-        
-        if fert_type in FARMING_KNOWLEDGE['fertilizers']:
-            fert_info = FARMING_KNOWLEDGE['fertilizers'][fert_type]
-            return f"""🌿 **{fert_type.title()} Fertilizers:**
+def validate_input_data(data):
+    """Validate the input data for prediction"""
+    reading, message, _ = REQUEST_SCHEMA.parse(data)
+    if reading is None:
+        return False, message
+    return True, "Valid input data"
 
-**Types:** {fert_info['types']}
-**Benefits:** {fert_info['benefits']}
-**Application:** {fert_info['application']}
-**Best for:** {fert_info['crops']}
+# Maximum number of rows accepted by /predict/batch in a single request
+MAX_BATCH_SIZE = int(os.environ.get('CROP_MAX_BATCH_SIZE', 10000))
 
-Need specific application rates or timing advice?"""
-    
-    # Pest and disease queries
-    elif any(word in message_lower for word in ['pest', 'disease', 'insect', 'fungus', 'bug']):
-        return """🐛 **Integrated Pest Management (IPM):**
-
-**Prevention First:**
-• Crop rotation
-• Resistant varieties
-• Proper spacing
-• Clean cultivation
-
-**Natural Control:**
-• Beneficial insects (ladybugs, spiders)
-• Neem oil spray
-• Companion planting
-• Pheromone traps
-
-**Chemical Control (Last Resort):**
-• Use only when necessary
-• Follow label instructions
-• Rotate different chemicals
-• Protect beneficial insects
-
-**Common Issues:**
-• Aphids: Use neem oil or ladybugs
-• Fungal diseases: Improve air circulation
-• Caterpillars: Bt spray or hand picking
-
-What specific pest problem are you facing?"""
-    
-    # Weather and climate queries
-    elif any(word in message_lower for word in ['weather', 'climate', 'rain', 'drought', 'temperature']):
-        return """🌤️ **Weather & Climate Management:**
-
-**Monsoon Preparation:**
-• Ensure proper drainage
-• Choose flood-resistant varieties
-• Store seeds and fertilizers safely
-
-**Drought Management:**
-• Mulching to retain moisture
-• Drought-tolerant crops
-• Efficient irrigation systems
-• Rainwater harvesting
-
-**Temperature Stress:**
-• Shade nets for extreme heat
-• Windbreaks for cold protection
-• Proper planting timing
-
-**Weather Monitoring:**
-• Use weather apps/forecasts
-• Plan operations accordingly
-• Have contingency plans
-
-Are you dealing with any specific weather challenges?"""
+def records_from_batch_payload(data):
+    """
+    Normalize a /predict/batch payload into a list of records
+    Accepts a bare list of records, {"records": [...]} or {"columns": {field: [...]}}
+    """
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        raise ValueError("Payload must be a list of records or an object with 'records' or 'columns'")
+    if 'records' in data:
+        if not isinstance(data['records'], list):
+            raise ValueError("'records' must be a list")
+        return data['records']
+    if 'columns' in data:
+        columns = data['columns']
+        if not isinstance(columns, dict) or not all(isinstance(v, list) for v in columns.values()):
+            raise ValueError("'columns' must map field names to lists")
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        size = lengths.pop() if lengths else 0
+        return [{field: values[i] for field, values in columns.items()} for i in range(size)]
+    raise ValueError("Payload must contain 'records' or 'columns'")
+
+def score_records(engine, records, errors=None):
+    """
+    Validate and score a list of records in one vectorized engine call
+    Returns (results, valid_count) with one result dict per record. errors can
+    pre-set a message for rows that already failed upstream (e.g. parsing).
+    """
+    features, validation_errors = validate_input_batch(records)
+    if errors is not None:
+        validation_errors = [error or validation_error for error, validation_error in zip(errors, validation_errors)]
+    valid = np.array([error is None for error in validation_errors], dtype=bool)
     
-    # General farming advice
-    elif any(word in message_lower for word in ['farming', 'agriculture', 'cultivation', 'growing']):
-        return """🚜 **Smart Farming Practices:**
-
-**Planning Phase:**
-• Soil testing
-• Crop selection based on climate
-• Market research
-• Resource planning
-
-**Execution:**
-• Quality seeds/seedlings
-• Proper spacing
-• Timely operations
-• Record keeping
-
-**Technology Integration:**
-• Weather monitoring
-• Soil sensors
-• Precision agriculture
-• Mobile apps for guidance
-
-**Sustainability:**
-• Crop rotation
-• Organic practices
-• Water conservation
-• Biodiversity preservation
-
-**Success Factors:**
-• Continuous learning
-• Networking with other farmers
-• Government scheme utilization
-• Market linkages
-
-What specific aspect of farming would you like to explore?"""
+    crops, confidences = engine.predict_batch(features[valid])
     
-    # Crop recommendation integration
-    elif any(word in message_lower for word in ['recommend', 'suggestion', 'best crop', 'which crop']):
-        return """🎯 **Crop Recommendation Service:**
-
-I can help you choose the best crop based on your conditions! 
-
-**For personalized recommendations, please use the main form above with:**
-• Soil nutrients (N, P, K levels)
-• Temperature and humidity
-• pH level
-• Expected rainfall
-
-**Quick Guidelines:**
-• **High temperature + humidity:** Rice, sugarcane
-• **Moderate temperature:** Wheat, maize
-• **Low rainfall:** Cotton, millet
-• **High rainfall:** Rice, jute
-
-**Factors to Consider:**
-• Local market demand
-• Your experience level
-• Available resources
-• Government support schemes
-
-Would you like to fill the recommendation form above, or do you have specific conditions to discuss?"""
+    for error in validation_errors:
+        if error is not None:
+            for field in invalid_fields(error):
+                VALIDATION_FAILURES.inc(field=field)
+    for crop, count in zip(*np.unique(crops.astype(str), return_counts=True)):
+        PREDICTIONS.inc(int(count), engine=engine.name, crop=crop)
     
-    # Default response for unrecognized queries
-    else:
-        return """🌱 **I'm here to help with your farming questions!**
+    results = []
+    scored = iter(zip(crops.tolist(), confidences.tolist()))
+    for error in validation_errors:
+        if error is None:
+            crop, confidence = next(scored)
+            results.append({'recommended_crop': crop, 'confidence': confidence})
+        else:
+            results.append({'error': 'Invalid input data', 'message': error})
+    return results, int(valid.sum())
 
-I can assist you with:
-• 🌾 **Crop cultivation** (rice, wheat, maize, cotton, etc.)
-• 🌱 **Soil management** (sandy, clay, loamy soils)
-• 💧 **Irrigation systems** (drip, sprinkler, flood)
-• 🌿 **Fertilizers** (organic, chemical, bio-fertilizers)
-• 🐛 **Pest & disease management**
-• 🌤️ **Weather & climate adaptation**
-• 🎯 **Crop recommendations** (use the form above)
+# Rows parsed and scored together by /predict/stream
+STREAM_CHUNK_ROWS = int(os.environ.get('CROP_STREAM_CHUNK_ROWS', 5000))
+# Longest upload line /predict/stream reads, so one unbroken line cannot
+# exhaust memory (characters for CSV, bytes for NDJSON)
+STREAM_MAX_LINE = int(os.environ.get('CROP_STREAM_MAX_LINE', 65536))
 
-**Example questions you can ask:**
-• "How to grow rice in clay soil?"
-• "Best irrigation for vegetables?"
-• "Organic fertilizers for tomatoes?"
-• "How to manage aphids naturally?"
+def bounded_lines(reader, limit, newline):
+    """
+    Lines of a stream read at most limit at a time
+    Yields (line, complete); a line longer than limit is cut off, the rest of
+    it is skipped and complete is False
+    """
+    while True:
+        line = reader.readline(limit)
+        if not line:
+            return
+        if len(line) < limit or line.endswith(newline):
+            yield line, True
+            continue
+        rest = line
+        while rest and not rest.endswith(newline):
+            rest = reader.readline(limit)
+        yield line, False
 
-What would you like to know about farming?"""
+def csv_lines(text):
+    """Lines for csv.DictReader; an over-long line ends the upload"""
+    for line, complete in bounded_lines(text, STREAM_MAX_LINE, '\n'):
+        if not complete:
+            raise csv.Error(f"CSV line longer than {STREAM_MAX_LINE} characters")
+        yield line
+
+def iter_stream_records(stream, stream_format):
+    """
+    Parse a CSV or NDJSON request body incrementally
+    Yields (record, error) pairs; error is set for NDJSON lines that are not
+    valid JSON or are longer than STREAM_MAX_LINE
+    """
+    if stream_format == 'csv':
+        # utf-8-sig drops the BOM of Excel's "CSV UTF-8" exports
+        text = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+        for record in csv.DictReader(csv_lines(text)):
+            yield record, None
+        return
+    for line, complete in bounded_lines(io.BufferedReader(stream), STREAM_MAX_LINE, b'\n'):
+        if not complete:
+            yield None, f"Line longer than {STREAM_MAX_LINE} bytes"
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield app.json.loads(line), None
+        except ValueError:
+            yield None, "Invalid JSON line"
+
+def stream_format_from_request():
+    """'csv' or 'ndjson', from ?format= or the request Content-Type"""
+    stream_format = request.args.get('format')
+    if stream_format:
+        return stream_format.lower()
+    return 'csv' if 'csv' in (request.content_type or '') else 'ndjson'
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Main prediction endpoint"""
     try:
         # Log the incoming request
-        logger.info(f"Prediction request received at {datetime.now()}")
+        request_logger.info("Prediction request received")
         
         # Get JSON data from request
         data = request.get_json()
+        mark_phase('parse')
         
         if not data:
             logger.warning("No JSON data received")
@@ -482,99 +588,607 @@ def predict():
                 'error': 'No JSON data provided',
                 'message': 'Please send valid JSON data with required fields'
             }), 400
+        if not isinstance(data, dict):
+            logger.warning("Prediction body is not a JSON object")
+            return jsonify({
+                'error': 'Invalid input data',
+                'message': 'Send one record as a JSON object; use /predict/batch for lists'
+            }), 400
         
-        # Validate input data
-        is_valid, message = validate_input_data(data)
-        if not is_valid:
-            logger.warning(f"Invalid input data: {message}")
+        # Parse and validate all fields in one pass
+        features, message, failed_fields = REQUEST_SCHEMA.parse(data)
+        if features is None:
+            logger.warning("Invalid input data: %s", message)
+            for field in failed_fields:
+                VALIDATION_FAILURES.inc(field=field)
             return jsonify({
                 'error': 'Invalid input data',
                 'message': message
             }), 400
         
-        # Make prediction using simple rule-based system
-        prediction, confidence = simple_crop_recommendation(
-            float(data['N']),
-            float(data['P']),
-            float(data['K']),
-            float(data['temperature']),
-            float(data['humidity']),
-            float(data['ph']),
-            float(data['rainfall'])
-        )
+        engine, top_k, engine_error = select_engine(data)
+        if engine_error:
+            logger.warning("Invalid engine selection: %s", engine_error)
+            return jsonify({
+                'error': 'Invalid engine selection',
+                'message': engine_error
+            }), 400
+        mark_phase('validate')
+        
+        # Serve repeated inputs from the cache, otherwise run the engine
+        cache_key = PREDICTION_CACHE.make_key(features, engine.name, engine.version, top_k)
+        response = PREDICTION_CACHE.get(cache_key)
+        if response is None:
+            response = score_features(engine, features, top_k)
+            PREDICTION_CACHE.put(cache_key, response)
+        
+        PREDICTIONS.inc(engine=engine.name, crop=response['recommended_crop'])
+        mark_phase('engine')
         
         # Log the prediction result
-        logger.info(f"Prediction: {prediction}, Confidence: {confidence:.3f}")
+        request_logger.info("Prediction: %s, Confidence: %.3f", response['recommended_crop'], response['confidence'])
         
-        # Return successful response
-        response = {
-            'recommended_crop': prediction,
-            'confidence': confidence
-        }
+        body = jsonify(response)
+        mark_phase('serialize')
+        return body, 200
+        
+    except Exception as e:
+        logger.error("Error in prediction: %s", e)
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An error occurred while processing your request'
+        }), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Batch prediction endpoint scoring many records in one vectorized pass"""
+    try:
+        request_logger.info("Batch prediction request received")
+        
+        data = request.get_json()
+        
+        if not data:
+            logger.warning("No JSON data received")
+            return jsonify({
+                'error': 'No JSON data provided',
+                'message': 'Please send a list of records or column arrays'
+            }), 400
+        
+        try:
+            records = records_from_batch_payload(data)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid batch payload',
+                'message': str(e)
+            }), 400
+        
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': 'Batch too large',
+                'message': f"A batch may contain at most {MAX_BATCH_SIZE} records"
+            }), 413
         
-        return jsonify(response), 200
+        engine, _, engine_error = select_engine(data if isinstance(data, dict) else {})
+        if engine_error:
+            return jsonify({
+                'error': 'Invalid engine selection',
+                'message': engine_error
+            }), 400
+        
+        results, valid_count = score_records(engine, records)
+        
+        request_logger.info("Batch prediction: %d records, %d valid", len(records), valid_count)
+        
+        return jsonify({
+            'results': results,
+            'count': len(records),
+            'valid_count': valid_count,
+            'model_type': engine.name,
+            'model_version': engine.version
+        }), 200
         
     except Exception as e:
-        logger.error(f"Error in prediction: {str(e)}")
+        logger.error("Error in batch prediction: %s", e)
         return jsonify({
             'error': 'Internal server error',
             'message': 'An error occurred while processing your request'
         }), 500
 
-@app.route('/chatbot', methods=['POST'])
-def chatbot():
-    """AI Farming Assistant Chatbot endpoint"""
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """
+    Bulk scoring endpoint for CSV or NDJSON uploads of any size
+    The body is parsed and scored in chunks of STREAM_CHUNK_ROWS and results
+    are streamed back as NDJSON, one line per input row plus a summary line
+    """
+    request_logger.info("Stream prediction request received")
+    
+    stream_format = stream_format_from_request()
+    if stream_format not in ('csv', 'ndjson'):
+        return jsonify({
+            'error': 'Invalid stream format',
+            'message': "Format must be 'csv' or 'ndjson'"
+        }), 400
+    
+    engine, _, engine_error = select_engine({})
+    if engine_error:
+        return jsonify({
+            'error': 'Invalid engine selection',
+            'message': engine_error
+        }), 400
+    
+    def generate():
+        rows = 0
+        valid_rows = 0
+        parsed = iter_stream_records(request.stream, stream_format)
+        try:
+            while True:
+                chunk = list(itertools.islice(parsed, STREAM_CHUNK_ROWS))
+                if not chunk:
+                    break
+                records = [record for record, _ in chunk]
+                results, valid_count = score_records(engine, records, [error for _, error in chunk])
+                lines = []
+                for offset, result in enumerate(results, start=rows + 1):
+                    result['row'] = offset
+                    lines.append(app.json.dumps(result))
+                rows += len(chunk)
+                valid_rows += valid_count
+                yield '\n'.join(lines) + '\n'
+        except csv.Error as e:
+            yield app.json.dumps({'error': 'Invalid CSV', 'message': str(e), 'row': rows + 1}) + '\n'
+            return
+        except Exception as e:
+            logger.error("Error in stream prediction after %d rows: %s", rows, e)
+            yield app.json.dumps({'error': 'Internal server error', 'row': rows + 1}) + '\n'
+            return
+        request_logger.info("Stream prediction: %d rows, %d valid", rows, valid_rows)
+        yield app.json.dumps({'summary': {
+            'rows': rows,
+            'valid_count': valid_rows,
+            'error_count': rows - valid_rows,
+            'model_type': engine.name,
+            'model_version': engine.version
+        }}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def parse_chatbot_request():
+    """(message, mode, None) from a chatbot request, or (None, None, error response)"""
+    data = request.get_json()
+    mark_phase('parse')
+    
+    if not isinstance(data, dict) or 'message' not in data:
+        logger.warning("No message provided in chatbot request")
+        return None, None, (jsonify({
+            'error': 'No message provided',
+            'response': 'Please provide a message to get farming assistance.'
+        }), 400)
+    if not isinstance(data['message'], str):
+        return None, None, (jsonify({
+            'error': 'Invalid message',
+            'response': 'The message must be text.'
+        }), 400)
+    
+    user_message = data['message'].strip()
+    
+    if not user_message:
+        return None, None, (jsonify({
+            'error': 'Empty message',
+            'response': 'Please ask me something about farming, crops, or agriculture!'
+        }), 400)
+    
+    mode = data.get('mode') or CHATBOT_MODE
+    if mode not in ('rules', 'retrieval'):
+        return None, None, (jsonify({
+            'error': 'Invalid mode',
+            'response': "Mode must be 'rules' or 'retrieval'."
+        }), 400)
+    mark_phase('validate')
+    return user_message, mode, None
+
+# Largest cartesian grid /predict/sweep scores in one request
+MAX_SWEEP_POINTS = int(os.environ.get('CROP_MAX_SWEEP_POINTS', 250000))
+
+@app.route('/predict/sweep', methods=['POST'])
+def predict_sweep():
+    """
+    What-if sweep: vary fields of a base record over grids and score every
+    combination in one engine pass, returning the crop/confidence matrix and
+    where the recommendation changes
+    """
     try:
-        # Log the incoming request
-        logger.info(f"Chatbot request received at {datetime.now()}")
+        request_logger.info("Sweep request received")
         
-        # Get JSON data from request
         data = request.get_json()
+        mark_phase('parse')
+        if not isinstance(data, dict) or not isinstance(data.get('base'), dict):
+            return jsonify({
+                'error': 'No base record provided',
+                'message': "Send a 'base' record with the required fields and a 'grid' of values to sweep"
+            }), 400
         
-        if not data or 'message' not in data:
-            logger.warning("No message provided in chatbot request")
+        base, message, failed_fields = REQUEST_SCHEMA.parse(data['base'])
+        if base is None:
+            for field in failed_fields:
+                VALIDATION_FAILURES.inc(field=field)
             return jsonify({
-                'error': 'No message provided',
-                'response': 'Please provide a message to get farming assistance.'
+                'error': 'Invalid base record',
+                'message': message
             }), 400
         
-        user_message = data['message'].strip()
+        engine, _, engine_error = select_engine(data)
+        if engine_error:
+            return jsonify({
+                'error': 'Invalid engine selection',
+                'message': engine_error
+            }), 400
+        mark_phase('validate')
         
-        if not user_message:
+        try:
+            result = run_sweep(engine, base, data.get('grid'), MAX_SWEEP_POINTS,
+                               include_matrix=data.get('include_matrix', True) is not False)
+        except SweepError as e:
             return jsonify({
-                'error': 'Empty message',
-                'response': 'Please ask me something about farming, crops, or agriculture!'
+                'error': 'Invalid grid',
+                'message': str(e)
             }), 400
+        mark_phase('engine')
         
-        # Generate AI response
-        bot_response = get_chatbot_response(user_message)
+        request_logger.info("Sweep: %d points over %s", result['points'],
+                            ', '.join(axis['field'] for axis in result['axes']))
+        body = jsonify(result)
+        mark_phase('serialize')
+        return body, 200
         
-        # Log the interaction
-        logger.info(f"Chatbot - User: {user_message[:50]}... | Bot: {bot_response[:50]}...")
+    except Exception as e:
+        logger.error("Error in sweep: %s", e)
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An error occurred while processing your request'
+        }), 500
+
+# POST /feedback, /cache/flush and /models/reload change what every client
+# is served, so they require CROP_ADMIN_TOKEN in the X-Admin-Token header.
+# Without a configured token they are refused to everyone
+ADMIN_TOKEN = os.environ.get('CROP_ADMIN_TOKEN')
+
+def admin_access_denied():
+    """403 unless the caller presents the admin token"""
+    if not token_matches(request.headers.get('X-Admin-Token'), ADMIN_TOKEN):
+        logger.warning("Refused %s %s from %s: missing or wrong admin token", request.method, request.path,
+                       request.remote_addr)
+        return jsonify({
+            'error': 'Forbidden',
+            'message': 'This endpoint requires a valid X-Admin-Token header'
+        }), 403
+    return None
+
+@app.route('/feedback', methods=['POST'])
+def feedback():
+    """
+    Labelled samples from the field: the seven features plus the crop that
+    was planted ('label'). One record, a list, {"records": [...]} or
+    {"columns": {...}}; samples are logged and folded into the centroid model
+    """
+    denied = admin_access_denied()
+    if denied:
+        return denied
+    try:
+        request_logger.info("Feedback request received")
+        
+        data = request.get_json()
+        try:
+            records = [data] if isinstance(data, dict) and 'label' in data else records_from_batch_payload(data)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid feedback payload',
+                'message': str(e)
+            }), 400
+        
+        if not records:
+            return jsonify({
+                'error': 'Empty feedback',
+                'message': 'Provide at least one labelled sample'
+            }), 400
+        
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': 'Batch too large',
+                'message': f"Feedback may contain at most {MAX_BATCH_SIZE} samples per request"
+            }), 413
+        
+        features, errors = validate_feedback_batch(records)
+        # Only crops the engines already know: a label becomes a model class,
+        # is logged for good and is shown back to users
+        known_labels = MODELS.crop_labels()
+        labels = []
+        for row, record in enumerate(records):
+            label = record.get('label') if isinstance(record, dict) else None
+            label = label.strip().lower() if isinstance(label, str) else None
+            if errors[row] is None and label not in known_labels:
+                errors[row] = "label must be the name of a known crop (see known_labels)"
+            labels.append(label)
+        invalid = [{'index': row, 'message': error} for row, error in enumerate(errors) if error is not None]
+        if invalid:
+            return jsonify({
+                'error': 'Invalid feedback',
+                'message': f"{len(invalid)} of {len(records)} samples are invalid; nothing was recorded",
+                'errors': invalid[:100],
+                'known_labels': sorted(known_labels)
+            }), 400
         
-        # Return successful response
+        try:
+            rows = MODELS.record_feedback(features, labels)
+        except ValueError as e:
+            # e.g. the log's label dictionary is full
+            return jsonify({
+                'error': 'Feedback rejected',
+                'message': str(e)
+            }), 400
+        
+        centroid = MODELS.engines.get('centroid')
+        request_logger.info("Feedback: %d samples, %d pending compaction", len(records), rows)
         return jsonify({
-            'response': bot_response,
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
+            'status': 'accepted',
+            'samples': len(records),
+            'pending_samples': rows,
+            'model_version': centroid.version if centroid is not None else None
         }), 200
         
     except Exception as e:
-        logger.error(f"Error in chatbot: {str(e)}")
+        logger.error("Error in feedback: %s", e)
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An error occurred while recording your feedback'
+        }), 500
+
+@app.route('/chatbot', methods=['POST'])
+def chatbot():
+    """AI Farming Assistant Chatbot endpoint"""
+    try:
+        # Log the incoming request
+        request_logger.info("Chatbot request received")
+        
+        user_message, mode, error = parse_chatbot_request()
+        if error:
+            return error
+        
+        # Generate AI response, or reuse the serialized body of an earlier one
+        prepared, mode_used, intent, bot_response, _ = prepared_chatbot_reply(user_message, mode)
+        CHATBOT_INTENTS.inc(mode=mode_used, intent=intent)
+        mark_phase('engine')
+        
+        # Log the interaction
+        request_logger.info("Chatbot - User: %.50s... | Bot: %.50s...", user_message, bot_response)
+        
+        # Return successful response with the current timestamp spliced in
+        timestamp = datetime.now().isoformat()
+        compressed = prepared.render_gzip(timestamp) if request.accept_encodings['gzip'] else None
+        response = Response(compressed or prepared.render(timestamp), mimetype='application/json')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        mark_phase('serialize')
+        return response, 200
+        
+    except Exception as e:
+        logger.error("Error in chatbot: %s", e)
+        return jsonify({
+            'error': 'Internal server error',
+            'response': 'Sorry, I encountered an error. Please try again or contact support.'
+        }), 500
+
+@app.route('/chatbot/stream', methods=['POST'])
+def chatbot_stream():
+    """
+    Chatbot answer as server-sent events: a 'section' event per answer
+    section, then a 'done' event with mode, intent, matches and timestamp
+    The frames are built before the response starts and the generator holds
+    no request context, so a worker only waits on a client whose socket
+    buffer is full (answers are a few KB, far below it)
+    """
+    try:
+        request_logger.info("Chatbot stream request received")
+        
+        user_message, mode, error = parse_chatbot_request()
+        if error:
+            return error
+        
+        _, mode_used, intent, bot_response, (frames, done) = prepared_chatbot_reply(user_message, mode)
+        CHATBOT_INTENTS.inc(mode=mode_used, intent=intent)
+        mark_phase('engine')
+        request_logger.info("Chatbot stream - User: %.50s... | Bot: %.50s...", user_message, bot_response)
+        final = sse_frame('done', done.render(datetime.now().isoformat()))
+    except Exception as e:
+        logger.error("Error in chatbot stream: %s", e)
         return jsonify({
             'error': 'Internal server error',
             'response': 'Sorry, I encountered an error. Please try again or contact support.'
         }), 500
+    
+    def generate():
+        yield from frames
+        yield final
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Let nginx-style proxies pass each event through as it is written
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response, 200
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'model_type': 'rule-based',
+        'model_type': DEFAULT_ENGINE,
+        'model_version': MODELS.engines[DEFAULT_ENGINE].version,
+        'engine_versions': MODELS.versions(),
+        'model_generation': MODELS.snapshot.generation,
+        'model_loaded_at': datetime.fromtimestamp(MODELS.snapshot.loaded_at).isoformat(),
+        'holdout_accuracy': MODELS.snapshot.holdout_accuracy,
+        'available_engines': list(MODELS.engines),
         'timestamp': datetime.now().isoformat()
     }), 200
 
+def cached_json(payload, etag):
+    """
+    Precomputed payload with its ETag and Cache-Control headers
+    Clients revalidating with a matching If-None-Match get an empty 304
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={DISTRICTS_MAX_AGE}"
+    return response
+
+@app.route('/districts', methods=['GET'])
+def list_districts():
+    """State-wide summary and profiles of every Gujarat district"""
+    districts = DISTRICTS.get()
+    if districts is None:
+        return jsonify({'error': 'District profiles unavailable'}), 503
+    return cached_json(districts.summary, districts.summary_etag)
+
+@app.route('/districts/<name>', methods=['GET'])
+def district_detail(name):
+    """Profile of one district with precomputed engine recommendations"""
+    districts = DISTRICTS.get()
+    if districts is None:
+        return jsonify({'error': 'District profiles unavailable'}), 503
+    district = districts.resolve(name)
+    if district is None:
+        return jsonify({
+            'error': 'District not found',
+            'message': f"Unknown district '{name}'. Available districts: {', '.join(districts.names)}"
+        }), 404
+    return cached_json(districts.details[district], districts.detail_etags[district])
+
+def collect_engine_stats():
+    """Cache and micro-batching counters for /metrics"""
+    cache = PREDICTION_CACHE.stats()
+    chatbot_cache = CHATBOT_CACHE.stats()
+    families = [
+        ('crop_prediction_cache_events_total', 'counter', 'Prediction cache lookups and removals by event',
+         [({'event': event}, cache[event]) for event in ('hits', 'misses', 'evictions', 'expirations')]),
+        ('crop_prediction_cache_entries', 'gauge', 'Entries held in the prediction cache',
+         [({}, cache['size'])]),
+        ('crop_chatbot_cache_events_total', 'counter', 'Chatbot response cache lookups and removals by event',
+         [({'event': event}, chatbot_cache[event]) for event in ('hits', 'misses', 'evictions')]),
+        ('crop_chatbot_cache_entries', 'gauge', 'Serialized bodies held in the chatbot response cache',
+         [({}, chatbot_cache['size'])]),
+    ]
+    admission = ADMISSION.stats()
+    families += [
+        ('crop_admission_decisions_total', 'counter', 'Admission control decisions',
+         [({'decision': decision}, admission[decision]) for decision in ('admitted', 'rate_limited', 'overloaded')]),
+        ('crop_admission_in_flight', 'gauge', 'Requests holding an admission slot',
+         [({}, admission['in_flight'])]),
+        ('crop_admission_clients', 'gauge', 'Clients with a token bucket',
+         [({}, admission['clients'])]),
+    ]
+    families.append(('crop_model_reloads_total', 'counter', 'Model reload attempts by outcome',
+                     [({'status': status}, count) for status, count in sorted(MODELS.reloads.items())]))
+    families.append(('crop_model_generation', 'gauge', 'Number of model swaps since the process started',
+                     [({}, MODELS.snapshot.generation)]))
+    families.append(('crop_feedback_samples_total', 'counter', 'Feedback samples folded into the centroid model',
+                     [({}, MODELS.feedback_samples)]))
+    families.append(('crop_feedback_pending_samples', 'gauge', 'Feedback samples not yet compacted into the dataset',
+                     [({}, MODELS.feedback_rows)]))
+    if BATCHERS:
+        batching = [batcher.stats() for batcher in BATCHERS.values()]
+        families += [
+            ('crop_microbatch_batches_total', 'counter', 'Micro-batches dispatched by engine',
+             [({'engine': stats['engine']}, stats['batches']) for stats in batching]),
+            ('crop_microbatch_items_total', 'counter', 'Predictions scored through micro-batches by engine',
+             [({'engine': stats['engine']}, stats['items']) for stats in batching]),
+        ]
+    return families
+
+METRICS.register_collector(collect_engine_stats)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(METRICS.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/stats/batching', methods=['GET'])
+def batching_stats():
+    """Micro-batching settings and achieved batch sizes"""
+    return jsonify({
+        'enabled': MICROBATCH_ENABLED,
+        'max_wait_ms': MICROBATCH_MAX_WAIT_MS,
+        'max_batch_size': MICROBATCH_MAX_SIZE,
+        'engines': {name: batcher.stats() for name, batcher in BATCHERS.items()}
+    }), 200
+
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    """Prediction cache hit/miss/eviction statistics"""
+    return jsonify(PREDICTION_CACHE.stats()), 200
+
+@app.route('/stats/chatbot', methods=['GET'])
+def chatbot_cache_stats():
+    """Chatbot response cache hit/miss statistics"""
+    stats = CHATBOT_CACHE.stats()
+    stats.update(gzip_level=CHATBOT_GZIP_LEVEL, gzip_min_bytes=CHATBOT_GZIP_MIN_BYTES,
+                 max_message_chars=CHATBOT_CACHE_MAX_MESSAGE)
+    return jsonify(stats), 200
+
+@app.route('/stats/admission', methods=['GET'])
+def admission_stats():
+    """Admission control limits and decisions"""
+    return jsonify(ADMISSION.stats()), 200
+
+def profile_access_denied():
+    """404 unless profiling is configured and the caller holds the token"""
+    if not PROFILER.authorized(request.headers.get('X-Profile')):
+        return jsonify({'error': 'Not found'}), 404
+    return None
+
+@app.route('/debug/profiles', methods=['GET'])
+def list_profiles():
+    """Ids of the saved request profiles, newest first"""
+    denied = profile_access_denied()
+    if denied:
+        return denied
+    return jsonify({'profiles': PROFILER.list()}), 200
+
+@app.route('/debug/profiles/<profile_id>', methods=['GET'])
+def profile_report(profile_id):
+    """Text report of one saved request profile"""
+    denied = profile_access_denied()
+    if denied:
+        return denied
+    report = PROFILER.report(profile_id)
+    if report is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(report, mimetype='text/plain')
+
+@app.route('/cache/flush', methods=['POST'])
+def flush_cache():
+    """Drop all cached predictions and chatbot bodies, e.g. after a model change"""
+    denied = admin_access_denied()
+    if denied:
+        return denied
+    PREDICTION_CACHE.clear()
+    CHATBOT_CACHE.clear()
+    CHATBOT_INTENT_BODIES.clear()
+    logger.info("Prediction and chatbot caches flushed")
+    return jsonify({'status': 'flushed'}), 200
+
+@app.route('/models/reload', methods=['POST'])
+def reload_models():
+    """Rebuild and validate the centroid model now instead of waiting for the watcher"""
+    denied = admin_access_denied()
+    if denied:
+        return denied
+    result = MODELS.check_for_update(force=True)
+    return jsonify(dict(result, active_versions=MODELS.versions())), 200
+
 @app.route('/', methods=['GET'])
 def home():
     """Home endpoint with API information"""
@@ -583,24 +1197,103 @@ def home():
         'version': '1.0.0',
         'endpoints': {
             'POST /predict': 'Get crop recommendation',
+            'POST /predict/batch': 'Get crop recommendations for many records',
+            'POST /predict/stream': 'Score a streamed CSV or NDJSON upload, results as NDJSON',
+            'POST /predict/sweep': 'What-if sweep of a base record over grids of field values',
+            'POST /feedback': 'Record what was planted; updates the centroid model incrementally (admin token)',
+            'GET /districts': 'Gujarat district summary and profiles',
+            'GET /districts/<name>': 'One district profile with engine recommendations',
             'GET /health': 'Health check',
+            'GET /metrics': 'Prometheus metrics',
+            'GET /stats/batching': 'Micro-batching statistics',
+            'GET /stats/cache': 'Prediction cache statistics',
+            'GET /stats/chatbot': 'Chatbot response cache statistics',
+            'GET /stats/admission': 'Rate limiting and load shedding statistics',
+            'POST /cache/flush': 'Flush the prediction and chatbot caches (admin token)',
+            'POST /models/reload': 'Reload, validate and swap in the centroid model (admin token)',
             'GET /': 'API information',
-            'POST /chatbot': 'AI Farming Assistant Chatbot'
+            'POST /chatbot': 'AI Farming Assistant Chatbot',
+            'POST /chatbot/stream': 'Chatbot answer streamed section by section as server-sent events'
         },
-        'required_fields': ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+        'required_fields': ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'],
+        'optional_fields': {
+            'engine': f"One of {', '.join(MODELS.engines)} (default {DEFAULT_ENGINE})",
+            'top_k': f"Return the top 1-{MAX_TOP_K} crops with probabilities"
+        }
     }), 200
 
+STARTUP.mark('routes')
+
+WARMUP_ENABLED = os.environ.get('CROP_WARMUP', '1').lower() not in ('0', 'false', 'no')
+WARMUP_RECORD = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.8, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 202.9}
+
+def warm_up():
+    """
+    Run the request hot paths once before the server reports ready
+    Loads the lazy artifacts the default configuration serves, so in
+    production mode they are built in the master and shared by every worker
+    """
+    features, _, _ = REQUEST_SCHEMA.parse(WARMUP_RECORD)
+    for engine in MODELS.engines.values():
+        engine.predict(features)
+        engine.predict_batch([features])
+        engine.predict_top_k([features], MAX_TOP_K)
+    validate_input_batch([WARMUP_RECORD])
+    DISTRICTS.get()
+    answer_message('How should I grow rice?', CHATBOT_MODE)
+    app.json.dumps({'recommended_crop': 'rice', 'confidence': 0.88, 'timestamp': datetime.now().isoformat()})
+    # Compile the URL map before the first request has to
+    app.url_map.bind('localhost').match('/predict', method='POST')
+
+def restart_after_fork():
+    """Restart background threads in a forked worker; threads do not survive fork"""
+    # Only the master writes the log file; workers log to stderr, which
+    # gunicorn passes on (several processes rotating one file lose lines)
+    configure_logging_from_env(None)
+    start_batchers(restart=True)
+    MODELS.start_watching()
+
+def parse_args(argv=None):
+    """Command-line options; defaults come from CROP_* environment variables"""
+    parser = argparse.ArgumentParser(description='Crop Recommendation API server')
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('CROP_SERVER_MODE', 'development') == 'production',
+                        help='Serve with a prefork WSGI server instead of the development server')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('CROP_WORKERS', os.cpu_count() or 1)),
+                        help='Worker processes in production mode')
+    parser.add_argument('--host', default=os.environ.get('CROP_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('CROP_PORT', 5000)))
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print the time spent in each startup phase and exit '
+                             '(python -X importtime breaks imports down per module)')
+    return parser.parse_args(argv)
+
 if __name__ == '__main__':
+    args = parse_args()
+    if WARMUP_ENABLED or args.profile_startup:
+        warm_up()
+        STARTUP.mark('warm-up')
+    if args.profile_startup:
+        print(STARTUP.report())
+        exit(0)
+    logger.info(STARTUP.summary())
     try:
         logger.info("Starting Simple Crop Recommendation API server...")
         
-        # Run the Flask app
-        app.run(
-            host='127.0.0.1',
-            port=5000,
-            debug=True,
-            threaded=True
-        )
+        if args.production:
+            # Engines and indexes are already loaded here, before workers fork.
+            # Each worker runs its own model watcher; the master needs none
+            MODELS.stop_watching()
+            run_production(app, args.host, args.port, args.workers, post_fork=restart_after_fork,
+                           child_exit=reclaim_admission)
+        else:
+            # Run the Flask app
+            app.run(
+                host=args.host,
+                port=args.port,
+                debug=True,
+                threaded=True
+            )
     except Exception as e:
-        logger.error(f"Failed to start server: {str(e)}")
+        logger.error("Failed to start server: %s", e)
         exit(1)
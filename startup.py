@@ -0,0 +1,87 @@
+"""
+Startup bookkeeping for the Crop Recommendation System
+StartupProfile times the phases of bringing the app up (imports, engine and
+index loading, warm-up) and LazyResource defers loading an artifact until its
+first use, recording the load time in the profile.
+"""
+
+import threading
+import time
+
+class StartupProfile:
+    """Wall-clock durations of consecutive startup phases"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        # Time recorded by record() inside the current phase, so it is not counted twice
+        self._nested = 0.0
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        """Close the phase that ran since the previous mark"""
+        with self._lock:
+            now = time.perf_counter()
+            self.phases.append((phase, now - self._last - self._nested))
+            self._last = now
+            self._nested = 0.0
+
+    def record(self, phase, seconds):
+        """Add a phase timed elsewhere, e.g. a lazy load during a request"""
+        with self._lock:
+            self.phases.append((phase, seconds))
+            self._nested += seconds
+
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def summary(self):
+        """One-line summary for the startup log"""
+        parts = ', '.join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        return f"Startup took {self.total() * 1000:.0f}ms ({parts})"
+
+    def report(self):
+        """Table of phases, slowest first, with their share of startup time"""
+        total = self.total() or 1.0
+        lines = [f"{'phase':<24} {'ms':>9} {'share':>7}"]
+        for phase, seconds in sorted(self.phases, key=lambda item: -item[1]):
+            lines.append(f"{phase:<24} {seconds * 1000:>9.1f} {seconds / total * 100:>6.1f}%")
+        lines.append(f"{'total':<24} {self.total() * 1000:>9.1f}")
+        return '\n'.join(lines)
+
+class LazyResource:
+    """
+    Value built by loader() on first get(), at most once across threads
+    Loading before fork (see warm-up) lets prefork workers share the result.
+    """
+
+    def __init__(self, name, loader, profile=None):
+        self.name = name
+        self._loader = loader
+        self._profile = profile
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+
+    def reset(self):
+        """Forget the value so the next get() loads it again"""
+        with self._lock:
+            self._loaded = False
+            self._value = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                self._value = self._loader()
+                self._loaded = True
+                if self._profile is not None:
+                    self._profile.record(self.name, time.perf_counter() - started)
+        return self._value
@@ -0,0 +1,148 @@
+"""
+HTTP-level regression tests for simple_app
+Run with: python -m pytest -q test_app.py
+"""
+
+import itertools
+
+import pytest
+
+import simple_app
+from chatbot_engine import get_chatbot_response
+from crop_engine import FEATURE_FIELDS, simple_crop_recommendation
+
+BASE_RECORD = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.8, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 202.9}
+
+def threshold_records():
+    """Records on and within a rounding step of every rule threshold"""
+    thresholds = {
+        'temperature': [15, 25, 35],
+        'humidity': [70, 80],
+        'ph': [6.5, 7],
+        'rainfall': [150, 200],
+    }
+    offsets = [-0.001, -0.0004, -1e-9, 0, 1e-9, 0.0004, 0.001]
+    for field, values in thresholds.items():
+        for value, offset in itertools.product(values, offsets):
+            for temperature in (10, 20, 30, 40):
+                record = dict(BASE_RECORD, temperature=temperature)
+                record[field] = value + offset
+                yield record
+
+@pytest.mark.parametrize('cache_size', [0, 4096])
+def test_predict_matches_scalar_rules_at_thresholds(client, monkeypatch, cache_size):
+    monkeypatch.setattr(simple_app.PREDICTION_CACHE, 'max_size', cache_size)
+    simple_app.PREDICTION_CACHE.clear()
+    # Twice over, so the second pass is served from the cache when it is on,
+    # after neighbours on the other side of each threshold filled it
+    for record in list(threshold_records()) * 2:
+        response = client.post('/predict', json=dict(record, engine='rule-based'))
+        assert response.status_code == 200
+        body = response.get_json()
+        expected = simple_crop_recommendation(*(record[field] for field in FEATURE_FIELDS))
+        assert (body['recommended_crop'], body['confidence']) == expected, record
+    if cache_size:
+        assert simple_app.PREDICTION_CACHE.stats()['hits'] > 0
+
+FEEDBACK_RECORD = dict(BASE_RECORD, label='rice')
+ADMIN_HEADERS = {'X-Admin-Token': simple_app.ADMIN_TOKEN}
+
+@pytest.mark.parametrize('label', ['dragonfruit', '<img src=x onerror=alert(1)>', 'rice' * 20, 42, ''])
+def test_feedback_rejects_unknown_labels(client, label):
+    rows = simple_app.MODELS.feedback.position()[1]
+    response = client.post('/feedback', json=[FEEDBACK_RECORD, dict(BASE_RECORD, label=label)],
+                           headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert [error['index'] for error in body['errors']] == [1]
+    assert 'rice' in body['known_labels']
+    # Nothing from a rejected request reaches the log or the model
+    assert simple_app.MODELS.feedback.position()[1] == rows
+    assert label not in simple_app.MODELS.crop_labels()
+
+def test_feedback_accepts_known_labels(client):
+    response = client.post('/feedback', json=dict(FEEDBACK_RECORD, label=' Mango '), headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.get_json()['samples'] == 1
+
+def test_registry_rejects_unknown_labels():
+    with pytest.raises(ValueError):
+        simple_app.MODELS.record_feedback([list(BASE_RECORD.values())], ['<b>rice</b>'])
+
+def test_client_key_honors_only_configured_api_keys(monkeypatch):
+    monkeypatch.setattr(simple_app, 'API_KEYS', frozenset({'field-team'}))
+    environ = {'REMOTE_ADDR': '203.0.113.7'}
+    with simple_app.app.test_request_context(headers={'X-API-Key': 'field-team'}, environ_base=environ):
+        assert simple_app.client_key() == 'key:field-team'
+    for headers in ({'X-API-Key': 'made-up'}, {'X-API-Key': ''}, {}):
+        with simple_app.app.test_request_context(headers=headers, environ_base=environ):
+            assert simple_app.client_key() == 'ip:203.0.113.7'
+
+MALFORMED_BODIES = [[1], ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'], 'NPK temperature humidity ph rainfall', 5]
+
+@pytest.mark.parametrize('route', ['/predict', '/predict/sweep', '/chatbot', '/chatbot/stream'])
+@pytest.mark.parametrize('body', MALFORMED_BODIES)
+def test_non_object_bodies_are_rejected(client, route, body):
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+@pytest.mark.parametrize('route, body', [
+    ('/predict', dict(BASE_RECORD, engine=['centroid'])),
+    ('/predict/sweep', {'base': BASE_RECORD, 'engine': {'name': 'centroid'}, 'grid': {'ph': [6, 7]}}),
+    ('/predict/sweep', {'base': [BASE_RECORD], 'grid': {'ph': [6, 7]}}),
+    ('/chatbot', {'message': ['rice']}),
+    ('/chatbot', {'message': None}),
+])
+def test_mistyped_fields_are_rejected(client, route, body):
+    response = client.post(route, json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_sweep_accepts_a_valid_body(client):
+    response = client.post('/predict/sweep', json={'base': BASE_RECORD, 'grid': {'ph': [6, 7]}})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-Infinity', float('nan'), float('inf')])
+def test_non_finite_features_are_rejected(client, value):
+    record = dict(BASE_RECORD, rainfall=value)
+    message = "Invalid value for rainfall: must be a number"
+    response = client.post('/predict', json=record)
+    assert response.status_code == 400 and response.get_json()['message'] == message
+    response = client.post('/predict/sweep', json={'base': record, 'grid': {'ph': [6, 7]}})
+    assert response.status_code == 400 and response.get_json()['message'] == message
+    response = client.post('/predict/batch', json=[BASE_RECORD, record])
+    assert [row.get('message') for row in response.get_json()['results']] == [None, message]
+
+def test_chatbot_caches_only_short_messages(client):
+    simple_app.CHATBOT_CACHE.clear()
+    short = 'how to grow rice?'
+    long = short + ' ' * simple_app.CHATBOT_CACHE_MAX_MESSAGE + 'x'
+    for message in (short, long, long):
+        response = client.post('/chatbot', json={'message': message})
+        assert response.status_code == 200
+        assert response.get_json()['response'] == get_chatbot_response(message.strip())
+    assert client.get('/stats/chatbot').get_json()['size'] == 1
+
+@pytest.mark.parametrize('route', ['/feedback', '/cache/flush', '/models/reload'])
+@pytest.mark.parametrize('headers', [{}, {'X-Admin-Token': ''}, {'X-Admin-Token': 'wrong'}])
+def test_admin_routes_require_the_admin_token(client, route, headers):
+    response = client.post(route, json=FEEDBACK_RECORD, headers=dict(headers, Origin='https://example.com'))
+    assert response.status_code == 403
+    assert response.get_json()['error'] == 'Forbidden'
+    # Browsers on other origins get no CORS grant for admin routes
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+def test_admin_routes_accept_the_admin_token(client):
+    assert client.post('/cache/flush', headers=ADMIN_HEADERS).status_code == 200
+    assert client.post('/models/reload', headers=ADMIN_HEADERS).status_code == 200
+
+def test_cors_still_covers_public_routes(client):
+    response = client.post('/predict', json=BASE_RECORD, headers={'Origin': 'https://example.com'})
+    assert response.headers.get('Access-Control-Allow-Origin') == 'https://example.com'
+
+def test_oversized_feedback_is_413(client, monkeypatch):
+    monkeypatch.setattr(simple_app, 'MAX_BATCH_SIZE', 2)
+    response = client.post('/feedback', json=[FEEDBACK_RECORD] * 3, headers=ADMIN_HEADERS)
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Batch too large'
@@ -0,0 +1,93 @@
+"""
+Regression tests for the vectorized /predict/batch path
+The batch rules and the batch validator must give the same answers as the
+scalar rules and the original validate_input_data, kept here as a reference
+with the one deliberate change since: non-finite values are rejected.
+
+Run with: python -m pytest -q test_batch_predict.py
+"""
+
+import itertools
+import math
+import random
+
+import numpy as np
+
+from crop_engine import (
+    FEATURE_FIELDS,
+    simple_crop_recommendation,
+    simple_crop_recommendation_batch,
+    validate_input_batch,
+)
+
+def reference_validate_input_data(data):
+    """validate_input_data as it was before the one-pass parser"""
+    required_fields = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+    missing_fields = [field for field in required_fields if field not in data]
+    if missing_fields:
+        return False, f"Missing required fields: {', '.join(missing_fields)}"
+    for field in required_fields:
+        try:
+            value = float(data[field])
+        except (ValueError, TypeError):
+            return False, f"Invalid value for {field}: must be a number"
+        # Deliberate change since: nan and inf slipped past every range check
+        if not math.isfinite(value):
+            return False, f"Invalid value for {field}: must be a number"
+    ph_value = float(data['ph'])
+    if ph_value < 0 or ph_value > 14:
+        return False, "pH value must be between 0 and 14"
+    humidity_value = float(data['humidity'])
+    if humidity_value < 0 or humidity_value > 100:
+        return False, "Humidity value must be between 0 and 100"
+    temp_value = float(data['temperature'])
+    if temp_value < -50 or temp_value > 60:
+        return False, "Temperature value must be between -50 and 60 degrees Celsius"
+    rainfall_value = float(data['rainfall'])
+    if rainfall_value < 0:
+        return False, "Rainfall value must be non-negative"
+    return True, "Valid input data"
+
+def test_batch_rules_match_scalar_rules():
+    rng = np.random.default_rng(1)
+    # Branch thresholds and their neighbours, plus random values and NaN
+    thresholds = {
+        'temperature': [14.999, 15, 15.001, 24.999, 25, 25.001, 34.999, 35, 35.001, -50, 60],
+        'humidity': [69.999, 70, 70.001, 79.999, 80, 80.001, 0, 100],
+        'ph': [6.499, 6.5, 6.501, 6.999, 7, 7.001, 0, 14],
+        'rainfall': [149.999, 150, 150.001, 199.999, 200, 200.001, 0],
+    }
+    grid = np.array(list(itertools.product([90.0], [42.0], [43.0], *thresholds.values())))
+    random_rows = np.column_stack([
+        rng.uniform(0, 140, 20000), rng.uniform(5, 145, 20000), rng.uniform(5, 205, 20000),
+        rng.uniform(-50, 60, 20000), rng.uniform(0, 100, 20000), rng.uniform(0, 14, 20000),
+        rng.uniform(0, 400, 20000),
+    ])
+    X = np.vstack([grid, random_rows, np.full((1, len(FEATURE_FIELDS)), np.nan)])
+    crops, confidences = simple_crop_recommendation_batch(*X.T)
+    for row, crop, confidence in zip(X.tolist(), crops.tolist(), confidences.tolist()):
+        assert (crop, confidence) == simple_crop_recommendation(*row)
+
+def validation_records():
+    """Valid, missing, non-numeric and out-of-range records"""
+    rng = random.Random(2)
+    valid = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.8, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 202.9}
+    bad_values = [None, 'abc', '', [], {}, 'nan', 'inf', '-inf', '1e3', ' 7 ', True, -1, -0.001, 14.001, 100.5,
+                  -50.5, 60.5, 0, 14, 100, -50, 60]
+    records = [dict(valid)]
+    for _ in range(5000):
+        record = dict(valid)
+        for field in rng.sample(FEATURE_FIELDS, rng.randint(1, 3)):
+            if rng.random() < 0.2:
+                del record[field]
+            else:
+                record[field] = rng.choice(bad_values)
+        records.append(record)
+    return records
+
+def test_batch_validation_matches_original_validation():
+    records = validation_records()
+    _, errors = validate_input_batch(records)
+    for record, error in zip(records, errors):
+        valid, message = reference_validate_input_data(record)
+        assert error == (None if valid else message)
@@ -0,0 +1,114 @@
+"""
+Regression tests for the chatbot intent index
+The compiled matcher must answer exactly as the original keyword scan, kept
+here as a reference, in its branch order.
+
+Run with: python -m pytest -q test_chatbot.py
+"""
+
+import random
+
+from chatbot_engine import (
+    FARMING_KNOWLEDGE,
+    FARMING_RESPONSE,
+    DEFAULT_RESPONSE,
+    FERTILIZER_GENERAL_RESPONSE,
+    IRRIGATION_GENERAL_RESPONSE,
+    PEST_RESPONSE,
+    RECOMMEND_RESPONSE,
+    SOIL_GENERAL_RESPONSE,
+    WEATHER_RESPONSE,
+    get_chatbot_response,
+)
+
+def reference_chatbot_response(message):
+    """The original if/elif keyword scan, in its branch order"""
+    message_lower = message.lower()
+    knowledge = FARMING_KNOWLEDGE
+    if any(crop in message_lower for crop in ['rice', 'wheat', 'maize', 'cotton', 'corn']):
+        for crop in ['rice', 'wheat', 'maize', 'cotton']:
+            if crop in message_lower or (crop == 'maize' and 'corn' in message_lower):
+                info = knowledge['crops'][crop]
+                return f"""🌾 **{crop.title()} Cultivation Guide:**
+
+**Soil Requirements:** {info['soil']}
+**Climate:** {info['climate']}
+**Water Needs:** {info['water']}
+**Fertilizer:** {info['fertilizer']}
+**Growing Season:** {info['season']}
+
+💡 **Pro Tip:** {info['tips']}
+
+Would you like specific advice on any aspect of {crop} cultivation?"""
+    elif any(word in message_lower for word in ['soil', 'sandy', 'clay', 'loamy', 'fertility']):
+        soil_type = next((soil for soil in ['sandy', 'clay', 'loamy'] if soil in message_lower), None)
+        if soil_type is None:
+            return SOIL_GENERAL_RESPONSE
+        info = knowledge['soil_management'][soil_type]
+        return f"""🌱 **{soil_type.title()} Soil Management:**
+
+**Characteristics:** {info['characteristics']}
+**Improvements:** {info['improvements']}
+**Suitable Crops:** {info['suitable_crops']}
+**Fertilizer Strategy:** {info['fertilizer']}
+
+Need help with specific soil problems?"""
+    elif any(word in message_lower for word in ['irrigation', 'watering', 'drip', 'sprinkler', 'water']):
+        method = next((method for method in ['drip', 'sprinkler', 'flood'] if method in message_lower), None)
+        if method is None:
+            return IRRIGATION_GENERAL_RESPONSE
+        info = knowledge['irrigation'][method]
+        return f"""💧 **{method.title()} Irrigation System:**
+
+**How it works:** {info['description']}
+**Advantages:** {info['advantages']}
+**Best for:** {info['suitable_for']}
+**Cost consideration:** {info['cost']}
+
+Would you like installation or maintenance tips?"""
+    elif any(word in message_lower for word in ['fertilizer', 'fertiliser', 'nutrient', 'npk', 'organic', 'compost']):
+        if 'organic' in message_lower:
+            fert_type = 'organic'
+        elif 'chemical' in message_lower or 'npk' in message_lower:
+            fert_type = 'chemical'
+        elif 'bio' in message_lower:
+            fert_type = 'bio'
+        else:
+            return FERTILIZER_GENERAL_RESPONSE
+        info = knowledge['fertilizers'][fert_type]
+        return f"""🌿 **{fert_type.title()} Fertilizers:**
+
+**Types:** {info['types']}
+**Benefits:** {info['benefits']}
+**Application:** {info['application']}
+**Best for:** {info['crops']}
+
+Need specific application rates or timing advice?"""
+    elif any(word in message_lower for word in ['pest', 'disease', 'insect', 'fungus', 'bug']):
+        return PEST_RESPONSE
+    elif any(word in message_lower for word in ['weather', 'climate', 'rain', 'drought', 'temperature']):
+        return WEATHER_RESPONSE
+    elif any(word in message_lower for word in ['farming', 'agriculture', 'cultivation', 'growing']):
+        return FARMING_RESPONSE
+    elif any(word in message_lower for word in ['recommend', 'suggestion', 'best crop', 'which crop']):
+        return RECOMMEND_RESPONSE
+    return DEFAULT_RESPONSE
+def chatbot_messages():
+    rng = random.Random(3)
+    vocabulary = ['rice', 'wheat', 'maize', 'cotton', 'corn', 'soil', 'sandy', 'clay', 'loamy', 'fertility',
+                  'irrigation', 'watering', 'drip', 'sprinkler', 'water', 'flood', 'fertilizer', 'fertiliser',
+                  'nutrient', 'npk', 'organic', 'compost', 'chemical', 'bio', 'pest', 'disease', 'insect',
+                  'fungus', 'bug', 'weather', 'climate', 'rain', 'drought', 'temperature', 'farming',
+                  'agriculture', 'cultivation', 'growing', 'recommend', 'suggestion', 'best crop', 'which crop',
+                  'Rice', 'CLAY', 'biology', 'training', 'debugging', 'popcorn', 'waterfall', 'price']
+    filler = ['how', 'do', 'i', 'my', 'the', 'in', 'for', 'best', 'crop', 'grow', '?', 'hello', '']
+    messages = ['', 'hello', 'which crop is best?', 'Best Crop for sandy soil']
+    for _ in range(5000):
+        words = rng.sample(vocabulary, rng.randint(0, 4)) + rng.sample(filler, rng.randint(0, 4))
+        rng.shuffle(words)
+        messages.append(rng.choice([' ', '', '-']).join(words))
+    return messages
+
+def test_chatbot_matches_original_branch_order():
+    for message in chatbot_messages():
+        assert get_chatbot_response(message) == reference_chatbot_response(message), message
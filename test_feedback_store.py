@@ -0,0 +1,97 @@
+"""
+Regression tests for the feedback log
+Compaction folds every logged sample into the dataset exactly once, even when
+it is interrupted at any step and resumed.
+
+Run with: python -m pytest -q test_feedback_store.py
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import feedback_store
+from columnar_dataset import convert_csv
+from crop_engine import read_dataset
+from feedback_store import FeedbackStore
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crop_recommendation.csv')
+
+FEEDBACK_X = np.array([[90, 42, 43, 20.8, 82, 6.5, 202.9], [12.5, 60, 19, 30.25, 55, 7.1, 80]] * 3)
+FEEDBACK_LABELS = ['rice', 'mango', 'rice', 'mango', 'rice', 'mango']
+
+def feedback_setup(tmp_path, columnar):
+    """A dataset copy and a feedback log holding FEEDBACK_X"""
+    dataset = str(tmp_path / 'crop_recommendation.csv')
+    shutil.copy(DATASET, dataset)
+    if columnar:
+        columnar_path = str(tmp_path / 'crop_recommendation.cropcol')
+        convert_csv(dataset, columnar_path)
+        dataset = columnar_path
+    store = FeedbackStore(str(tmp_path / 'feedback.cropcol'))
+    store.append(FEEDBACK_X, FEEDBACK_LABELS)
+    return dataset, store
+
+def assert_folded_once(dataset):
+    X, labels = read_dataset(dataset)
+    original_X, original_labels = read_dataset(DATASET)
+    assert len(labels) == len(original_labels) + len(FEEDBACK_LABELS)
+    assert list(labels[-len(FEEDBACK_LABELS):]) == FEEDBACK_LABELS
+    np.testing.assert_allclose(np.asarray(X[-len(FEEDBACK_LABELS):], dtype=float),
+                               FEEDBACK_X.astype(np.float32), rtol=1e-6)
+    np.testing.assert_allclose(np.asarray(X[:len(original_labels)], dtype=float),
+                               original_X.astype(np.float32 if dataset.endswith('.cropcol') else float), rtol=1e-6)
+
+class Interrupted(Exception):
+    pass
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_compaction_resumes_after_a_torn_fold(tmp_path, monkeypatch, columnar):
+    dataset, store = feedback_setup(tmp_path, columnar)
+    fold = feedback_store.fold_into_dataset
+
+    def torn_fold(path, fold_from, X, labels):
+        # Crash midway: a partial CSV row, or block bytes the header never committed
+        with open(path, 'ab') as handle:
+            handle.write(b'CBLK\x06\0\0\0' + b'\0' * 100 if columnar else b'\n90,42,4')
+        raise Interrupted()
+
+    monkeypatch.setattr(feedback_store, 'fold_into_dataset', torn_fold)
+    with pytest.raises(Interrupted):
+        store.compact(dataset)
+    assert os.path.exists(store.pending_path) and not os.path.exists(store.path)
+
+    monkeypatch.setattr(feedback_store, 'fold_into_dataset', fold)
+    assert store.compact(dataset) == len(FEEDBACK_LABELS)
+    assert not os.path.exists(store.pending_path)
+    assert_folded_once(dataset)
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_compaction_does_not_refold_after_a_crash_before_cleanup(tmp_path, monkeypatch, columnar):
+    dataset, store = feedback_setup(tmp_path, columnar)
+    remove = os.remove
+
+    def crash_on_pending(path):
+        if path == store.pending_path:
+            raise Interrupted()
+        remove(path)
+
+    monkeypatch.setattr(feedback_store.os, 'remove', crash_on_pending)
+    with pytest.raises(Interrupted):
+        store.compact(dataset)
+    monkeypatch.setattr(feedback_store.os, 'remove', remove)
+
+    # Samples logged after the crash wait in a new log for the next compaction
+    store.append(FEEDBACK_X[:1], FEEDBACK_LABELS[:1])
+    assert store.compact(dataset) == len(FEEDBACK_LABELS)
+    assert_folded_once(dataset)
+    assert store.position()[1] == 1
+
+def test_compaction_without_a_log_is_a_no_op(tmp_path):
+    dataset = str(tmp_path / 'crop_recommendation.csv')
+    shutil.copy(DATASET, dataset)
+    assert FeedbackStore(str(tmp_path / 'feedback.cropcol')).compact(dataset) == 0
+    with open(dataset, 'rb') as copy, open(DATASET, 'rb') as original:
+        assert copy.read() == original.read()
@@ -0,0 +1,20 @@
+"""
+Regression tests for the one-pass request parser
+REQUEST_SCHEMA must accept and reject exactly what the original
+validate_input_data did, with the same messages.
+
+Run with: python -m pytest -q test_request_schema.py
+"""
+
+from crop_engine import FEATURE_FIELDS, REQUEST_SCHEMA
+from test_batch_predict import reference_validate_input_data, validation_records
+
+def test_request_schema_matches_original_validation():
+    for record in validation_records():
+        valid, message = reference_validate_input_data(record)
+        reading, error, _ = REQUEST_SCHEMA.parse(record)
+        assert (reading is not None) == valid
+        if valid:
+            assert list(reading) == [float(record[field]) for field in FEATURE_FIELDS]
+        else:
+            assert error == message
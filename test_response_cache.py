@@ -0,0 +1,29 @@
+"""
+Regression tests for pre-serialized response bodies
+A spliced gzip body must decompress to exactly the plain body, whatever the
+length of the spliced value.
+
+Run with: python -m pytest -q test_response_cache.py
+"""
+
+import gzip
+import json
+
+import pytest
+
+from chatbot_engine import get_chatbot_response
+from response_cache import PreparedBody
+
+@pytest.mark.parametrize('value', ['2026-10-17T04:09:51.123456', '', 'ünïcode ✓', 'x' * 70000])
+def test_spliced_gzip_matches_plain_body(value):
+    body = {'response': get_chatbot_response('how to grow rice?'), 'status': 'success', 'mode': 'rules'}
+    prepared = PreparedBody(body, 'timestamp', json.dumps, compress_level=6)
+    plain = prepared.render(value)
+    assert json.loads(plain) == dict(body, timestamp=value)
+    # gzip.decompress checks the extended CRC and length too
+    assert gzip.decompress(prepared.render_gzip(value)) == plain
+
+def test_prepared_body_without_compression():
+    prepared = PreparedBody({'status': 'success'}, 'timestamp', json.dumps, compress_level=0)
+    assert prepared.render_gzip('now') is None
+    assert json.loads(prepared.render('now')) == {'status': 'success', 'timestamp': 'now'}
@@ -0,0 +1,54 @@
+"""
+Regression tests for traffic capture and replay
+Requests that change server state must never be captured or replayed.
+
+Run with: python -m pytest -q test_traffic_capture.py
+"""
+
+import json
+
+import replay_traffic
+import simple_app
+from traffic_capture import TrafficRecorder, replayable
+
+RECORD = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.8, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 202.9}
+
+def test_only_read_only_requests_are_replayable():
+    assert replayable('GET', '/health') and replayable('POST', '/predict') and replayable('POST', '/chatbot')
+    for route in ('/feedback', '/cache/flush', '/models/reload', 'unmatched', None):
+        assert not replayable('POST', route)
+    assert not replayable('OPTIONS', '/predict') and not replayable('DELETE', '/predict')
+
+def test_state_changing_requests_are_not_captured(client, tmp_path, monkeypatch):
+    path = tmp_path / 'capture.jsonl'
+    monkeypatch.setattr(simple_app, 'CAPTURE', TrafficRecorder(str(path), buffer_lines=1))
+    admin = {'X-Admin-Token': simple_app.ADMIN_TOKEN}
+    client.post('/predict', json=RECORD)
+    assert client.post('/feedback', json=dict(RECORD, label='rice'), headers=admin).status_code == 200
+    assert client.post('/cache/flush', headers=admin).status_code == 200
+    assert client.post('/models/reload', headers=admin).status_code == 200
+    client.get('/health')
+    simple_app.CAPTURE.flush()
+    captured = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(record['method'], record['route']) for record in captured] == [('POST', '/predict'), ('GET', '/health')]
+
+def test_replay_refuses_state_changing_records(tmp_path, monkeypatch):
+    path = tmp_path / 'capture.jsonl'
+    records = [
+        {'ts': 0, 'method': 'POST', 'path': '/predict', 'route': '/predict', 'body': RECORD, 'status': 200},
+        {'ts': 0, 'method': 'POST', 'path': '/feedback', 'route': '/feedback', 'body': RECORD, 'status': 200},
+        {'ts': 0, 'method': 'POST', 'path': '/cache/flush', 'route': '/cache/flush', 'status': 200},
+        {'ts': 0, 'method': 'POST', 'path': '/models/reload', 'status': 200},
+        {'ts': 0, 'method': 'GET', 'path': '/health', 'route': '/health', 'status': 200},
+    ]
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    sent = []
+
+    def send(self, record):
+        sent.append(record['path'])
+        return record['status'], None, 0.001
+
+    monkeypatch.setattr(replay_traffic.Replayer, 'send', send)
+    report = replay_traffic.replay(str(path), 'http://127.0.0.1:1', speed=0, concurrency=1)
+    assert sorted(sent) == ['/health', '/predict']
+    assert report['requests'] == 2 and report['refused'] == 3
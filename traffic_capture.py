@@ -0,0 +1,90 @@
+"""
+Traffic capture for the Crop Recommendation System
+TrafficRecorder appends a sample of served requests (route, body, status,
+latency and response) to a JSON-lines file, for replay_traffic.py to replay
+against another build. Lines are buffered and written in one append, so
+capture costs a list append per sampled request. Only requests that leave
+server state unchanged are captured or replayed (see replayable).
+"""
+
+import atexit
+import gzip
+import json
+import random
+import threading
+import time
+
+# Methods that never change server state
+SAFE_METHODS = frozenset({'GET', 'HEAD'})
+# POST routes that only compute an answer. Any other POST (feedback, cache
+# flushes, model reloads, routes added later) is neither captured nor replayed
+READ_ONLY_POST_ROUTES = frozenset({
+    '/predict', '/predict/batch', '/predict/stream', '/predict/sweep', '/chatbot', '/chatbot/stream',
+})
+
+def replayable(method, route):
+    """Whether a request to route (the URL rule) is safe to capture and send again"""
+    return method in SAFE_METHODS or (method == 'POST' and route in READ_ONLY_POST_ROUTES)
+
+class TrafficRecorder:
+    """
+    Buffered JSON-lines writer of sampled requests
+    The buffer is written when it holds buffer_lines lines, when a request
+    arrives more than flush_seconds after the last write, and at exit.
+    """
+
+    def __init__(self, path, sample_rate=1.0, buffer_lines=100, flush_seconds=1.0, max_body_bytes=65536):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.buffer_lines = buffer_lines
+        self.flush_seconds = flush_seconds
+        self.max_body_bytes = max_body_bytes
+        self.recorded = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def sampled(self):
+        """Whether to capture the next request"""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, entry):
+        line = json.dumps(entry, separators=(',', ':'), ensure_ascii=False) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self.recorded += 1
+            due = (len(self._buffer) >= self.buffer_lines
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if lines:
+            # A single append per flush keeps lines from several workers whole
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(''.join(lines))
+
+def decode_body(data, content_type):
+    """Body bytes as parsed JSON for JSON bodies, else text; None when empty"""
+    if not data:
+        return None
+    text = data.decode('utf-8', errors='replace')
+    if content_type and 'json' in content_type:
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
+
+def response_body(response):
+    """Decoded body of a buffered Flask response, None for streamed ones"""
+    if response.is_streamed:
+        return None
+    data = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        data = gzip.decompress(data)
+    return decode_body(data, response.mimetype)
@@ -0,0 +1,82 @@
+"""
+Production serving for the Crop Recommendation System
+Runs the Flask app under gunicorn's prefork server. The app module (engines,
+knowledge index) is imported in the master before workers fork, so workers
+share those pages copy-on-write. Workers are recycled after a bounded number
+of requests. Readiness is signalled once the master is listening; requests
+that arrive before a worker has booted wait in the listen backlog.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+def run_production(app, host='127.0.0.1', port=5000, workers=None, threads=None, max_requests=None,
+                   ready_file=None, post_fork=None, child_exit=None):
+    """
+    Serve app with gunicorn until the master process exits
+    post_fork is called in every worker right after it is forked, to restart
+    threads that do not survive fork (log writer, micro-batchers).
+    child_exit(pid) is called in the master after a worker exited, however it
+    died, to release state the worker held in shared memory.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.error("Production mode needs gunicorn (pip install gunicorn); it is not available on Windows")
+        raise
+
+    workers = workers or int(os.environ.get('CROP_WORKERS', os.cpu_count() or 1))
+    threads = threads or int(os.environ.get('CROP_THREADS', 1))
+    max_requests = max_requests if max_requests is not None else int(os.environ.get('CROP_MAX_REQUESTS', 10000))
+    ready_file = ready_file or os.environ.get('CROP_READY_FILE')
+
+    def when_ready(server):
+        if ready_file:
+            with open(ready_file, 'w') as handle:
+                handle.write(str(os.getpid()))
+        logger.info("Server ready on http://%s:%s with %d workers", host, port, workers)
+
+    def worker_post_fork(server, worker):
+        if post_fork:
+            post_fork()
+
+    def worker_child_exit(server, worker):
+        if child_exit:
+            child_exit(worker.pid)
+
+    def on_exit(server):
+        if ready_file and os.path.exists(ready_file):
+            os.remove(ready_file)
+
+    options = {
+        'bind': f"{host}:{port}",
+        'workers': workers,
+        # Sync workers recycle without dropping queued connections; requests are
+        # CPU-bound and short, so put slow clients behind a buffering proxy.
+        # threads > 1 switches gunicorn to its gthread worker.
+        'worker_class': os.environ.get('CROP_WORKER_CLASS', 'sync'),
+        'threads': threads,
+        # Recycle workers gradually instead of all at once
+        'max_requests': max_requests,
+        'max_requests_jitter': max(1, max_requests // 10) if max_requests else 0,
+        'graceful_timeout': int(os.environ.get('CROP_GRACEFUL_TIMEOUT', 30)),
+        'timeout': int(os.environ.get('CROP_WORKER_TIMEOUT', 60)),
+        'keepalive': 5,
+        'preload_app': True,
+        'when_ready': when_ready,
+        'post_fork': worker_post_fork,
+        'child_exit': worker_child_exit,
+        'on_exit': on_exit,
+    }
+
+    class CropApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    CropApplication().run()